@@ -0,0 +1,108 @@
+### Text analysis shared by index.py and search.py of all projects: tokenizing, case-folding, filtering, normalizing ###
+
+import os
+import re
+
+from nltk.stem import PorterStemmer
+from nltk.stem.wordnet import WordNetLemmatizer
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+from constants import tokenizers, analyzer_file_name, stopwords_file_name
+
+with open(stopwords_file_name) as f:
+    stopwords = set(map(lambda ln: ln.strip(), f.readlines()))
+
+# Words (runs of letters, digits and underscores) and single punctuation marks, as word_tokenize roughly splits them
+token_pattern = re.compile(r'\w+|[^\w\s]')
+# Words of a query line, i.e. anything between whitespaces (so that operators and zone terms stay whole)
+query_word_pattern = re.compile(r'\S+')
+
+'''
+An analyzer turns a text into terms in the following stages:
+    1. Tokenize, either with 'nltk' (word_tokenize, after sent_tokenize if split_sentences is set)
+        or with 'regex' (the compiled token_pattern, which never loads the Punkt sentence splitter)
+    2. Case-fold every token
+    3. Filter out punctuations, non-alphabetical words, and stopwords (of stopwords_file_name)
+    4. Normalize the remaining words with the normalizer: 'lemma' (WordNet), 'stem' (Porter) or None,
+        where every distinct word is normalized only once (a corpus repeats the same words over and over)
+The tokenizer of an index is saved with it (see save_tokenizer), so that search.py analyzes queries
+with the tokenizer that the documents were analyzed with
+'''
+class Analyzer:
+    tokenizer = None
+    split_sentences = False
+    stopwords = None
+    normalize_word = None
+    normalized_by_word = None # { case-folded word: its term }
+
+    def __init__(self, tokenizer=tokenizers[0], normalizer=None, split_sentences=False):
+        self.tokenizer = tokenizer
+        self.split_sentences = split_sentences
+        self.stopwords = stopwords
+        self.normalized_by_word = {}
+        if normalizer == 'lemma':
+            self.normalize_word = WordNetLemmatizer().lemmatize
+        elif normalizer == 'stem':
+            self.normalize_word = PorterStemmer().stem
+        else:
+            self.normalize_word = lambda word: word
+
+    def get_tokenizer(self): return self.tokenizer
+
+    # Step 1: returns the tokens of the text (case is kept, e.g. for nltk.Text)
+    def get_tokens(self, text):
+        if self.tokenizer == 'regex':
+            return token_pattern.findall(text)
+        if self.split_sentences:
+            return [token for sentence in sent_tokenize(text) for token in word_tokenize(sentence)]
+        return word_tokenize(text)
+
+    # Step 3 on a case-folded token
+    def is_significant(self, word):
+        return word.isalpha() and word not in self.stopwords
+
+    # Step 4 on a case-folded significant word
+    def normalize(self, word):
+        term = self.normalized_by_word.get(word)
+        if term is None:
+            term = self.normalized_by_word[word] = self.normalize_word(word)
+        return term
+
+    # Accepts tokens and returns the terms of the significant tokens, in order (steps 2 to 4)
+    def get_token_terms(self, tokens):
+        terms = []
+        for word in map(str.lower, tokens):
+            if self.is_significant(word):
+                terms.append(self.normalize(word))
+        return terms
+
+    # Accepts tokens and returns { term: sorted positions of the term in the tokens } (steps 2 to 4)
+    def get_term_positions(self, tokens):
+        term_positions = {}
+        for position, word in enumerate(map(str.lower, tokens)):
+            if self.is_significant(word):
+                term_positions.setdefault(self.normalize(word), []).append(position)
+        return term_positions
+
+    # Accepts a text and returns its terms, in order (steps 1 to 4)
+    def get_terms(self, text):
+        return self.get_token_terms(self.get_tokens(text))
+
+    # Accepts a list of texts and returns the list of their terms
+    def get_terms_batch(self, texts):
+        return [self.get_terms(text) for text in texts]
+
+# Accepts a query line and returns its whitespace-separated words
+def get_query_words(line): return query_word_pattern.findall(line)
+
+# Saves the tokenizer of the index in the working directory
+def save_tokenizer(tokenizer):
+    with open(analyzer_file_name, 'w') as a:
+        a.write(tokenizer + '\n')
+
+# Returns the tokenizer of the index in the working directory ('nltk' for an index saved without one)
+def load_tokenizer():
+    if not os.path.exists(analyzer_file_name):
+        return tokenizers[0]
+    with open(analyzer_file_name) as a:
+        return a.read().strip()
@@ -0,0 +1,235 @@
+#!/usr/bin/python
+import sys
+import getopt
+
+import os
+import re
+import json
+import shutil
+import platform
+import subprocess
+import tempfile
+
+from math import ceil
+from time import time
+
+from constants import benchmark_file_name, benchmark_sizes, benchmark_generated_queries, tokenizers, print_time
+
+start_time = time()
+
+repository_directory_name = os.path.dirname(os.path.abspath(__file__))
+reuters_directory_name = os.path.join(repository_directory_name, 'reuters')
+
+'''
+Every benchmark is a project directory with its corpus, its query files and the engines to search with
+    - corpus is either 'csv' (a synthetic CSV file made by generate_corpus.py) or 'reuters' (a reuters directory)
+    - queries are query files of the repository, or 'generated' for the free text and boolean query logs that
+        generate_corpus.py writes with the corpus (the fixed queries of queries/ hardly match its made-up words)
+    - every query line is searched by its own run of search.py, since the search.py of the main project
+        only answers the first line of a query file
+    - engines are (engine name, extra arguments of search.py)
+'''
+benchmarks = [
+    {
+        'directory_name': '',
+        'corpus': 'csv',
+        'queries': 'generated',
+        'engines': [('search', [])]
+    },
+    {
+        'directory_name': 'boolean_retrieval',
+        'corpus': 'reuters',
+        'queries': [os.path.join('boolean_retrieval', 'queries.txt')],
+        'engines': [
+            ('boolean_retrieval-list', ['-e', 'list']),
+            ('boolean_retrieval-bitmap', ['-e', 'bitmap']),
+            ('boolean_retrieval-auto', ['-e', 'auto'])
+        ]
+    },
+    {
+        'directory_name': 'vector_space_model',
+        'corpus': 'reuters',
+        'queries': [os.path.join('vector_space_model', 'queries.txt')],
+        'engines': [('vector_space_model', [])]
+    }
+]
+
+'''
+For every size, every benchmark and every tokenizer of the analyzer (see analyzer.py):
+    1. Make a corpus of that many documents and index it with the tokenizer in an empty working directory
+    2. Measure the indexing throughput (documents per second), the peak RSS of index.py and the size of the index
+    3. Search every query with every engine (repeat times) and measure the latency percentiles and peak RSS
+Latencies are the times printed by print_time, i.e. without the interpreter start-up and imports
+'''
+def do_benchmarking(sizes, output_file_name, repeat):
+    results = []
+    for size in sizes:
+        for benchmark in benchmarks:
+            for tokenizer in tokenizers:
+                working_directory_name = tempfile.mkdtemp()
+                try:
+                    results.extend(run_benchmark(benchmark, size, tokenizer, working_directory_name, repeat))
+                finally:
+                    shutil.rmtree(working_directory_name)
+    with open(output_file_name, 'w') as o:
+        json.dump({
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'sizes': sizes,
+            'results': results
+            }, o, indent=2, sort_keys=True)
+        o.write('\n')
+
+def run_benchmark(benchmark, size, tokenizer, working_directory_name, repeat):
+    project_directory_name = os.path.join(repository_directory_name, benchmark['directory_name'])
+    corpus_name = os.path.join(working_directory_name, 'corpus')
+    index_directory_name = os.path.join(working_directory_name, 'index')
+    os.makedirs(index_directory_name)
+    shutil.copy(os.path.join(project_directory_name, 'stopwords.txt'), index_directory_name)
+    query_log_file_names = []
+    if benchmark['corpus'] == 'csv':
+        corpus_name += '.csv'
+        query_log_file_names = [os.path.join(working_directory_name, file_name)
+            for file_name in ('free_text.txt', 'boolean.txt')]
+        run_script([os.path.join(repository_directory_name, 'generate_corpus.py'),
+            '-o', corpus_name, '-n', str(size), '-q', str(benchmark_generated_queries),
+            '-f', query_log_file_names[0], '-b', query_log_file_names[1]], index_directory_name)
+        number_of_documents = size
+    else:
+        number_of_documents = make_reuters_directory(corpus_name, size)
+    index_seconds, index_peak_rss, output = run_script([
+        os.path.join(project_directory_name, 'index.py'),
+        '-i', corpus_name, '-d', 'dictionary.txt', '-p', 'postings.txt', '-t', tokenizer], index_directory_name)
+    index_bytes = sum(map(
+        lambda file_name: os.path.getsize(os.path.join(index_directory_name, file_name)),
+        filter(lambda file_name: file_name != 'stopwords.txt', os.listdir(index_directory_name))))
+    query_file_names = write_query_files(benchmark, working_directory_name, query_log_file_names)
+    results = []
+    for engine_name, engine_arguments in benchmark['engines']:
+        latencies = []
+        query_peak_rss = 0
+        for i in range(repeat):
+            for query_file_name in query_file_names:
+                seconds, peak_rss, output = run_script([
+                    os.path.join(project_directory_name, 'search.py'),
+                    '-d', 'dictionary.txt', '-p', 'postings.txt',
+                    '-q', query_file_name, '-o', os.path.join(working_directory_name, 'output.txt')]
+                    + engine_arguments, index_directory_name)
+                latencies.append(get_printed_time(output, seconds))
+                query_peak_rss = max(query_peak_rss, peak_rss)
+        results.append({
+            'engine': engine_name,
+            'tokenizer': tokenizer,
+            'corpus': benchmark['corpus'],
+            'size': size,
+            'documents': number_of_documents,
+            'index_seconds': index_seconds,
+            'index_documents_per_second': number_of_documents / index_seconds if index_seconds else 0,
+            'index_peak_rss_kb': index_peak_rss,
+            'index_bytes': index_bytes,
+            'queries': len(latencies),
+            'query_peak_rss_kb': query_peak_rss,
+            'query_latency_ms': {
+                'p50': get_percentile(latencies, 50) * 1000,
+                'p95': get_percentile(latencies, 95) * 1000,
+                'p99': get_percentile(latencies, 99) * 1000
+            }
+        })
+        print('{engine} ({tokenizer}, {documents} documents): {throughput:.0f} documents/s indexed, '
+            '{p50:.1f} ms p50, {p99:.1f} ms p99'.format(
+            engine=engine_name, tokenizer=tokenizer, documents=number_of_documents,
+            throughput=results[-1]['index_documents_per_second'],
+            p50=results[-1]['query_latency_ms']['p50'], p99=results[-1]['query_latency_ms']['p99']))
+    return results
+
+# Accepts the arguments of a script and the directory to run it in and
+# Returns (wall time in seconds, peak RSS in KB, standard output) of the script
+def run_script(arguments, directory_name):
+    script_start_time = time()
+    process = subprocess.Popen([sys.executable] + arguments, cwd=directory_name,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    output = process.stdout.read().decode(errors='ignore')
+    process.stdout.close()
+    pid, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        sys.exit('Failed: ' + ' '.join(arguments))
+    return (time() - script_start_time, rusage.ru_maxrss, output)
+
+# Accepts the standard output of a script and its wall time and
+# Returns the last time printed by print_time, or the wall time if there is none
+def get_printed_time(output, seconds):
+    printed_times = re.findall(r'Time taken: ([0-9.]+) seconds', output)
+    return float(printed_times[-1]) if printed_times else seconds
+
+# Nearest-rank percentile
+def get_percentile(values, percentile):
+    if not values:
+        return 0
+    sorted_values = sorted(values)
+    return sorted_values[max(0, ceil(percentile / 100 * len(sorted_values)) - 1)]
+
+# Accepts a benchmark, a directory and the query logs generated with the corpus (if any) and
+# Returns the query files to search, with one query per file
+def write_query_files(benchmark, directory_name, query_log_file_names=()):
+    queries = []
+    if benchmark['queries'] != 'generated':
+        query_log_file_names = [os.path.join(repository_directory_name, file_name)
+            for file_name in benchmark['queries']]
+    for query_log_file_name in query_log_file_names:
+        with open(query_log_file_name) as q:
+            queries.extend(filter(None, map(str.strip, q)))
+    query_file_names = []
+    for i, query in enumerate(queries):
+        query_file_names.append(os.path.join(directory_name, 'query-{}.txt'.format(i)))
+        with open(query_file_names[-1], 'w') as q:
+            q.write(query + '\n')
+    return query_file_names
+
+# Returns the reuters file names sorted by doc id
+def get_reuters_file_names():
+    return sorted(os.listdir(reuters_directory_name), key=lambda file_name: int(file_name.split('.')[0]))
+
+# Accepts a directory name and a number of documents and
+# Links that many reuters documents into the directory under their doc ids (without the .txt extension),
+# and returns the number of documents linked
+def make_reuters_directory(directory_name, number_of_documents):
+    os.makedirs(directory_name)
+    file_names = get_reuters_file_names()[:number_of_documents]
+    for file_name in file_names:
+        os.symlink(os.path.join(reuters_directory_name, file_name),
+            os.path.join(directory_name, file_name.split('.')[0]))
+    return len(file_names)
+
+# Returns the current git commit of the repository, so that results of different commits can be diffed
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=repository_directory_name,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def usage():
+    print('Usage: ' + sys.argv[0] + ' [-s comma-separated-sizes] [-r repeat] [-o output-json-file]')
+
+sizes = benchmark_sizes
+output_file_o = benchmark_file_name
+repeat = 1
+try:
+    opts, args = getopt.getopt(sys.argv[1:], 's:r:o:')
+except getopt.GetoptError:
+    usage()
+    sys.exit(2)
+for o, a in opts:
+    if o == '-s':
+        sizes = list(map(int, a.split(',')))
+    elif o == '-r':
+        repeat = int(a)
+    elif o == '-o':
+        output_file_o = a
+    else:
+        assert False, 'Unhandled option'
+
+do_benchmarking(sizes, output_file_o, repeat)
+stop_time = time()
+print_time(start_time, stop_time)
@@ -0,0 +1,49 @@
+### A compact bitset over non-negative integers (e.g. doc ids), one bit per integer ###
+
+class Bitmap:
+    data = None
+
+    def __init__(self, data=None):
+        self.data = bytearray(data) if data is not None else bytearray()
+
+    def get_data(self): return self.data
+
+    def __contains__(self, i):
+        byte_index = i >> 3
+        return byte_index < len(self.data) and bool(self.data[byte_index] & (1 << (i & 7)))
+
+    def contains(self, i): return i in self
+
+    def add(self, i):
+        byte_index = i >> 3
+        if byte_index >= len(self.data):
+            self.data.extend(bytes(byte_index - len(self.data) + 1))
+        self.data[byte_index] |= 1 << (i & 7)
+
+    def discard(self, i):
+        byte_index = i >> 3
+        if byte_index < len(self.data):
+            self.data[byte_index] &= ~(1 << (i & 7)) & 0xff
+
+    def reset(self):
+        self.data = bytearray()
+
+    def is_empty(self):
+        return not any(self.data)
+
+    def get_count(self):
+        return bin(int.from_bytes(self.data, 'little')).count('1')
+
+    def to_list(self):
+        return [(byte_index << 3) + bit
+            for byte_index, byte in enumerate(self.data) if byte
+            for bit in range(8) if byte & (1 << bit)]
+
+    # Accepts a binary file handle and writes the raw bytes of the bitset
+    def dump(self, file_object):
+        file_object.write(bytes(self.data))
+
+    # Accepts a binary file handle and returns the bitset stored from its current position
+    @staticmethod
+    def load(file_object):
+        return Bitmap(file_object.read())
@@ -0,0 +1,111 @@
+### Postings stored on disk as compressed blocks behind a skip table, decoded only block by block ###
+
+import pickle
+
+from bisect import bisect_left, bisect_right
+
+'''
+The postings of a stem are written as a pickled header followed by a compressed stream
+    - The stream is split into blocks of block_size postings, and each block stores the gaps between its
+        postings after its first posting, each gap as a variable-length integer (7 bits per byte, the high bit
+        set on every byte but the last)
+    - The header is (number of postings, length of the stream, skip table), where the skip table holds the first
+        posting of every block with the byte offset of the block in the stream
+A BlockPostings only reads the header when loaded, and reads and decodes a block only when it is needed
+'''
+class BlockPostings:
+    length = 0
+    first_postings = None # first posting of every block
+    block_offsets = None  # byte offset of every block in the stream, and the length of the stream at the end
+    stream_offset = 0     # byte offset of the stream in the postings file
+    postings_file_object = None
+    blocks = None         # { block index: decoded postings }
+
+    def __init__(self, postings_file_object=None, header=None):
+        self.postings_file_object = postings_file_object
+        self.first_postings = []
+        self.block_offsets = [0]
+        self.blocks = {}
+        if header is not None:
+            self.length, stream_length, skip_table = header
+            self.first_postings = list(map(lambda skip: skip[0], skip_table))
+            self.block_offsets = list(map(lambda skip: skip[1], skip_table)) + [stream_length]
+            self.stream_offset = postings_file_object.tell()
+
+    def get_length(self): return self.length
+    def get_number_of_blocks(self): return len(self.first_postings)
+
+    # Accepts a block index and returns the postings of the block (read from the postings file only once)
+    def get_block(self, block_index):
+        if block_index in self.blocks:
+            return self.blocks[block_index]
+        self.postings_file_object.seek(self.stream_offset + self.block_offsets[block_index])
+        encoded = self.postings_file_object.read(
+            self.block_offsets[block_index + 1] - self.block_offsets[block_index])
+        self.blocks[block_index] = decode_gaps(self.first_postings[block_index], encoded)
+        return self.blocks[block_index]
+
+    def to_list(self):
+        return [posting for block_index in range(self.get_number_of_blocks())
+            for posting in self.get_block(block_index)]
+
+    # Accepts sorted postings and
+    # Returns those which are also in this list
+    # For every posting, the skip table is searched for the only block which can contain it (from the last
+    # block searched onwards), so the blocks between two postings are never read
+    def intersection(self, sorted_postings):
+        intersection = []
+        block_index = 0
+        for posting in sorted_postings:
+            block_index = bisect_right(self.first_postings, posting, block_index) - 1
+            if block_index < 0:
+                block_index = 0
+                continue
+            block = self.get_block(block_index)
+            i = bisect_left(block, posting)
+            if i < len(block) and block[i] == posting:
+                intersection.append(posting)
+        return intersection
+
+# Accepts sorted postings, a postings file handle and the block size and
+# Writes the header and compressed stream of the postings at the current position of the file
+def dump_block_postings(sorted_postings, postings_file_object, block_size):
+    skip_table = []
+    stream = bytearray()
+    for i in range(0, len(sorted_postings), block_size):
+        block = sorted_postings[i:i + block_size]
+        skip_table.append((block[0], len(stream)))
+        stream.extend(encode_gaps(block))
+    pickle.dump((len(sorted_postings), len(stream), skip_table), postings_file_object)
+    postings_file_object.write(stream)
+
+# Accepts a postings file handle at the position of a list and
+# Returns the list as a BlockPostings, or as a plain list if it was written before blocks (i.e. a pickled list)
+def load_block_postings(postings_file_object):
+    header = pickle.load(postings_file_object)
+    if isinstance(header, list):
+        return header
+    return BlockPostings(postings_file_object, header)
+
+# Accepts the postings of one block and returns the gaps after its first posting as variable-length integers
+def encode_gaps(block):
+    encoded = bytearray()
+    for previous_posting, posting in zip(block, block[1:]):
+        gap = posting - previous_posting
+        while gap >= 0x80:
+            encoded.append((gap & 0x7f) | 0x80)
+            gap >>= 7
+        encoded.append(gap)
+    return encoded
+
+def decode_gaps(first_posting, encoded):
+    postings = [first_posting]
+    gap = shift = 0
+    for byte in encoded:
+        gap |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        postings.append(postings[-1] + gap)
+        gap = shift = 0
+    return postings
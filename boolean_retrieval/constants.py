@@ -1,10 +1,29 @@
 universal_stem = '*'
+# Tokenizers of the analyzer (see analyzer.py), the first being the default, and the file naming the one of the index
+tokenizers = ['nltk', 'regex']
+analyzer_file_name = 'analyzer.txt'
+# Stopwords of the analyzer, read from the working directory (every project has its own)
+stopwords_file_name = 'stopwords.txt'
+# Number of documents read and analyzed at once by index.py
+analyzer_batch_size = 256
+# Number of postings per compressed block of a postings list (see block_postings.py)
+postings_block_size = 64
 
 unary_operators = ['not']
 binary_operators = ['or', 'and']
 operators = binary_operators + unary_operators
 precedences = {operator: precedence for (precedence, operator) in enumerate(operators)}
 
+# Boolean retrieval engines (see search.py): skip lists only, roaring bitmaps only, or either by density
+engines = ['list', 'bitmap', 'auto']
+# A term is loaded as a roaring bitmap by the auto engine if df / (number of documents) is at least this
+bitmap_density_threshold = 1 / 32
+# Roaring bitmap containers hold the low 16 bits of postings, and hold an array if small enough
+container_bits = 16
+array_container_max_length = 4096
+# Total number of postings kept by the subexpression cache of search.py (see subexpression_cache.py)
+subexpression_cache_max_length = 1000000
+
 identity = lambda x: x
 
 # Accepts an operator string (e.g. 'not', 'or', 'and') and
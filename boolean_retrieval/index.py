@@ -4,36 +4,35 @@ import sys
 import getopt
 
 import os
-import string
 import bisect
-import pickle
 
 from time import time
 
-from nltk.stem import PorterStemmer
-from nltk.tokenize import sent_tokenize, word_tokenize
-stemmer = PorterStemmer()
+# analyzer.py is shared with the main project (the parent directory), which is searched after this directory,
+# so that the modules of this project (e.g. constants.py) are the ones imported, also by the analyzer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from constants import universal_stem, print_time
+from constants import universal_stem, postings_block_size, tokenizers, analyzer_batch_size, print_time
+from analyzer import Analyzer, save_tokenizer
 from skip_list import SkipList
+from block_postings import dump_block_postings
 
 start_time = time()
 
-with open('stopwords.txt') as f:
-    stopwords = set(map(lambda ln: ln.strip(), f.readlines()))
-
 '''
 Create a dictionary[stem] -> sorted([postings]) and write to the dictionary and postings file
     - dictionary is a dictionary whose keys are stems and whose values are sorted posting lists
     - postings will then be converted into a skip list with sqrt(len(postings)) skip pointers 
+    - postings are written as compressed blocks behind a skip table (see block_postings.py)
+    - documents are read and analyzed analyzer_batch_size at a time
 '''
 def do_indexing(documents_directory_name, dictionary_file_name, postings_file_name):
     dictionary = {}
     seen_postings_by_stem = {}
     for root, directories, files in os.walk(documents_directory_name):
-        for posting in files:
-            with open(os.path.join(root, posting)) as f:
-                text = get_preprocessed(f.read())
+        for i in range(0, len(files), analyzer_batch_size):
+            batch = files[i:i + analyzer_batch_size]
+            for posting, text in zip(batch, get_preprocessed_batch(root, batch)):
                 posting = int(posting)
                 for stem in text:
                     if stem not in dictionary:
@@ -48,33 +47,28 @@ def do_indexing(documents_directory_name, dictionary_file_name, postings_file_na
         for stem in dictionary:
             d.write('{stem},{offset}\n'.format(stem=stem, offset=p.tell()))
             postings = dictionary[stem]
-            pickle.dump(postings, p)
+            dump_block_postings(postings, p, postings_block_size)
 
 '''
-Preprocess a text string in the following order:
-    1. (L69) Do sentence tokenization
-    2. (L67) For each sentence, do case-folding, word tokenization, and remove duplicate word tokens
-    3. (L65) Filter out punctuations, non-alphabetical words, and stopwords
-    4. (L64) Stem the remaining words, and remove duplicate stems
-    5. (L70) Return a flattened set of stemmed words
+Preprocess the documents of a batch with the analyzer (see analyzer.py), i.e. sentence and word tokenization,
+    case-folding, removal of punctuations, non-alphabetical words and stopwords, and stemming, and
+Return the set of stemmed words of every document
 '''
-def get_preprocessed(text):
-    sentences = map(
-        lambda sentence: set(map(
-            lambda word: stemmer.stem(word),
-            filter(
-                lambda token: token not in string.punctuation and token.isalpha() and token not in stopwords,
-                set(word_tokenize(sentence.lower()))
-                ))),
-        sent_tokenize(text))
-    return set((stem for stems in sentences for stem in stems))
+def get_preprocessed_batch(directory_name, file_names):
+    texts = []
+    for file_name in file_names:
+        with open(os.path.join(directory_name, file_name)) as f:
+            texts.append(f.read())
+    return list(map(set, analyzer.get_terms_batch(texts)))
 
 def usage():
-    print('Usage: ' + sys.argv[0] + ' -i directory-of-documents -d dictionary-file -p postings-file')
+    print('Usage: ' + sys.argv[0] + ' -i directory-of-documents -d dictionary-file -p postings-file '
+        + '[-t tokenizer (' + '|'.join(tokenizers) + ')]')
 
 input_directory_d = output_file_d = output_file_p = None
+tokenizer_t = tokenizers[0]
 try:
-    opts, args = getopt.getopt(sys.argv[1:], 'i:d:p:')
+    opts, args = getopt.getopt(sys.argv[1:], 'i:d:p:t:')
 except (getopt.GetoptError, err) as e:
     usage()
     sys.exit(2)
@@ -85,12 +79,16 @@ for o, a in opts:
         output_file_d = a
     elif o == '-p':
         output_file_p = a
+    elif o == '-t':
+        tokenizer_t = a
     else:
         assert False, 'Unhandled option'
-if input_directory_d == None or output_file_d == None or output_file_p == None:
+if input_directory_d == None or output_file_d == None or output_file_p == None or tokenizer_t not in tokenizers:
     usage()
     sys.exit(2)
 
+analyzer = Analyzer(tokenizer_t, 'stem', split_sentences=True)
+save_tokenizer(tokenizer_t)
 do_indexing(input_directory_d, output_file_d, output_file_p)
 
 stop_time = time()
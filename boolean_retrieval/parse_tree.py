@@ -7,12 +7,14 @@ class ParseTreeNode:
     left = None
     right = None
     parent = None
+    key = None # canonical postfix form of the subtree (see ParseTree.build_from)
 
-    def __init__(self, data=None, left=None, right=None, parent=None):
+    def __init__(self, data=None, left=None, right=None, parent=None, key=None):
         self.data = data
         self.left = left
         self.right = right
         self.parent = parent
+        self.key = key
 
     def has_left(self): return self.left is not None
     def has_right(self): return self.right is not None
@@ -27,6 +29,7 @@ class ParseTreeNode:
     def get_left(self): return self.left
     def get_right(self): return self.right
     def get_parent(self): return self.parent
+    def get_key(self): return self.key
 
     def set_data(self, data): self.data = data
     def set_left(self, left): self.left = left
@@ -73,9 +76,15 @@ class ParseTree:
     def get_sorted_operands(self, comparator=identity):
         return self.get_sorted_leaves(comparator)
 
-    def build_from(self, postfix_list):
+    # Accepts a postfix list and optionally the tokens of the postfix list (e.g. stems instead of their postings)
+    # Every node gets the canonical postfix form of its subtree as key, where the operands of a binary
+    # (i.e. commutative) operator are sorted, e.g. both (gates OR bill) and (bill OR gates) are 'bill gates or'
+    def build_from(self, postfix_list, postfix_tokens=None):
         stack = []
-        nodes = map(lambda data: ParseTreeNode(data=data), postfix_list)
+        if postfix_tokens is None:
+            postfix_tokens = postfix_list
+        nodes = map(lambda data_token: ParseTreeNode(data=data_token[0], key=data_token[1]),
+            zip(postfix_list, postfix_tokens))
         for node in nodes:
             token = node.get_data()
             if token not in operators: # is operand
@@ -90,6 +99,9 @@ class ParseTree:
                     right_node.set_parent(node)
                     node.set_right(right_node)
                     stack.pop()
+                    node.key = ' '.join(sorted((left_node.get_key(), right_node.get_key())) + [node.key])
+                else:
+                    node.key = ' '.join((left_node.get_key(), node.key))
                 stack.append(node)
         if stack:
             self.root = stack.pop()
@@ -0,0 +1,149 @@
+### A roaring-style compressed bitmap of postings, an alternative to the SkipList for boolean retrieval ###
+
+from constants import container_bits, array_container_max_length
+
+container_size = 1 << container_bits
+container_mask = container_size - 1
+full_bits = (1 << container_size) - 1
+
+'''
+A roaring bitmap splits every posting into (high bits, low 16 bits)
+    - Postings with the same high bits share one container of their low 16 bits
+    - A container with at most array_container_max_length postings is a sorted array of them
+    - Otherwise it is a bitset of 2^16 bits (kept as a Python int, so AND, OR and NOT are word-wise)
+    - A container of few long runs of consecutive postings is a list of (first, last) runs
+Every operation goes through the bitset form of the containers and picks the smallest form for the result
+'''
+class ArrayContainer:
+    values = None
+
+    def __init__(self, values):
+        self.values = values
+
+    def get_length(self): return len(self.values)
+    def to_list(self): return self.values
+
+    def to_bits(self):
+        bits = 0
+        for value in self.values:
+            bits |= 1 << value
+        return bits
+
+class BitsetContainer:
+    bits = 0
+    length = 0
+
+    def __init__(self, bits, length=None):
+        self.bits = bits
+        self.length = length if length is not None else bin(bits).count('1')
+
+    def get_length(self): return self.length
+    def to_list(self): return get_set_bits(self.bits)
+    def to_bits(self): return self.bits
+
+class RunContainer:
+    runs = None # [(first, last)]
+
+    def __init__(self, runs):
+        self.runs = runs
+
+    def get_length(self): return sum(map(lambda run: run[1] - run[0] + 1, self.runs))
+    def to_list(self): return [value for first, last in self.runs for value in range(first, last + 1)]
+
+    def to_bits(self):
+        bits = 0
+        for first, last in self.runs:
+            bits |= ((1 << (last - first + 1)) - 1) << first
+        return bits
+
+class RoaringBitmap:
+    containers = None # { high bits: container }
+
+    def __init__(self, containers=None):
+        self.containers = containers if containers is not None else {}
+
+    def get_length(self):
+        return sum(map(lambda container: container.get_length(), self.containers.values()))
+
+    def build_from(self, sorted_list):
+        values_by_high_bits = {}
+        for posting in sorted_list:
+            values_by_high_bits.setdefault(posting >> container_bits, []).append(posting & container_mask)
+        self.containers = { high_bits: get_container_from_values(values)
+            for high_bits, values in values_by_high_bits.items() }
+        return self
+
+    def to_list(self):
+        return [(high_bits << container_bits) | value
+            for high_bits in sorted(self.containers)
+            for value in self.containers[high_bits].to_list()]
+
+    # AND: only containers present in both bitmaps can have common postings
+    def intersection(self, bitmap):
+        containers = {}
+        for high_bits, container in self.containers.items():
+            if high_bits in bitmap.containers:
+                other_container = bitmap.containers[high_bits]
+                if isinstance(container, ArrayContainer) and isinstance(other_container, ArrayContainer):
+                    values = sorted(set(container.values).intersection(other_container.values))
+                    if values:
+                        containers[high_bits] = ArrayContainer(values)
+                    continue
+                bits = container.to_bits() & other_container.to_bits()
+                if bits:
+                    containers[high_bits] = get_container_from_bits(bits)
+        return RoaringBitmap(containers)
+
+    # OR
+    def union(self, bitmap):
+        containers = dict(self.containers)
+        for high_bits, other_container in bitmap.containers.items():
+            if high_bits in containers:
+                containers[high_bits] = get_container_from_bits(
+                    containers[high_bits].to_bits() | other_container.to_bits())
+            else:
+                containers[high_bits] = other_container
+        return RoaringBitmap(containers)
+
+    # AND NOT, e.g. NOT x is (universal postings).difference(x)
+    def difference(self, bitmap):
+        containers = {}
+        for high_bits, container in self.containers.items():
+            if high_bits in bitmap.containers:
+                bits = container.to_bits() & ~bitmap.containers[high_bits].to_bits() & full_bits
+                if bits:
+                    containers[high_bits] = get_container_from_bits(bits)
+            else:
+                containers[high_bits] = container
+        return RoaringBitmap(containers)
+
+# Accepts the sorted low bits of a container and returns the smallest container for them
+def get_container_from_values(values):
+    runs = get_runs(values)
+    if 2 * len(runs) < min(len(values), array_container_max_length):
+        return RunContainer(runs)
+    if len(values) <= array_container_max_length:
+        return ArrayContainer(values)
+    return BitsetContainer(ArrayContainer(values).to_bits(), len(values))
+
+def get_container_from_bits(bits):
+    length = bin(bits).count('1')
+    if length <= array_container_max_length:
+        return get_container_from_values(get_set_bits(bits))
+    return BitsetContainer(bits, length)
+
+# Accepts sorted values and returns the runs of consecutive values as [(first, last)]
+def get_runs(values):
+    runs = []
+    for value in values:
+        if runs and runs[-1][1] == value - 1:
+            runs[-1] = (runs[-1][0], value)
+        else:
+            runs.append((value, value))
+    return runs
+
+# Accepts a bitset (int) and returns the sorted indexes of its set bits
+def get_set_bits(bits):
+    return [(byte_index << 3) + bit
+        for byte_index, byte in enumerate(bits.to_bytes(container_size >> 3, 'little')) if byte
+        for bit in range(8) if byte & (1 << bit)]
@@ -3,21 +3,42 @@ import nltk
 import sys
 import getopt
 
-import pickle
+import os
+import re
 
 from time import time
 
-from nltk.stem import PorterStemmer
-stemmer = PorterStemmer()
+# analyzer.py is shared with the main project (the parent directory), which is searched after this directory,
+# so that the modules of this project (e.g. constants.py) are the ones imported, also by the analyzer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from constants import universal_stem, operators, precedences, peek, print_time
+from constants import (
+    universal_stem,
+    operators,
+    precedences,
+    engines,
+    bitmap_density_threshold,
+    subexpression_cache_max_length,
+    peek,
+    print_time
+    )
+from analyzer import Analyzer, load_tokenizer
 from skip_list import SkipList
 from parse_tree import ParseTree
+from roaring_bitmap import RoaringBitmap
+from block_postings import BlockPostings, load_block_postings
+from subexpression_cache import SubexpressionCache
 
 start_time = time()
 
 dictionary = {}
 offsets = {}
+engine = engines[0]
+subexpression_cache = SubexpressionCache(subexpression_cache_max_length)
+# Query words are stemmed like the documents of the index (see analyzer.py)
+analyzer = Analyzer(load_tokenizer(), 'stem')
+# A parenthesis, or a word (i.e. anything up to a whitespace or parenthesis)
+query_token_pattern = re.compile(r'[()]|[^\s()]+')
 
 # MAIN function for search.py
 def do_searching(dictionary_file_name, postings_file_name, queries_file_name, output_file_name):
@@ -34,6 +55,8 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
             stems, stemmed_postfix_query = parse_query(query) # string to list in postfix form
             parse_tree = build_tree(stemmed_postfix_query, p) # list to parse tree of skip lists
             root_node = parse_tree.get_root()
+            if root_node is not None:
+                load_cached_subtrees(root_node)
             while root_node is not None and root_node.is_operator():
                 operand_nodes = parse_tree.get_sorted_operands(comparator=lambda node: node.get_data().get_length())
                 # Recall that node.data is a SkipList and as such the comparator compares nodes by
@@ -64,12 +87,31 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
                     operator_node.set_data(skip_list)
                     operator_node.set_left(None)
                     operator_node.set_right(None)
+                    subexpression_cache.put(operator_node.get_key(), skip_list)
                     break
             if root_node is not None: # is an operand
                 final_skip_list = root_node.get_data()
                 final_postings_list = map(str, final_skip_list.to_list())
                 o.write(' '.join(final_postings_list))
             o.write('\n')
+    print('Subexpression cache: {} hits, {} misses, {} postings'.format(subexpression_cache.get_hit_count(),
+        subexpression_cache.get_miss_count(), subexpression_cache.get_length()))
+
+# Accepts a parse tree node and
+# Mutates every operator subtree whose result is in the subexpression cache into the cached operand (a leaf)
+# Subtrees are looked up from the top, so a shared subtree is replaced as a whole before its own subtrees
+def load_cached_subtrees(node):
+    if not node.is_operator():
+        return
+    skip_list = subexpression_cache.get(node.get_key())
+    if skip_list is not None:
+        node.set_data(skip_list)
+        node.set_left(None)
+        node.set_right(None)
+        return
+    load_cached_subtrees(node.get_left())
+    if node.has_right():
+        load_cached_subtrees(node.get_right())
 
 # Accepts a case-folded line without leading or trailing whitespaces and
 # Returns a tuple of (stems in query, query in postfix list form)
@@ -82,7 +124,7 @@ def parse_query(query_string):
         if token in operators or token == '(' or token == ')':
             stemmed_postfix_query.append(token)
         else:
-            stem = stemmer.stem(token)
+            stem = analyzer.normalize(token)
             stems.add(stem)
             stemmed_postfix_query.append(stem)
     return (stems, stemmed_postfix_query)
@@ -90,20 +132,7 @@ def parse_query(query_string):
 # Accepts a string and
 # Returns a list of tokens where parentheses are tokenized too
 def tokenize(expression):
-    final_tokens = []
-    for token in expression.split(' '):
-        inner_tokens = []
-        if token[0] == '(':
-            if token[-1] == ')':
-                inner_tokens = ['(', token[1:-1], ')']
-            else:
-                inner_tokens = ['(', token[1:]]
-        elif token[-1] == ')':
-            inner_tokens = [token[:-1], ')']
-        else:
-            inner_tokens = [token]
-        final_tokens.extend(inner_tokens)
-    return final_tokens
+    return query_token_pattern.findall(expression)
 
 # Accepts a list of tokens and
 # Returns a list of tokens in postfix form
@@ -148,11 +177,14 @@ def build_tree(postfix_query, postings_file_object):
             length, postings = load_stem(token, postings_file_object)
             postfix_expression.append(postings)
     tree = ParseTree()
-    tree.build_from(postfix_expression)
+    tree.build_from(postfix_expression, postfix_query)
     return tree
 
 # Accepts a stem, a postings file handle, and
-# Returns the loaded postings skip list while storing it in memory
+# Returns the loaded postings while storing it in memory, as
+#   - block postings (see block_postings.py), of which only the skip table is read for now
+#   - a skip list if the postings file was written before blocks
+#   - a roaring bitmap (see is_bitmap_stem)
 def load_stem(stem, postings_file_object):
     global dictionary
     if stem in dictionary:
@@ -160,16 +192,61 @@ def load_stem(stem, postings_file_object):
     postings = SkipList()
     if stem in offsets:
         postings_file_object.seek(offsets[stem])
-        postings.build_from(pickle.load(postings_file_object))
+        postings = load_block_postings(postings_file_object)
+        if isinstance(postings, list):
+            skip_list = SkipList()
+            skip_list.build_from(postings)
+            postings = skip_list
+    if is_bitmap_stem(stem, postings.get_length(), postings_file_object):
+        postings = RoaringBitmap().build_from(postings.to_list())
     dictionary[stem] = (postings.get_length(), postings)
     return dictionary[stem]
 
+# Accepts a stem, its df, a postings file handle, and
+# Returns True if the stem is to be loaded as a roaring bitmap by the engine, i.e.
+#   - list: never
+#   - bitmap: always
+#   - auto: if its postings are dense (i.e. df / number of documents >= bitmap_density_threshold)
+def is_bitmap_stem(stem, df, postings_file_object):
+    if engine == 'list':
+        return False
+    if engine == 'bitmap' or stem == universal_stem:
+        return True
+    number_of_documents = load_stem(universal_stem, postings_file_object)[0]
+    return bool(number_of_documents) and df / number_of_documents >= bitmap_density_threshold
+
+# Accepts a skip list or a roaring bitmap and returns the postings as a roaring bitmap
+def get_bitmap(postings):
+    if isinstance(postings, RoaringBitmap):
+        return postings
+    return RoaringBitmap().build_from(postings.to_list())
+
+# Accepts a skip list or block postings and returns the postings as a skip list (i.e. decodes every block)
+def get_skip_list(postings):
+    if isinstance(postings, SkipList):
+        return postings
+    skip_list = SkipList()
+    skip_list.build_from(postings.to_list())
+    return skip_list
+
+# Operands of mixed representations are evaluated as roaring bitmaps
+def is_any_bitmap(*postings):
+    return any(map(lambda posting: isinstance(posting, RoaringBitmap), postings))
+
+def is_any_block_postings(*postings):
+    return any(map(lambda posting: isinstance(posting, BlockPostings), postings))
+
 # Implementation of NOT(skip list)
 # Accepts a skip list and returns a negated skip list
 # Dependent on the existence of universal_postings (a skip list of every posting)
+# With roaring bitmaps, NOT is a word-wise (universal postings) AND NOT (bitmap) per container
 def negate(skip_list, postings_file_object):
     negated_skip_list = SkipList()
     number_of_postings, universal_postings = load_stem(universal_stem, postings_file_object)
+    if is_any_bitmap(skip_list, universal_postings):
+        return get_bitmap(universal_postings).difference(get_bitmap(skip_list))
+    skip_list = get_skip_list(skip_list)
+    universal_postings = get_skip_list(universal_postings)
     if not number_of_postings:
         return negated_skip_list
     negated_skip_list_data = []
@@ -193,6 +270,10 @@ def negate(skip_list, postings_file_object):
 # Accepts two skip lists and returns a skip list containing postings from either skip list
 # OR != XOR and there will be no duplicate postings in the output skip list
 def union(skip_list_a, skip_list_b):
+    if is_any_bitmap(skip_list_a, skip_list_b):
+        return get_bitmap(skip_list_a).union(get_bitmap(skip_list_b))
+    skip_list_a = get_skip_list(skip_list_a)
+    skip_list_b = get_skip_list(skip_list_b)
     seen_data = set()
     union_skip_list_data = []
     node_a = skip_list_a.get_head()
@@ -224,6 +305,10 @@ def union(skip_list_a, skip_list_b):
 # Accepts two skip lists and returns a skip list containing postings which both skip lists have
 # Does skipping when the skip pointer node of one skip list has a value less than the other skip list node
 def merge(skip_list_a, skip_list_b):
+    if is_any_bitmap(skip_list_a, skip_list_b):
+        return get_bitmap(skip_list_a).intersection(get_bitmap(skip_list_b))
+    if is_any_block_postings(skip_list_a, skip_list_b):
+        return merge_block_postings(skip_list_a, skip_list_b)
     merged_skip_list_data = []
     node_a = skip_list_a.get_head()
     node_b = skip_list_b.get_head()
@@ -250,6 +335,18 @@ def merge(skip_list_a, skip_list_b):
     merged_skip_list.build_from(merged_skip_list_data)
     return merged_skip_list
 
+# Implementation of AND when either operand is block postings
+# The postings of the shorter operand are looked up in the longer block postings through its skip table,
+# so only the blocks which can hold them are decoded
+def merge_block_postings(postings_a, postings_b):
+    shorter_postings, longer_postings = sorted((postings_a, postings_b), key=lambda postings: postings.get_length())
+    if isinstance(longer_postings, BlockPostings):
+        merged_skip_list_data = longer_postings.intersection(shorter_postings.to_list())
+        merged_skip_list = SkipList()
+        merged_skip_list.build_from(merged_skip_list_data)
+        return merged_skip_list
+    return merge(get_skip_list(shorter_postings), longer_postings)
+
 unary_operations = {
     'not': negate
 }
@@ -260,11 +357,12 @@ binary_operations = {
 }
 
 def usage():
-    print('Usage: ' + sys.argv[0] + ' -d dictionary-file -p postings-file -q file-of-queries -o output-file-of-results')
+    print('Usage: ' + sys.argv[0] + ' -d dictionary-file -p postings-file -q file-of-queries -o output-file-of-results '
+        + '[-e engine (' + '|'.join(engines) + ')]')
 
 input_file_d = input_file_p = input_file_q = output_file_o = None
 try:
-    opts, args = getopt.getopt(sys.argv[1:], 'd:p:q:o:')
+    opts, args = getopt.getopt(sys.argv[1:], 'd:p:q:o:e:')
 except (getopt.GetoptError, err) as e:
     usage()
     sys.exit(2)
@@ -277,9 +375,12 @@ for o, a in opts:
         input_file_q = a
     elif o == '-o':
         output_file_o = a
+    elif o == '-e':
+        engine = a
     else:
         assert False, 'Unhandled option'
-if input_file_d == None or input_file_p == None or input_file_q == None or output_file_o == None:
+if input_file_d == None or input_file_p == None or input_file_q == None or output_file_o == None \
+    or engine not in engines:
     usage()
     sys.exit(2)
 
@@ -0,0 +1,45 @@
+### A bounded cache of evaluated boolean subexpressions, shared by every query of a batch ###
+
+from collections import OrderedDict
+
+'''
+Evaluated subexpressions (skip lists or roaring bitmaps) keyed by their canonical postfix form
+    - The canonical postfix form of a subtree is built by ParseTree.build_from, with the operands of
+        commutative operators (i.e. AND, OR) sorted, so (gates OR bill) and (bill OR gates) share one entry
+    - The cache holds at most max_length postings in total, and evicts the least recently used entries first
+'''
+class SubexpressionCache:
+    max_length = 0
+    length = 0
+    hit_count = 0
+    miss_count = 0
+    postings_by_key = None # OrderedDict { canonical postfix form: (number of postings, postings) }
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.postings_by_key = OrderedDict()
+
+    def get_length(self): return self.length
+    def get_hit_count(self): return self.hit_count
+    def get_miss_count(self): return self.miss_count
+
+    # Accepts a canonical postfix form and returns the evaluated postings, or None if they are not cached
+    def get(self, key):
+        if key not in self.postings_by_key:
+            self.miss_count += 1
+            return None
+        self.hit_count += 1
+        self.postings_by_key.move_to_end(key)
+        return self.postings_by_key[key][1]
+
+    def put(self, key, postings):
+        if key in self.postings_by_key:
+            return
+        length = postings.get_length()
+        if length > self.max_length:
+            return
+        while self.length + length > self.max_length:
+            evicted_length, evicted_postings = self.postings_by_key.popitem(last=False)[1]
+            self.length -= evicted_length
+        self.postings_by_key[key] = (length, postings)
+        self.length += length
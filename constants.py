@@ -6,7 +6,85 @@ zones_table_name = 'zones'
 lengths_file_name = 'lengths.txt'
 nltk_offsets_file_name = 'offsets.txt'
 nltk_texts_file_name = 'texts.txt'
+# Columnar date_posted and court of every document, see metadata.py
+metadata_file_name = 'metadata.txt'
+# Gap encoded positions of every lemma in every document for phrase queries, see positions.py
+positions_offsets_file_name = 'positions_offsets.txt'
+positions_file_name = 'positions.txt'
+# Sorted terms and reversed terms of a segment for wildcard queries (e.g. neglig*), see term_index.py
+term_index_file_name = 'terms.txt'
+wildcard_character = '*'
+# Maximum number of terms a wildcard of a query expands to
+max_wildcard_expansions = 50
+# k-grams of the terms of a segment for spelling correction (search.py -s), see spelling.py
+kgram_index_file_name = 'kgrams.txt'
+kgram_length = 2
+# A misspelled query lemma is corrected to a term within this edit distance
+max_edit_distance = 2
+# Query lemmas of at most this many letters are only corrected within edit distance 1
+short_word_length = 4
+# Doc id of every doc ordinal of a segment, and the doc orders of index.py -r, the first being the default,
+# see doc_map.py
+doc_map_file_name = 'doc_ids.txt'
+doc_orders = ['doc_id', 'court_date']
+# (term id, tf) of every term of every document of a segment, see forward_index.py
+forward_index_file_name = 'forward.txt'
+# Number of top weighted terms in the vector of a document for Rocchio query expansion, see forward_index.py
+document_vector_length = 20
+# Query expansion of search.py -e, the first being the default, and the number of terms Rocchio expansion adds
+query_expansion_modes = ['semi_auto', 'rocchio']
+rocchio_expansion_length = 5
 and_operator_name = 'and'
+# Tokenizers of the analyzer (see analyzer.py), the first being the default, and the file naming the one of the index
+tokenizers = ['nltk', 'regex']
+analyzer_file_name = 'analyzer.txt'
+# Stopwords of the analyzer, read from the working directory (every project has its own)
+stopwords_file_name = 'stopwords.txt'
+
+# Zones (i.e. CSV columns other than content) indexed as tagged postings, e.g. 'title:contract', 'court:appeal'
+zone_names = ['title', 'court', 'date_posted']
+zone_separator = ':'
+# A match of a query lemma in one of these zones adds (weight * zone tfidf) to the document tfidf
+zone_weights = { 'title': 0.5, 'court': 0.2 }
+
+# Deleted (tombstoned) doc ids of a segment, see bitmap.py and update.py
+deletions_file_name = 'deletions.txt'
+# Segments other than the main index and the delta segment, one directory per line (see segment.py)
+segments_file_name = 'segments.txt'
+segments_directory_name = 'segments'
+# Shards written by index.py -k, one directory per line, each served by a shard_worker.py process
+shards_file_name = 'shards.txt'
+shards_directory_name = 'shards'
+shard_worker_file_name = 'shard_worker.py'
+# Updated and appended documents live in a small delta segment until compaction
+# A segment directory holds the same files as the main index under fixed names
+delta_directory_name = 'delta'
+segment_dictionary_file_name = 'dictionary.txt'
+segment_postings_file_name = 'postings.txt'
+# Ranked documents of analyzed queries cached across runs of search.py -r (see result_cache.py), up to a total size
+result_cache_file_name = 'results.db'
+result_cache_max_bytes = 64 * 1024 * 1024
+# Value of search.py -k to write every ranked document (i.e. no top k cut)
+all_results = 'all'
+# Formats of the search.py output file (see result_writer.py), and the number of documents written at once
+output_formats = ['text', 'binary']
+output_chunk_size = 4096
+# Default output file and corpus sizes (number of documents) of benchmark.py
+benchmark_file_name = 'benchmark.json'
+benchmark_sizes = [100, 1000]
+# Number of queries of each query log (free text and boolean) generated with the corpus of the main project
+benchmark_generated_queries = 10
+# Vocabulary size, Zipf exponent and log-normal content length (in words) of generate_corpus.py
+generated_vocabulary_size = 50000
+generated_zipf_exponent = 1.0
+generated_content_length_mu = 6.5
+generated_content_length_sigma = 0.8
+# Number of most expensive terms and of vocabulary growth checkpoints reported by index_stats.py
+index_stats_top_n = 20
+index_stats_checkpoints = 10
+
+def get_zone_term(zone_name, lemma):
+    return zone_name + zone_separator + lemma
 
 def print_time(start_time, stop_time):
     print('Time taken: {0:.5f} seconds'.format(stop_time - start_time))
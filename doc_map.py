@@ -0,0 +1,85 @@
+### Dense doc ordinals of a segment: the doc id of every ordinal, and the ordinal of every doc id ###
+
+import pickle
+
+from array import array
+from bisect import bisect_left
+
+from constants import doc_orders
+
+'''
+Every document of a segment is numbered from 0 to n - 1 (its doc ordinal), and the postings, positions, lengths,
+deletions, metadata and forward index of the segment are all by doc ordinal
+    - doc_ids is an int64 array of the doc id (i.e. the document_id of the CSV file, as in the output) of every ordinal
+    - sorted_doc_ids is an int64 array of the doc ids in ascending order and sorted_ordinals is an int32 array of
+        their ordinals, so the ordinal of a doc id is a binary search
+The ordinals follow the doc order of the segment (see get_doc_order), which compaction keeps
+The file is a pickled header (length, doc order) followed by the raw columns
+'''
+class DocMap:
+    doc_order = None
+    doc_ids = None
+    sorted_doc_ids = None
+    sorted_ordinals = None
+
+    def __init__(self, doc_order=doc_orders[0]):
+        self.doc_order = doc_order
+        self.doc_ids = array('q')
+        self.sorted_doc_ids = array('q')
+        self.sorted_ordinals = array('i')
+
+    def get_length(self): return len(self.doc_ids)
+    def get_doc_order(self): return self.doc_order
+    def get_doc_ids(self): return self.doc_ids
+    def get_doc_id(self, ordinal): return self.doc_ids[ordinal]
+
+    # Accepts a doc id and returns its ordinal, or None if the segment has no such document
+    def get_ordinal(self, doc_id):
+        i = bisect_left(self.sorted_doc_ids, doc_id)
+        if i < len(self.sorted_doc_ids) and self.sorted_doc_ids[i] == doc_id:
+            return self.sorted_ordinals[i]
+        return None
+
+    # Returns { doc_id: ordinal } to renumber a whole segment at once (i.e. while writing it)
+    def get_ordinals_by_doc_id(self):
+        return { doc_id: ordinal for ordinal, doc_id in enumerate(self.doc_ids) }
+
+    # Accepts the doc ids in ordinal order and their doc order
+    @staticmethod
+    def build_from(doc_ids, doc_order=doc_orders[0]):
+        doc_map = DocMap(doc_order)
+        doc_map.doc_ids = array('q', doc_ids)
+        sorted_ordinals = sorted(range(len(doc_map.doc_ids)), key=doc_map.doc_ids.__getitem__)
+        doc_map.sorted_doc_ids = array('q', map(doc_map.doc_ids.__getitem__, sorted_ordinals))
+        doc_map.sorted_ordinals = array('i', sorted_ordinals)
+        return doc_map
+
+    def dump(self, file_object):
+        pickle.dump({ 'length': self.get_length(), 'doc_order': self.doc_order }, file_object)
+        self.doc_ids.tofile(file_object)
+        self.sorted_doc_ids.tofile(file_object)
+        self.sorted_ordinals.tofile(file_object)
+
+    @staticmethod
+    def load(file_object):
+        header = pickle.load(file_object)
+        doc_map = DocMap(header['doc_order'])
+        doc_map.doc_ids.fromfile(file_object, header['length'])
+        doc_map.sorted_doc_ids.fromfile(file_object, header['length'])
+        doc_map.sorted_ordinals.fromfile(file_object, header['length'])
+        return doc_map
+
+'''
+Accepts the doc ids of a segment, { doc_id: (date_posted, court) } (as in the CSV file) and a doc order, and
+Returns the doc ids in ordinal order:
+    - 'doc_id': ascending doc id
+    - 'court_date': by court, then date_posted, then doc id, so that the documents of a court (and of a period)
+        are adjacent and the gaps between the ordinals of the postings of their terms are small
+'''
+def get_doc_order(doc_ids, metadata_by_document, doc_order=doc_orders[0]):
+    if doc_order == 'court_date':
+        def get_key(doc_id):
+            date_posted, court = metadata_by_document.get(doc_id, ('', ''))
+            return (court.strip().lower(), date_posted.strip(), doc_id)
+        return sorted(doc_ids, key=get_key)
+    return sorted(doc_ids)
@@ -0,0 +1,155 @@
+### Forward index of a segment: the (term id, tf) of every term of every document, read through mmap ###
+
+import mmap
+import struct
+
+from array import array
+from heapq import nlargest
+from math import log10, sqrt
+
+from constants import zone_separator, document_vector_length
+from tracing import add_count
+
+# Number of documents and number of terms as int64s
+header_format = '<qq'
+
+'''
+The terms of every document of a segment, addressed by the doc ordinals of the segment (see doc_map.py), where a
+term id is the index of the term in the sorted terms of the segment (see term_index.py)
+    - The entries of a document are its (term id, tf) in ascending term id order, every term id as the gap from the
+        previous one, and every gap and tf as a variable-length integer (as in positions.py)
+        e.g. [(3, 1), (5, 2), (130, 1)] -> b'\x03\x01\x02\x02\x7d\x01'
+    - The file is the number of documents n and the number of terms m, then the byte offsets of the entries of
+        every ordinal (int64 * (n + 1), relative to the first entry), then the df of every term id (int32 * m),
+        then the entries
+The file is mapped into memory and its offsets and dfs are cast to int64 and int32 views, so opening it reads
+nothing and a document costs two array reads and the bytes of its entries
+The dfs make the forward index enough to weight the terms of a document, e.g. for Rocchio query expansion
+(see get_vector)
+'''
+class ForwardIndex:
+    file_object = None
+    file_map = None
+    buffer = None   # memoryview of file_map
+    offsets = None
+    dfs = None
+    entries_offset = 0
+
+    def __init__(self):
+        self.buffer = memoryview(b'')
+        self.offsets = array('q', [0])
+        self.dfs = array('i')
+
+    # Number of documents in the segment (i.e. N of the segment, including deleted documents)
+    def get_length(self): return len(self.offsets) - 1
+
+    # Accepts a doc ordinal and returns [(term id, tf)] of the document ([] if the segment has no such document)
+    def get_entries(self, ordinal):
+        if ordinal >= self.get_length():
+            return []
+        start = self.entries_offset + self.offsets[ordinal]
+        stop = self.entries_offset + self.offsets[ordinal + 1]
+        add_count('bytes_read', stop - start)
+        return decode_entries(self.buffer[start:stop])
+
+    # Accepts a doc ordinal and the sorted terms of the segment (see term_index.py) and
+    # Returns the vector of the document as [(term, weight)]: its document_vector_length content terms with the
+    # highest tfidf, i.e. (1 + log10(tf)) * log10(N / df) with the df and N of the segment, normalized to unit length
+    # Zone terms, and terms in every document (whose idf is 0), are left out
+    def get_vector(self, ordinal, sorted_terms):
+        N = self.get_length()
+        weighted_terms = nlargest(document_vector_length, filter(
+            lambda weighted_term: weighted_term[0] > 0 and zone_separator not in weighted_term[1],
+            map(lambda entry: ((1 + log10(entry[1])) * log10(N / self.dfs[entry[0]]), sorted_terms[entry[0]]),
+                self.get_entries(ordinal))))
+        norm = sqrt(sum(map(lambda weighted_term: weighted_term[0] ** 2, weighted_terms)))
+        return [(term, weight / norm) for weight, term in weighted_terms]
+
+    # The file object is kept open (and mapped) by the forward index
+    @staticmethod
+    def load(file_object):
+        forward_index = ForwardIndex()
+        forward_index.file_object = file_object
+        forward_index.file_map = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+        forward_index.buffer = memoryview(forward_index.file_map)
+        length, number_of_terms = struct.unpack_from(header_format, forward_index.buffer)
+        offsets_offset = struct.calcsize(header_format)
+        dfs_offset = offsets_offset + (length + 1) * 8
+        forward_index.offsets = forward_index.buffer[offsets_offset:dfs_offset].cast('q')
+        forward_index.entries_offset = dfs_offset + number_of_terms * 4
+        forward_index.dfs = forward_index.buffer[dfs_offset:forward_index.entries_offset].cast('i')
+        return forward_index
+
+    def close(self):
+        if self.file_object is not None:
+            self.offsets.release()
+            self.dfs.release()
+            self.buffer.release()
+            self.file_map.close()
+            self.file_object.close()
+
+'''
+Builds the forward index of a segment from its postings lists, one list at a time
+(so it can follow the postings being written, i.e. in the same pass as the inverted index)
+The term ids are only known once every term is, so dump is given the sorted terms of the segment
+'''
+class ForwardIndexBuilder:
+    terms_by_document = None # { doc ordinal: [(term, tf)] }
+    dfs_by_term = None
+
+    def __init__(self):
+        self.terms_by_document = {}
+        self.dfs_by_term = {}
+
+    # Accepts a term and its postings [(doc ordinal, tf)]
+    def add_postings(self, term, postings):
+        self.dfs_by_term[term] = len(postings)
+        for ordinal, tf in postings:
+            self.terms_by_document.setdefault(ordinal, []).append((term, tf))
+
+    # Accepts the sorted terms and the number of documents of the segment and writes the forward index to the file
+    def dump(self, sorted_terms, length, file_object):
+        term_ids_by_term = { term: term_id for term_id, term in enumerate(sorted_terms) }
+        offsets = array('q', [0])
+        entries = bytearray()
+        for ordinal in range(length):
+            entries += encode_entries(sorted((term_ids_by_term[term], tf)
+                for term, tf in self.terms_by_document.get(ordinal, ())))
+            offsets.append(len(entries))
+        file_object.write(struct.pack(header_format, length, len(sorted_terms)))
+        offsets.tofile(file_object)
+        array('i', map(lambda term: self.dfs_by_term.get(term, 0), sorted_terms)).tofile(file_object)
+        file_object.write(entries)
+
+# Accepts [(term id, tf)] in ascending term id order and returns their bytes
+def encode_entries(entries):
+    encoded = bytearray()
+    previous_term_id = 0
+    for term_id, tf in entries:
+        append_varint(encoded, term_id - previous_term_id)
+        append_varint(encoded, tf)
+        previous_term_id = term_id
+    return bytes(encoded)
+
+def append_varint(encoded, value):
+    while value >= 0x80:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+
+def decode_entries(encoded):
+    values = []
+    value = shift = 0
+    for byte in encoded:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+    entries = []
+    term_id = 0
+    for i in range(0, len(values), 2):
+        term_id += values[i]
+        entries.append((term_id, values[i + 1]))
+    return entries
@@ -0,0 +1,190 @@
+#!/usr/bin/python
+import sys
+import getopt
+
+import csv
+import random
+
+from datetime import date, timedelta
+from itertools import accumulate
+from math import exp
+
+from time import time
+
+from constants import (
+    generated_vocabulary_size,
+    generated_zipf_exponent,
+    generated_content_length_mu,
+    generated_content_length_sigma,
+    print_time
+    )
+
+start_time = time()
+
+with open('stopwords.txt') as f:
+    stopwords = list(filter(None, map(lambda ln: ln.strip(), f.readlines())))
+
+syllables = [consonant + vowel
+    for consonant in ['b', 'c', 'd', 'f', 'g', 'h', 'k', 'l', 'm', 'n', 'p', 'r', 't', 'v', 'w', 'z']
+    for vowel in ['a', 'e', 'i', 'o', 'u']]
+
+# Courts with the share of documents of each court
+courts = [
+    ('SG High Court', 40),
+    ('SG Court of Appeal', 20),
+    ('HK Court of First Instance', 15),
+    ('HK High Court', 10),
+    ('UK House of Lords', 8),
+    ('UK Court of Appeal', 5),
+    ('SG District Court', 2)
+    ]
+
+'''
+Write a synthetic corpus in the CSV schema of index.py (document_id,title,content,date_posted,court) and
+optionally a free text query log and a boolean query log (one query per line), all determined by the seed
+    - Words are drawn from a Zipfian vocabulary (the word of rank r is drawn with weight 1 / r^s), whose most
+        frequent words are the stopwords, so the vocabulary of the corpus grows like that of natural text
+    - Content lengths (in words) follow a log-normal distribution, and titles have 3 to 12 words
+    - Queries are drawn from the generated documents (non-stopword windows of a document), so they match;
+        boolean queries are ANDs of 2 or 3 words, of which some are quoted phrases (adjacent words)
+    - Documents are written one at a time, so any number of documents can be generated in constant memory
+    - Queries have their own randomizer, so the corpus of a seed is the same with or without queries
+'''
+def do_generating(csv_file_path, number_of_documents, seed, number_of_queries,
+    free_text_log_file_path, boolean_log_file_path):
+    randomizer = random.Random(seed)
+    query_randomizer = random.Random('{}-queries'.format(seed))
+    vocabulary = get_vocabulary(randomizer, generated_vocabulary_size)
+    cumulative_weights = list(accumulate(map(
+        lambda rank: 1 / rank ** generated_zipf_exponent, range(1, len(vocabulary) + 1))))
+    court_names = list(map(lambda court: court[0], courts))
+    court_cumulative_weights = list(accumulate(map(lambda court: court[1], courts)))
+    # Every query comes from the document at a random position of the corpus
+    query_positions = sorted(query_randomizer.randrange(number_of_documents) for i in range(number_of_queries)) \
+        if number_of_documents else []
+    free_text_queries = []
+    boolean_queries = []
+    with open(csv_file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['document_id', 'title', 'content', 'date_posted', 'court'])
+        query_index = 0
+        for i in range(number_of_documents):
+            content_length = max(20, int(exp(randomizer.gauss(
+                generated_content_length_mu, generated_content_length_sigma))))
+            words = randomizer.choices(vocabulary, cum_weights=cumulative_weights, k=content_length)
+            title_words = randomizer.choices(vocabulary, cum_weights=cumulative_weights, k=randomizer.randint(3, 12))
+            date_posted = date(1990, 1, 1) + timedelta(days=randomizer.randrange(365 * 28))
+            court = randomizer.choices(court_names, cum_weights=court_cumulative_weights)[0]
+            writer.writerow([
+                100000 + i,
+                ' '.join(title_words).title(),
+                get_text(words, randomizer),
+                date_posted.isoformat() + ' 00:00:00',
+                court])
+            while query_index < len(query_positions) and query_positions[query_index] == i:
+                free_text_queries.append(get_free_text_query(words, query_randomizer))
+                boolean_queries.append(get_boolean_query(words, query_randomizer))
+                query_index += 1
+    # Queries are shuffled so that the logs are not ordered by document
+    query_randomizer.shuffle(free_text_queries)
+    query_randomizer.shuffle(boolean_queries)
+    for log_file_path, queries in ((free_text_log_file_path, free_text_queries), (boolean_log_file_path, boolean_queries)):
+        if log_file_path is not None:
+            with open(log_file_path, 'w') as l:
+                for query in queries:
+                    l.write(query + '\n')
+
+# Accepts a seeded randomizer and the vocabulary size and
+# Returns the vocabulary sorted by rank: the stopwords (shuffled), then distinct made-up words of 2 to 4 syllables
+def get_vocabulary(randomizer, vocabulary_size):
+    vocabulary = list(stopwords)
+    randomizer.shuffle(vocabulary)
+    seen_words = set(vocabulary)
+    while len(vocabulary) < vocabulary_size:
+        word = ''.join(randomizer.choices(syllables, k=randomizer.randint(2, 4)))
+        if word not in seen_words:
+            seen_words.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+# Accepts words and returns them as sentences of 8 to 25 words
+def get_text(words, randomizer):
+    sentences = []
+    i = 0
+    while i < len(words):
+        sentence_length = randomizer.randint(8, 25)
+        sentence = ' '.join(words[i:i + sentence_length])
+        sentences.append(sentence[:1].upper() + sentence[1:] + '.')
+        i += sentence_length
+    return ' '.join(sentences)
+
+def get_significant_words(words):
+    return list(filter(lambda word: word not in stopwords, words))
+
+# Accepts the words of a document and returns 2 to 5 of its distinct significant words as a free text query
+def get_free_text_query(words, randomizer):
+    significant_words = list(dict.fromkeys(get_significant_words(words) or words))
+    return ' '.join(randomizer.sample(significant_words, min(len(significant_words), randomizer.randint(2, 5))))
+
+# Accepts the words of a document and
+# Returns an AND of 2 or 3 of its distinct significant words, where a word is quoted with its next word 1 in 4 times
+# (if that word is significant too), and no word is in two operands
+def get_boolean_query(words, randomizer):
+    positions = [position for position, word in enumerate(words) if word not in stopwords] \
+        or list(range(len(words)))
+    randomizer.shuffle(positions)
+    number_of_operands = randomizer.randint(2, 3)
+    operands = []
+    operand_words = set()
+    for position in positions:
+        if len(operands) == number_of_operands:
+            break
+        word = words[position]
+        if word in operand_words:
+            continue
+        next_word = words[position + 1] if position + 1 < len(words) else word
+        if next_word not in stopwords and next_word != word and next_word not in operand_words \
+            and randomizer.random() < 0.25:
+            operands.append('"{} {}"'.format(word, next_word))
+            operand_words.update((word, next_word))
+        else:
+            operands.append(word)
+            operand_words.add(word)
+    return ' AND '.join(operands)
+
+def usage():
+    print('Usage: ' + sys.argv[0] + ' -o output-csv-file -n number-of-documents [-s seed] '
+        + '[-q number-of-queries] [-f free-text-query-log] [-b boolean-query-log]')
+
+output_file_o = None
+number_of_documents = None
+seed = 0
+number_of_queries = 0
+output_file_f = output_file_b = None
+try:
+    opts, args = getopt.getopt(sys.argv[1:], 'o:n:s:q:f:b:')
+except getopt.GetoptError:
+    usage()
+    sys.exit(2)
+for o, a in opts:
+    if o == '-o':
+        output_file_o = a
+    elif o == '-n':
+        number_of_documents = int(a)
+    elif o == '-s':
+        seed = int(a)
+    elif o == '-q':
+        number_of_queries = int(a)
+    elif o == '-f':
+        output_file_f = a
+    elif o == '-b':
+        output_file_b = a
+    else:
+        assert False, 'Unhandled option'
+if output_file_o == None or number_of_documents == None:
+    usage()
+    sys.exit(2)
+
+do_generating(output_file_o, number_of_documents, seed, number_of_queries, output_file_f, output_file_b)
+stop_time = time()
+print_time(start_time, stop_time)
@@ -1,36 +1,29 @@
 #!/usr/bin/python
-import nltk
 import sys
 import getopt
 
 import os
-import string
-import bisect
-import pickle
+import shutil
 
 import csv
 import sqlite3
 
-from collections import Counter
 from time import time
 
-nltk.download('wordnet')
-
-from nltk import Text
-from nltk.corpus import PlaintextCorpusReader
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.stem.wordnet import WordNetLemmatizer
-lemmatizer = WordNetLemmatizer()
-
 from constants import (
-    lengths_file_name,
-    nltk_offsets_file_name,
-    nltk_texts_file_name,
     database_file_name,
     zones_table_name,
+    deletions_file_name,
+    delta_directory_name,
+    segments_directory_name,
+    shards_directory_name,
+    tokenizers,
+    doc_orders,
     print_time
     )
-from skip_list import SkipList
+from index_writer import IndexWriter, set_tokenizer
+from segment import Segment, get_segment_directory_names, set_segment_directory_names
+from shard import get_shard_index, set_shard_directory_names
 
 # Database for zones
 '''
@@ -55,90 +48,99 @@ while should_decrement:
 
 start_time = time()
 
-with open('stopwords.txt') as f:
-    stopwords = set(map(lambda ln: ln.strip(), f.readlines()))
-
 '''
 Create a dictionary[lemma] -> sorted([(doc id, tf)]) and write to the dictionary and postings file
     - dictionary is a dictionary whose keys are lemmas and whose values are sorted posting lists
     - postings will then be converted into a skip list with sqrt(len(postings)) skip pointers 
+    - see index_writer.py for the in-memory index and the file formats
+The index can be split into number_of_segments independent segments (see segment.py)
+    - Row i of the CSV file goes to segment (i % number_of_segments), and segment 0 is the main index
+    - If segment_directory_name is given, only that segment is (re)built from the CSV file
+Or the index can be partitioned into number_of_shards shards by doc id hash (see shard.py)
+    - Every shard is a segment directory listed in shards.txt, and there is no main index
+Documents are analyzed with the given tokenizer (see analyzer.py), which becomes the tokenizer of the index
+    - A rebuilt segment keeps the tokenizer of the index unless one is given
+The documents of every segment are numbered in the given doc order (see doc_map.py), which compaction keeps
 '''
-def do_indexing(csv_file_path, dictionary_file_name, postings_file_name):
-    dictionary = {}
-    lengths_by_document = {}
-    nltk_texts_by_document = {}
-    seen_postings_by_lemma = {}
+def do_indexing(csv_file_path, dictionary_file_name, postings_file_name,
+    number_of_segments=1, segment_directory_name=None, number_of_shards=0, tokenizer=None, doc_order=doc_orders[0]):
+    if tokenizer is not None or segment_directory_name is None:
+        set_tokenizer(tokenizer or tokenizers[0])
+    index_writers = [IndexWriter() for i in range(number_of_shards or number_of_segments)]
+    for index_writer in index_writers:
+        index_writer.set_doc_order(doc_order)
     with open(csv_file_path, 'r', errors='ignore') as f:
         reader = csv.reader(f)
         # Get column headers and move read pointer
         # filter(None) helps remove falsey columns (e.g. blank)
         # columns expected value = ['document_id', 'title', 'content', 'date_posted', 'court']
         columns = list(filter(None, next(reader)))
-        N = 0
-        for csv_row in reader: # Uncomment this line if not testing
+        for row_index, csv_row in enumerate(reader): # Uncomment this line if not testing
         # for i in range(100): # Comment this line if not testing
             # csv_row = next(reader) # Comment this line if not testing
-            N += 1
             document_id, title, content, date_posted, court = csv_row
             # BEGIN procedure index content (i.e. vector space model indexing)
-            nltk_text, text_counter = get_preprocessed(content)
             posting = int(document_id)
-            lengths_by_document[posting] = sum(text_counter.values())
-            nltk_texts_by_document[posting] = nltk_text
-            for lemma, frequency in text_counter.items():
-                posting_frequency_tuple = (posting, frequency)
-                if lemma not in dictionary:
-                    dictionary[lemma] = [posting_frequency_tuple]
-                    seen_postings_by_lemma[lemma] = set((posting,))
-                else:
-                    if posting not in seen_postings_by_lemma[lemma]:
-                        bisect.insort(dictionary[lemma], posting_frequency_tuple)
-                        seen_postings_by_lemma[lemma].add(posting)
+            if number_of_shards:
+                index_writer = index_writers[get_shard_index(posting, number_of_shards)]
+            else:
+                index_writer = index_writers[row_index % number_of_segments]
+            index_writer.add_document(posting, content,
+                { 'title': title, 'court': court, 'date_posted': date_posted })
             # END procedure
             '''
             c.execute('INSERT INTO {} VALUES (?, ?, ?, ?)'.format(zones_table_name),
                 (document_id, title, date_posted, court))
         conn.commit()
         '''
-    with open(dictionary_file_name, 'w') as d, open(postings_file_name, 'wb') as p:
-        for lemma in dictionary:
-            d.write('{lemma},{offset}\n'.format(lemma=lemma, offset=p.tell()))
-            postings = dictionary[lemma]
-            pickle.dump(postings, p)
-    with open(lengths_file_name, 'wb') as l:
-        pickle.dump(N, l)
-        pickle.dump(lengths_by_document, l)
-    with open(nltk_offsets_file_name, 'w') as i, open(nltk_texts_file_name, 'wb') as t:
-        for doc_id, nltk_text in nltk_texts_by_document.items():
-            i.write('{doc_id},{offset}\n'.format(doc_id=doc_id, offset=t.tell()))
-            pickle.dump(nltk_text, t)
+    if segment_directory_name is not None:
+        # Rebuild (or add) a single segment without touching the other segments
+        write_segment(index_writers[0], Segment(segment_directory_name))
+        segment_directory_names = get_segment_directory_names()
+        if segment_directory_name not in segment_directory_names:
+            set_segment_directory_names(segment_directory_names + [segment_directory_name])
+        return
+    # A fresh index has no deleted documents, no delta segment and no segments or shards except those written here
+    for directory_name in (delta_directory_name, segments_directory_name, shards_directory_name):
+        if os.path.isdir(directory_name):
+            shutil.rmtree(directory_name)
+    set_segment_directory_names([])
+    set_shard_directory_names([])
+    if number_of_shards:
+        # There is no main index either, so the files of one written before are removed (update.py would update it)
+        main_index = Segment(os.curdir, dictionary_file_name, postings_file_name)
+        for file_name in main_index.get_index_file_names() + (main_index.get_file_name(deletions_file_name),):
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        shards = [Segment(os.path.join(shards_directory_name, str(i))) for i in range(number_of_shards)]
+        for index_writer, shard in zip(index_writers, shards):
+            write_segment(index_writer, shard)
+        set_shard_directory_names(list(map(lambda shard: shard.get_directory_name(), shards)))
+        return
+    segments = [Segment(os.curdir, dictionary_file_name, postings_file_name)] + [
+        Segment(os.path.join(segments_directory_name, str(i))) for i in range(1, number_of_segments)]
+    for index_writer, segment in zip(index_writers, segments):
+        write_segment(index_writer, segment)
+    set_segment_directory_names(list(map(lambda segment: segment.get_directory_name(), segments[1:])))
 
-'''
-Preprocess a text string in the following order:
-    1. Do word tokenization
-    2. Do case-folding
-    3. Filter out punctuations, non-alphabetical words, and stopwords
-    4. Lemmatize the remaining words
-    5. Return a tuple of nltk.Text(output from step 1) and
-        Counter of lemmatized words from step 4 (i.e. {lemma: frequency})
-'''
-def get_preprocessed(text):
-    tokens = word_tokenize(text.strip())
-    tokens_to_index = map(
-        lemmatizer.lemmatize,
-        filter(
-            lambda token: token not in string.punctuation and token.isalpha() and token not in stopwords,
-            map(str.lower, tokens)
-            )
-        )
-    return (Text(tokens), Counter(tokens_to_index))
+def write_segment(index_writer, segment):
+    os.makedirs(segment.get_directory_name(), exist_ok=True)
+    index_writer.write(*segment.get_index_file_names())
+    if os.path.exists(segment.get_file_name(deletions_file_name)):
+        os.remove(segment.get_file_name(deletions_file_name))
 
 def usage():
-    print('Usage: ' + sys.argv[0] + ' -i dataset-file -d dictionary-file -p postings-file')
+    print('Usage: ' + sys.argv[0] + ' -i dataset-file -d dictionary-file -p postings-file '
+        + '[-n number-of-segments] [-s segment-directory] [-k number-of-shards] '
+        + '[-t tokenizer (' + '|'.join(tokenizers) + ')] [-r doc-order (' + '|'.join(doc_orders) + ')]')
 
-input_directory_d = output_file_d = output_file_p = None
+input_directory_d = output_file_d = output_file_p = segment_directory_s = None
+number_of_segments_n = 1
+number_of_shards_k = 0
+tokenizer_t = None
+doc_order_r = doc_orders[0]
 try:
-    opts, args = getopt.getopt(sys.argv[1:], 'i:d:p:')
+    opts, args = getopt.getopt(sys.argv[1:], 'i:d:p:n:s:k:t:r:')
 except (getopt.GetoptError, err) as e:
     usage()
     sys.exit(2)
@@ -149,13 +151,26 @@ for o, a in opts:
         output_file_d = a
     elif o == '-p':
         output_file_p = a
+    elif o == '-n':
+        number_of_segments_n = int(a)
+    elif o == '-s':
+        segment_directory_s = a
+    elif o == '-k':
+        number_of_shards_k = int(a)
+    elif o == '-t':
+        tokenizer_t = a
+    elif o == '-r':
+        doc_order_r = a
     else:
         assert False, 'Unhandled option'
-if input_directory_d == None or output_file_d == None or output_file_p == None:
+if input_directory_d == None or output_file_d == None or output_file_p == None or number_of_segments_n < 1 \
+    or number_of_shards_k < 0 or (number_of_shards_k and (number_of_segments_n > 1 or segment_directory_s)) \
+    or tokenizer_t not in tokenizers + [None] or doc_order_r not in doc_orders:
     usage()
     sys.exit(2)
 
-do_indexing(input_directory_d, output_file_d, output_file_p)
+do_indexing(input_directory_d, output_file_d, output_file_p,
+    number_of_segments_n, segment_directory_s, number_of_shards_k, tokenizer_t, doc_order_r)
 stop_time = time()
 print_time(start_time, stop_time)
 # conn.close()
@@ -0,0 +1,234 @@
+#!/usr/bin/python
+import sys
+import getopt
+
+import os
+import json
+import heapq
+import pickle
+
+from collections import Counter
+from itertools import groupby
+
+from time import time
+
+from constants import (
+    positions_file_name,
+    forward_index_file_name,
+    zone_separator,
+    index_stats_top_n,
+    index_stats_checkpoints,
+    print_time
+    )
+from positions import encode_positions
+from segment import Segment, get_segments
+from shard import get_shard_directory_names
+
+start_time = time()
+
+# Bytes of the fixed-width encoding of one posting, i.e. doc id and tf as two 32-bit integers
+fixed_posting_length = 8
+
+'''
+Stream the dictionary and postings file of every segment (or shard) of an index and report
+    - the number of terms (content lemmas and zone terms) and postings, and the bytes per posting
+    - the df histogram (power of 2 buckets) with the share of postings and postings bytes of every bucket
+    - the pickle overhead of every list, i.e. its pickled bytes minus the bytes of its fixed-width encoding
+    - the top n terms by decoded (in-memory) size, i.e. the lists which cost the most to load
+    - the estimated postings file size under alternative encodings of every list
+    - the vocabulary growth, i.e. the number of distinct terms after every n documents (by doc id)
+The lists of every segment are read in term order and merged by term, so a term is counted (and ranked) once
+with its lists of every segment: its df is the sum of their dfs, and its bytes the sum of their bytes
+The lists of a term are dropped before the next term, so only the top n terms, the histogram and the first doc id
+of every term are held in memory
+'''
+def do_profiling(dictionary_file_name, postings_file_name, top_n):
+    shard_directory_names = get_shard_directory_names()
+    if shard_directory_names:
+        segments = list(map(Segment, shard_directory_names))
+    else:
+        segments = get_segments(dictionary_file_name, postings_file_name)
+    stats = {
+        'segments': len(segments),
+        'documents': 0,
+        'terms': 0,
+        'terms_by_zone': {},
+        'postings': 0,
+        'postings_bytes': 0,
+        'dictionary_bytes': 0,
+        'positions_bytes': 0,
+        'forward_index_bytes': 0,
+        'pickle_overhead_bytes': 0,
+        'df_histogram': {},
+        'encodings_bytes': { 'pickle': 0, 'fixed': 0, 'varint_gaps': 0, 'varint_gaps_without_tf': 0 }
+    }
+    top_terms = [] # min heap of (decoded bytes, term, df, pickled bytes) of the top n terms
+    first_doc_id_by_term = {} # { term: first doc id of the term in any segment }
+    doc_ids = set()
+    segment_postings_lists = []
+    for segment in segments:
+        segment.load_lengths()
+        doc_ids.update(segment.get_doc_map().get_doc_ids())
+        stats['documents'] += segment.get_length()
+        stats['dictionary_bytes'] += os.path.getsize(segment.get_index_file_names()[0])
+        if os.path.exists(segment.get_file_name(positions_file_name)):
+            stats['positions_bytes'] += os.path.getsize(segment.get_file_name(positions_file_name))
+        if os.path.exists(segment.get_file_name(forward_index_file_name)):
+            stats['forward_index_bytes'] += os.path.getsize(segment.get_file_name(forward_index_file_name))
+        segment_postings_lists.append(get_postings_lists(segment))
+    for term, postings_lists in groupby(
+        heapq.merge(*segment_postings_lists, key=lambda postings_list: postings_list[0]),
+        key=lambda postings_list: postings_list[0]):
+        postings_lists = list(postings_lists) # [(term, postings, pickled bytes, segment)] of every segment
+        df = sum(map(lambda postings_list: len(postings_list[1]), postings_lists))
+        pickled_length = sum(map(lambda postings_list: postings_list[2], postings_lists))
+        stats['terms'] += 1
+        zone_name = term.split(zone_separator)[0] if zone_separator in term else 'content'
+        stats['terms_by_zone'][zone_name] = stats['terms_by_zone'].get(zone_name, 0) + 1
+        stats['postings'] += df
+        stats['postings_bytes'] += pickled_length
+        stats['pickle_overhead_bytes'] += pickled_length - df * fixed_posting_length
+        bucket = get_df_bucket(df)
+        bucket_stats = stats['df_histogram'].setdefault(bucket, { 'terms': 0, 'postings': 0, 'bytes': 0 })
+        bucket_stats['terms'] += 1
+        bucket_stats['postings'] += df
+        bucket_stats['bytes'] += pickled_length
+        decoded_length = 0
+        for term, postings, segment_pickled_length, segment in postings_lists:
+            # Every list is encoded on its own, as it is stored
+            for encoding_name, length in get_encoding_lengths(postings, segment_pickled_length).items():
+                stats['encodings_bytes'][encoding_name] += length
+            decoded_length += get_decoded_length(postings)
+            if postings:
+                # The postings are by doc ordinal, whose doc ids are not in ascending order for every doc order
+                segment_doc_ids = segment.get_doc_map().get_doc_ids()
+                first_doc_id = min(map(lambda posting: segment_doc_ids[posting[0]], postings))
+                first_doc_id_by_term[term] = min(first_doc_id, first_doc_id_by_term.get(term, first_doc_id))
+        top_term = (decoded_length, term, df, pickled_length)
+        if len(top_terms) < top_n:
+            heapq.heappush(top_terms, top_term)
+        elif top_term > top_terms[0]:
+            heapq.heapreplace(top_terms, top_term)
+    stats['bytes_per_posting'] = stats['postings_bytes'] / stats['postings'] if stats['postings'] else 0
+    stats['df_histogram'] = [dict(df_range=get_df_range(bucket), **stats['df_histogram'][bucket])
+        for bucket in sorted(stats['df_histogram'])]
+    stats['top_terms'] = [{ 'term': term, 'df': df, 'decoded_bytes': decoded_length, 'pickled_bytes': pickled_length }
+        for decoded_length, term, df, pickled_length in sorted(top_terms, reverse=True)]
+    stats['distinct_terms'] = len(first_doc_id_by_term)
+    stats['vocabulary_growth'] = get_vocabulary_growth(sorted(doc_ids), Counter(first_doc_id_by_term.values()))
+    return stats
+
+# Accepts a segment and
+# Returns a generator of (term, postings, pickled bytes, segment) of every list in the postings file, in term order
+def get_postings_lists(segment):
+    dictionary_file_name, postings_file_name = segment.get_index_file_names()[:2]
+    with open(dictionary_file_name, errors='ignore') as d:
+        term_offset_tuples = sorted(map(lambda line: get_term_offset_tuple(line.rstrip()), d))
+    with open(postings_file_name, 'rb') as p:
+        for term, offset in term_offset_tuples:
+            p.seek(offset)
+            postings = pickle.load(p)
+            if segment.get_deletions().get_count():
+                postings = [posting for posting in postings if posting[0] not in segment.get_deletions()]
+            yield (term, postings, p.tell() - offset, segment)
+
+# A term can contain commas (e.g. a zone term of a date), so the offset is after the last comma
+def get_term_offset_tuple(line):
+    term, offset = line.rsplit(',', 1)
+    return (term, int(offset))
+
+# Bucket b holds the dfs in [2^b, 2^(b+1))
+def get_df_bucket(df): return max(df, 1).bit_length() - 1
+
+def get_df_range(bucket): return '{}-{}'.format(2 ** bucket, 2 ** (bucket + 1) - 1)
+
+# Accepts postings and their pickled bytes and
+# Returns { encoding name: bytes of the postings in that encoding }
+def get_encoding_lengths(postings, pickled_length):
+    gaps_length = len(encode_positions(map(lambda posting: posting[0], postings)))
+    return {
+        'pickle': pickled_length,
+        'fixed': len(postings) * fixed_posting_length,
+        'varint_gaps': gaps_length + sum(map(lambda posting: get_varint_length(posting[1]), postings)),
+        'varint_gaps_without_tf': gaps_length
+    }
+
+def get_varint_length(value): return max(1, (value.bit_length() + 6) // 7)
+
+# Accepts postings and
+# Returns an estimate of their size once unpickled, i.e. the list, every tuple and every int in it
+# (small ints are shared by CPython, so this is an upper bound)
+def get_decoded_length(postings):
+    return sys.getsizeof(postings) + sum(map(lambda posting:
+        sys.getsizeof(posting) + sys.getsizeof(posting[0]) + sys.getsizeof(posting[1]), postings))
+
+# Accepts the sorted doc ids and { doc id: number of terms first seen in that doc id } and
+# Returns [(number of documents, number of distinct terms)] at evenly spaced checkpoints
+def get_vocabulary_growth(sorted_doc_ids, first_doc_id_counts):
+    if not sorted_doc_ids:
+        return []
+    step = max(1, len(sorted_doc_ids) // index_stats_checkpoints)
+    growth = []
+    number_of_terms = 0
+    for i, doc_id in enumerate(sorted_doc_ids, 1):
+        number_of_terms += first_doc_id_counts.get(doc_id, 0)
+        if i % step == 0 or i == len(sorted_doc_ids):
+            growth.append((i, number_of_terms))
+    return growth
+
+def print_stats(stats):
+    print('{segments} segment(s), {documents} documents, {terms} terms, {postings} postings'.format(**stats))
+    print('Terms by zone: ' + ', '.join(map(lambda item: '{}={}'.format(*item), sorted(stats['terms_by_zone'].items()))))
+    print('Dictionary: {dictionary_bytes} bytes, postings: {postings_bytes} bytes ({bytes_per_posting:.2f} bytes per '
+        'posting, {pickle_overhead_bytes} bytes of pickle overhead), positions: {positions_bytes} bytes, '
+        'forward index: {forward_index_bytes} bytes'.format(**stats))
+    print('\ndf histogram:')
+    print('{:>14} {:>10} {:>12} {:>14} {:>8}'.format('df', 'terms', 'postings', 'bytes', 'bytes%'))
+    for bucket_stats in stats['df_histogram']:
+        print('{:>14} {:>10} {:>12} {:>14} {:>7.1f}%'.format(bucket_stats['df_range'], bucket_stats['terms'],
+            bucket_stats['postings'], bucket_stats['bytes'], get_percentage(bucket_stats['bytes'], stats['postings_bytes'])))
+    print('\nTop {} terms by decoded size:'.format(len(stats['top_terms'])))
+    print('{:>30} {:>10} {:>14} {:>14}'.format('term', 'df', 'decoded bytes', 'pickled bytes'))
+    for top_term in stats['top_terms']:
+        print('{term:>30} {df:>10} {decoded_bytes:>14} {pickled_bytes:>14}'.format(**top_term))
+    print('\nEstimated postings bytes by encoding:')
+    for encoding_name, length in stats['encodings_bytes'].items():
+        print('{:>24} {:>14} {:>7.1f}%'.format(encoding_name, length, get_percentage(length, stats['postings_bytes'])))
+    print('\nVocabulary growth (documents, terms):')
+    print(' '.join(map(lambda checkpoint: '({}, {})'.format(*checkpoint), stats['vocabulary_growth'])))
+
+def get_percentage(part, whole): return 100 * part / whole if whole else 0
+
+def usage():
+    print('Usage: ' + sys.argv[0] + ' -d dictionary-file -p postings-file [-n top-n] [-o output-json-file]')
+
+dictionary_file_d = postings_file_p = output_file_o = None
+top_n = index_stats_top_n
+try:
+    opts, args = getopt.getopt(sys.argv[1:], 'd:p:n:o:')
+except getopt.GetoptError:
+    usage()
+    sys.exit(2)
+for o, a in opts:
+    if o == '-d':
+        dictionary_file_d = a
+    elif o == '-p':
+        postings_file_p = a
+    elif o == '-n':
+        top_n = int(a)
+    elif o == '-o':
+        output_file_o = a
+    else:
+        assert False, 'Unhandled option'
+if dictionary_file_d == None or postings_file_p == None:
+    usage()
+    sys.exit(2)
+
+stats = do_profiling(dictionary_file_d, postings_file_p, top_n)
+print_stats(stats)
+if output_file_o is not None:
+    with open(output_file_o, 'w') as o:
+        json.dump(stats, o, indent=2)
+        o.write('\n')
+stop_time = time()
+print_time(start_time, stop_time)
@@ -0,0 +1,225 @@
+### Shared by index.py (main index) and update.py (delta segment and compaction) ###
+
+import nltk
+
+import os
+import bisect
+import pickle
+
+from collections import Counter
+
+nltk.download('wordnet')
+
+from nltk import Text
+
+from constants import doc_orders, get_zone_term
+from analyzer import Analyzer, load_tokenizer, save_tokenizer
+from doc_map import DocMap, get_doc_order
+from lengths import DocumentLengths
+from metadata import MetadataStore
+from positions import encode_positions
+from term_index import TermIndex
+from spelling import KGramIndex
+from forward_index import ForwardIndexBuilder
+
+# Documents are analyzed with the tokenizer of the index (see set_tokenizer), so update.py appends
+# documents with the tokenizer that index.py used
+analyzer = Analyzer(load_tokenizer(), 'lemma')
+
+'''
+An in-memory dictionary[lemma] -> sorted([(doc id, tf)]) plus the per-document data needed by search.py
+    - dictionary is a dictionary whose keys are lemmas and whose values are sorted posting lists
+    - lengths_by_document is { doc_id: number of significant tokens }
+    - nltk_texts_by_document is { doc_id: nltk.Text } for query expansion
+    - zones (e.g. title, court) are indexed as tagged postings in the same dictionary,
+        e.g. dictionary['title:contract'] -> sorted([(doc id, tf of contract in the title)])
+    - metadata_by_document is { doc_id: (date_posted, court) } for the metadata store (see metadata.py)
+    - positions_by_lemma is { lemma: { doc_id: gap encoded positions } } for phrase queries (see positions.py),
+        zone terms have no positions
+Documents are held by doc id, and are numbered by doc ordinal (in doc_order, see doc_map.py) when the index is written
+The forward index (see forward_index.py) is built from the dictionary while its postings are written
+'''
+class IndexWriter:
+    doc_order = doc_orders[0]
+    dictionary = None
+    lengths_by_document = None
+    nltk_texts_by_document = None
+    metadata_by_document = None
+    positions_by_lemma = None
+    seen_postings_by_lemma = None
+
+    def __init__(self):
+        self.dictionary = {}
+        self.lengths_by_document = {}
+        self.nltk_texts_by_document = {}
+        self.metadata_by_document = {}
+        self.positions_by_lemma = {}
+        self.seen_postings_by_lemma = {}
+
+    def get_length(self): return len(self.lengths_by_document)
+
+    def set_doc_order(self, doc_order): self.doc_order = doc_order
+
+    def has_document(self, posting): return posting in self.lengths_by_document
+
+    # zones is { zone name: zone text } e.g. { 'title': ..., 'court': ..., 'date_posted': ... }
+    def add_document(self, posting, content, zones=None):
+        nltk_text, text_counter, lemma_positions = get_preprocessed(content)
+        self.add_preprocessed(posting, nltk_text, text_counter, lemma_positions)
+        if zones:
+            self.metadata_by_document[posting] = (zones.get('date_posted', ''), zones.get('court', ''))
+            for zone_name, zone_text in zones.items():
+                for lemma, frequency in get_zone_preprocessed(zone_name, zone_text).items():
+                    self.add_posting(get_zone_term(zone_name, lemma), posting, frequency)
+
+    def add_preprocessed(self, posting, nltk_text, text_counter, lemma_positions):
+        self.lengths_by_document[posting] = sum(text_counter.values())
+        self.nltk_texts_by_document[posting] = nltk_text
+        for lemma, frequency in text_counter.items():
+            self.add_posting(lemma, posting, frequency)
+            self.positions_by_lemma.setdefault(lemma, {})[posting] = encode_positions(lemma_positions[lemma])
+
+    def add_posting(self, lemma, posting, frequency):
+        posting_frequency_tuple = (posting, frequency)
+        if lemma not in self.dictionary:
+            self.dictionary[lemma] = [posting_frequency_tuple]
+            self.seen_postings_by_lemma[lemma] = set((posting,))
+        else:
+            if posting not in self.seen_postings_by_lemma[lemma]:
+                bisect.insort(self.dictionary[lemma], posting_frequency_tuple)
+                self.seen_postings_by_lemma[lemma].add(posting)
+
+    # Removes every trace of a document (used when a delta document is deleted or replaced)
+    def remove_document(self, posting):
+        if posting not in self.lengths_by_document:
+            return
+        del self.lengths_by_document[posting]
+        self.nltk_texts_by_document.pop(posting, None)
+        self.metadata_by_document.pop(posting, None)
+        for lemma in list(self.positions_by_lemma):
+            self.positions_by_lemma[lemma].pop(posting, None)
+            if not self.positions_by_lemma[lemma]:
+                del self.positions_by_lemma[lemma]
+        for lemma in list(self.dictionary):
+            if posting in self.seen_postings_by_lemma[lemma]:
+                self.seen_postings_by_lemma[lemma].discard(posting)
+                self.dictionary[lemma] = [posting_frequency_tuple
+                    for posting_frequency_tuple in self.dictionary[lemma]
+                    if posting_frequency_tuple[0] != posting]
+                if not self.dictionary[lemma]:
+                    del self.dictionary[lemma]
+                    del self.seen_postings_by_lemma[lemma]
+
+    def write(self, dictionary_file_name, postings_file_name, lengths_file_name,
+        nltk_offsets_file_name, nltk_texts_file_name, metadata_file_name,
+        positions_offsets_file_name, positions_file_name, term_index_file_name, kgram_index_file_name,
+        forward_index_file_name, doc_map_file_name):
+        doc_map = DocMap.build_from(
+            get_doc_order(self.lengths_by_document, self.metadata_by_document, self.doc_order), self.doc_order)
+        ordinals_by_doc_id = doc_map.get_ordinals_by_doc_id()
+        forward_index_builder = ForwardIndexBuilder()
+        with open(dictionary_file_name, 'w') as d, open(postings_file_name, 'wb') as p:
+            for lemma in self.dictionary:
+                d.write('{lemma},{offset}\n'.format(lemma=lemma, offset=p.tell()))
+                postings = get_ordinal_postings(self.dictionary[lemma], ordinals_by_doc_id)
+                pickle.dump(postings, p)
+                forward_index_builder.add_postings(lemma, postings)
+        with open(doc_map_file_name, 'wb') as o:
+            doc_map.dump(o)
+        with open(lengths_file_name, 'wb') as l:
+            DocumentLengths.build_from(map(self.lengths_by_document.__getitem__, doc_map.get_doc_ids())).dump(l)
+        with open(nltk_offsets_file_name, 'w') as i, open(nltk_texts_file_name, 'wb') as t:
+            for doc_id, nltk_text in self.nltk_texts_by_document.items():
+                i.write('{doc_id},{offset}\n'.format(doc_id=doc_id, offset=t.tell()))
+                pickle.dump(nltk_text, t)
+        with open(metadata_file_name, 'wb') as m:
+            MetadataStore.build_from(self.metadata_by_document, doc_map.get_doc_ids()).dump(m)
+        with open(positions_offsets_file_name, 'w') as i, open(positions_file_name, 'wb') as t:
+            for lemma, positions_by_document in self.positions_by_lemma.items():
+                i.write('{lemma},{offset}\n'.format(lemma=lemma, offset=t.tell()))
+                pickle.dump({ ordinals_by_doc_id[doc_id]: positions
+                    for doc_id, positions in positions_by_document.items() }, t)
+        sorted_terms = write_lexicon(self.dictionary, term_index_file_name, kgram_index_file_name)
+        with open(forward_index_file_name, 'wb') as f:
+            forward_index_builder.dump(sorted_terms, self.get_length(), f)
+
+    # Reloads an index written by write() so that more documents can be appended to it
+    @staticmethod
+    def load(dictionary_file_name, postings_file_name, lengths_file_name,
+        nltk_offsets_file_name, nltk_texts_file_name, metadata_file_name,
+        positions_offsets_file_name, positions_file_name, term_index_file_name, kgram_index_file_name,
+        forward_index_file_name, doc_map_file_name):
+        index_writer = IndexWriter()
+        if not os.path.exists(dictionary_file_name):
+            return index_writer
+        with open(doc_map_file_name, 'rb') as o:
+            doc_map = DocMap.load(o)
+        doc_ids = doc_map.get_doc_ids()
+        index_writer.doc_order = doc_map.get_doc_order()
+        with open(dictionary_file_name) as d, open(postings_file_name, 'rb') as p:
+            for line in d:
+                lemma = line.rstrip().rsplit(',', 1)[0]
+                postings = get_doc_id_postings(pickle.load(p), doc_ids)
+                index_writer.dictionary[lemma] = postings
+                index_writer.seen_postings_by_lemma[lemma] = set(map(lambda posting: posting[0], postings))
+        document_lengths = DocumentLengths.load(open(lengths_file_name, 'rb'))
+        index_writer.lengths_by_document = dict(zip(doc_ids, document_lengths.get_lengths()))
+        document_lengths.close()
+        with open(nltk_offsets_file_name) as i, open(nltk_texts_file_name, 'rb') as t:
+            for line in i:
+                doc_id = int(line.rstrip().split(',')[0])
+                index_writer.nltk_texts_by_document[doc_id] = pickle.load(t)
+        if os.path.exists(metadata_file_name):
+            with open(metadata_file_name, 'rb') as m:
+                index_writer.metadata_by_document = MetadataStore.load(m).to_dict()
+        if os.path.exists(positions_offsets_file_name):
+            with open(positions_offsets_file_name) as i, open(positions_file_name, 'rb') as t:
+                for line in i:
+                    lemma = line.rstrip().rsplit(',', 1)[0]
+                    index_writer.positions_by_lemma[lemma] = { doc_ids[ordinal]: positions
+                        for ordinal, positions in pickle.load(t).items() }
+        return index_writer
+
+# Accepts postings [(doc id, tf)] and { doc_id: ordinal } and returns the postings [(ordinal, tf)] sorted by ordinal
+def get_ordinal_postings(postings, ordinals_by_doc_id):
+    return sorted(map(lambda posting: (ordinals_by_doc_id[posting[0]], posting[1]), postings))
+
+# Accepts postings [(ordinal, tf)] and the doc id of every ordinal and returns the postings [(doc id, tf)] sorted by doc id
+def get_doc_id_postings(postings, doc_ids):
+    return sorted(map(lambda posting: (doc_ids[posting[0]], posting[1]), postings))
+
+# Accepts the terms of a segment and writes its term index (see term_index.py) and k-gram index (see spelling.py)
+# Returns the sorted terms, whose indexes are the term ids of the segment
+def write_lexicon(terms, term_index_file_name, kgram_index_file_name):
+    term_index = TermIndex.build_from(terms)
+    with open(term_index_file_name, 'wb') as t:
+        term_index.dump(t)
+    with open(kgram_index_file_name, 'wb') as k:
+        KGramIndex.build_from(term_index.get_sorted_terms()).dump(k)
+    return term_index.get_sorted_terms()
+
+# Sets the tokenizer of the analyzer of every document from now on, and saves it as the tokenizer of the index
+def set_tokenizer(tokenizer):
+    global analyzer
+    analyzer = Analyzer(tokenizer, 'lemma')
+    save_tokenizer(tokenizer)
+
+'''
+Preprocess a text string with the analyzer (see analyzer.py) and
+Return a tuple of nltk.Text(word tokens),
+    Counter of lemmatized words (i.e. {lemma: frequency}) and
+    the positions of the lemmatized words in the word tokens (i.e. {lemma: [position]})
+'''
+def get_preprocessed(text):
+    tokens = analyzer.get_tokens(text.strip())
+    lemma_positions = analyzer.get_term_positions(tokens)
+    text_counter = Counter({ lemma: len(positions) for lemma, positions in lemma_positions.items() })
+    return (Text(tokens), text_counter, lemma_positions)
+
+# Accepts a zone name and the zone text and returns the Counter of terms to index in the zone
+# date_posted (e.g. '2016-04-05 00:00:00') is indexed by year only, the other zones like the content
+def get_zone_preprocessed(zone_name, text):
+    if zone_name == 'date_posted':
+        year = text.strip()[:4]
+        return Counter((year,)) if year.isdigit() else Counter()
+    return Counter(analyzer.get_terms(text.strip()))
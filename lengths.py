@@ -0,0 +1,62 @@
+### Lengths of the documents of a segment as an int32 array, read through mmap ###
+
+import mmap
+import struct
+
+from array import array
+
+# Number of documents as an int64
+header_format = '<q'
+
+'''
+The length (number of significant tokens) of every document of a segment, addressed by the doc ordinals of the
+segment (see doc_map.py), by which search.py normalizes the tfidf of the document
+    - The file is the number of documents n, then the lengths (int32 * n)
+The file is mapped into memory and its lengths are cast to an int32 view, so opening it reads nothing
+and a length is an array read
+'''
+class DocumentLengths:
+    file_object = None
+    file_map = None
+    buffer = None   # memoryview of file_map
+    lengths = None
+
+    def __init__(self):
+        self.buffer = memoryview(b'')
+        self.lengths = array('i')
+
+    # Number of documents in the segment (i.e. N of the segment, including deleted documents)
+    def get_length(self): return len(self.lengths)
+
+    # Returns the lengths indexed by doc ordinal
+    def get_lengths(self): return self.lengths
+
+    # Accepts the length of every doc ordinal and returns the lengths
+    @staticmethod
+    def build_from(lengths):
+        document_lengths = DocumentLengths()
+        document_lengths.lengths = array('i', lengths)
+        return document_lengths
+
+    def dump(self, file_object):
+        file_object.write(struct.pack(header_format, self.get_length()))
+        file_object.write(self.lengths.tobytes())
+
+    # The file object is kept open (and mapped) by the lengths
+    @staticmethod
+    def load(file_object):
+        document_lengths = DocumentLengths()
+        document_lengths.file_object = file_object
+        document_lengths.file_map = mmap.mmap(file_object.fileno(), 0, access=mmap.ACCESS_READ)
+        document_lengths.buffer = memoryview(document_lengths.file_map)
+        length = struct.unpack_from(header_format, document_lengths.buffer)[0]
+        lengths_offset = struct.calcsize(header_format)
+        document_lengths.lengths = document_lengths.buffer[lengths_offset:lengths_offset + length * 4].cast('i')
+        return document_lengths
+
+    def close(self):
+        if self.file_object is not None:
+            self.lengths.release()
+            self.buffer.release()
+            self.file_map.close()
+            self.file_object.close()
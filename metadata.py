@@ -0,0 +1,119 @@
+### A columnar store of the date_posted and court of every document, with fast filters on them ###
+
+import pickle
+
+from array import array
+from datetime import date, datetime
+
+from bitmap import Bitmap
+
+# Stands for a missing or unparseable date_posted in the dates column
+missing_date = -2 ** 31
+
+'''
+Columns are aligned by the doc ordinals of the segment (see doc_map.py):
+    - doc_ids is an int64 array of doc ids
+    - dates is an int32 array of date_posted as days since 1970-01-01
+    - courts is a uint16 array of court codes, where court_names[code] is the court name
+    - court_bitmaps[code] is a Bitmap of the doc ordinals of the documents from that court
+The file is a pickled header followed by the raw columns and the raw court bitmaps
+'''
+class MetadataStore:
+    doc_ids = None
+    dates = None
+    courts = None
+    court_names = None
+    court_bitmaps = None
+
+    def __init__(self):
+        self.doc_ids = array('q')
+        self.dates = array('i')
+        self.courts = array('H')
+        self.court_names = []
+        self.court_bitmaps = []
+
+    def get_length(self): return len(self.doc_ids)
+    def get_court_names(self): return self.court_names
+
+    # Accepts { doc_id: (date_posted, court) } (as in the CSV file) and the doc ids in ordinal order (ascending
+    # doc ids of the metadata if not given) and returns the store of those documents
+    @staticmethod
+    def build_from(metadata_by_document, doc_ids=None):
+        metadata_store = MetadataStore()
+        codes_by_court = {}
+        for ordinal, doc_id in enumerate(doc_ids if doc_ids is not None else sorted(metadata_by_document)):
+            date_posted, court = metadata_by_document.get(doc_id, ('', ''))
+            court = court.strip()
+            if court not in codes_by_court:
+                codes_by_court[court] = len(metadata_store.court_names)
+                metadata_store.court_names.append(court)
+                metadata_store.court_bitmaps.append(Bitmap())
+            metadata_store.doc_ids.append(doc_id)
+            metadata_store.dates.append(get_epoch_days(date_posted))
+            metadata_store.courts.append(codes_by_court[court])
+            metadata_store.court_bitmaps[codes_by_court[court]].add(ordinal)
+        return metadata_store
+
+    # Returns { doc_id: (date_posted, court) } so that the store can be rebuilt with other documents
+    def to_dict(self):
+        return { doc_id: (get_date_string(days), self.court_names[code])
+            for doc_id, days, code in zip(self.doc_ids, self.dates, self.courts) }
+
+    def dump(self, file_object):
+        bitmap_length = (self.get_length() + 7) // 8
+        pickle.dump({
+            'length': self.get_length(),
+            'court_names': self.court_names,
+            'bitmap_length': bitmap_length
+            }, file_object)
+        self.doc_ids.tofile(file_object)
+        self.dates.tofile(file_object)
+        self.courts.tofile(file_object)
+        for court_bitmap in self.court_bitmaps:
+            file_object.write(bytes(court_bitmap.get_data()).ljust(bitmap_length, b'\0'))
+
+    @staticmethod
+    def load(file_object):
+        metadata_store = MetadataStore()
+        header = pickle.load(file_object)
+        metadata_store.doc_ids.fromfile(file_object, header['length'])
+        metadata_store.dates.fromfile(file_object, header['length'])
+        metadata_store.courts.fromfile(file_object, header['length'])
+        metadata_store.court_names = header['court_names']
+        metadata_store.court_bitmaps = [Bitmap(file_object.read(header['bitmap_length']))
+            for court_name in header['court_names']]
+        return metadata_store
+
+    # Accepts an optional court name and an optional inclusive date range ('YYYY-MM-DD') and
+    # Returns a Bitmap of the doc ordinals of the documents which satisfy every given filter
+    def get_filter(self, court_name=None, date_from=None, date_to=None):
+        if court_name is not None:
+            lowered_court_names = list(map(str.lower, self.court_names))
+            if court_name.strip().lower() not in lowered_court_names:
+                return Bitmap()
+            ordinals = self.court_bitmaps[lowered_court_names.index(court_name.strip().lower())].to_list()
+        else:
+            ordinals = range(self.get_length())
+        # A document without a date (missing_date) is only dropped by a date filter
+        is_date_filtered = date_from is not None or date_to is not None
+        days_from = get_epoch_days(date_from) if date_from is not None else missing_date + 1
+        days_to = get_epoch_days(date_to) if date_to is not None else 2 ** 31 - 1
+        doc_filter = Bitmap()
+        dates = self.dates
+        for ordinal in ordinals:
+            if not is_date_filtered or days_from <= dates[ordinal] <= days_to:
+                doc_filter.add(ordinal)
+        return doc_filter
+
+# Accepts a date string that starts with YYYY-MM-DD (e.g. '2016-04-05 00:00:00') and
+# Returns the number of days since 1970-01-01
+def get_epoch_days(date_string):
+    try:
+        return (datetime.strptime(date_string.strip()[:10], '%Y-%m-%d').date() - date(1970, 1, 1)).days
+    except ValueError:
+        return missing_date
+
+def get_date_string(days):
+    if days == missing_date:
+        return ''
+    return date.fromordinal(date(1970, 1, 1).toordinal() + days).isoformat()
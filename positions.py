@@ -0,0 +1,53 @@
+### Gap encoded token positions and the phrase (and proximity) match on them ###
+
+from bisect import bisect_left
+
+'''
+The positions of a lemma in a document are stored as gaps between sorted positions, each gap
+as a variable-length integer (7 bits per byte, the high bit set on every byte but the last)
+    e.g. [3, 5, 130] -> gaps [3, 2, 125] -> b'\x03\x02\x7d'
+Positions are indexes into the word tokens of the document (as in its nltk.Text), so stopwords and
+punctuation still take up a position
+'''
+def encode_positions(positions):
+    encoded = bytearray()
+    previous_position = 0
+    for position in positions:
+        gap = position - previous_position
+        previous_position = position
+        while gap >= 0x80:
+            encoded.append((gap & 0x7f) | 0x80)
+            gap >>= 7
+        encoded.append(gap)
+    return bytes(encoded)
+
+def decode_positions(encoded):
+    positions = []
+    position = gap = shift = 0
+    for byte in encoded:
+        gap |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        position += gap
+        positions.append(position)
+        gap = shift = 0
+    return positions
+
+'''
+Accepts the decoded positions of every lemma of a phrase in one document, the offset of every lemma
+in the phrase (e.g. [0, 2] for "breach of duty") and the slop, and
+Returns True if there is an occurrence of the first lemma at some position p such that every other lemma
+occurs within slop tokens of p + its offset (slop 0 is an exact phrase match)
+'''
+def has_phrase(positions_by_lemma, offsets, slop=0):
+    first_positions = positions_by_lemma[0]
+    for first_position in first_positions:
+        for positions, offset in zip(positions_by_lemma[1:], offsets[1:]):
+            expected_position = first_position + offset - offsets[0]
+            i = bisect_left(positions, expected_position - slop)
+            if i == len(positions) or positions[i] > expected_position + slop:
+                break
+        else:
+            return True
+    return False
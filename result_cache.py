@@ -0,0 +1,135 @@
+### A persistent cache of the ranked documents of analyzed queries, invalidated by any change to the index ###
+
+import os
+import pickle
+import sqlite3
+
+from collections import Counter
+from hashlib import sha1
+
+from constants import (
+    analyzer_file_name,
+    deletions_file_name,
+    segments_file_name,
+    shards_file_name,
+    result_cache_max_bytes
+    )
+from segment import Segment, get_segments
+from shard import get_shard_directory_names
+
+'''
+Maps a query key (see get_query_key) to the ranked [(doc_id, tfidf)] written for it, in an SQLite file
+    - Every entry is stored with the fingerprint of the index it was ranked on (see get_index_fingerprint),
+        and entries of any other fingerprint are dropped when the cache is opened, so re-indexing, updating
+        or compacting the index invalidates the whole cache
+    - Once the results of all entries take more than max_bytes, the least recently used entries are evicted
+    - The number of hits, misses and evictions is kept in the file across runs (see get_stats)
+'''
+class ResultCache:
+    connection = None
+    fingerprint = None
+    max_bytes = 0
+
+    def __init__(self, cache_file_name, fingerprint, max_bytes=result_cache_max_bytes):
+        self.connection = sqlite3.connect(cache_file_name)
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, fingerprint TEXT, '
+            'results BLOB, length INTEGER, last_used INTEGER)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)')
+        self.connection.execute('DELETE FROM results WHERE fingerprint != ?', (fingerprint,))
+        self.connection.commit()
+
+    # Accepts a query key and returns its [(doc_id, tfidf)], or None if it is not cached
+    def get(self, key):
+        row = self.connection.execute('SELECT results FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.add_stat('misses')
+            self.connection.commit()
+            return None
+        self.connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (self.get_clock(), key))
+        self.add_stat('hits')
+        self.connection.commit()
+        return pickle.loads(row[0])
+
+    # Accepts a query key and its [(doc_id, tfidf)]
+    def put(self, key, id_tfidf_tuples):
+        results = pickle.dumps(id_tfidf_tuples)
+        if len(results) > self.max_bytes:
+            return
+        self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+            (key, self.fingerprint, results, len(results), self.get_clock()))
+        self.evict()
+        self.connection.commit()
+
+    # Evicts the least recently used entries until the results of all entries take at most max_bytes
+    def evict(self):
+        total_length = self.connection.execute('SELECT COALESCE(SUM(length), 0) FROM results').fetchone()[0]
+        if total_length <= self.max_bytes:
+            return
+        evicted_keys = []
+        for key, length in self.connection.execute('SELECT key, length FROM results ORDER BY last_used'):
+            if total_length <= self.max_bytes:
+                break
+            evicted_keys.append((key,))
+            total_length -= length
+        self.connection.executemany('DELETE FROM results WHERE key = ?', evicted_keys)
+        self.add_stat('evictions', len(evicted_keys))
+
+    # Returns the next value of a counter kept in the file, which orders the uses of the entries across runs
+    def get_clock(self):
+        self.add_stat('clock')
+        return self.connection.execute('SELECT value FROM stats WHERE name = ?', ('clock',)).fetchone()[0]
+
+    def add_stat(self, name, value=1):
+        self.connection.execute('INSERT OR IGNORE INTO stats VALUES (?, 0)', (name,))
+        self.connection.execute('UPDATE stats SET value = value + ? WHERE name = ?', (value, name))
+
+    # Returns { 'hits', 'misses', 'evictions', 'hit_rate', 'entries', 'bytes' } of the cache over every run
+    def get_stats(self):
+        stats = dict(self.connection.execute('SELECT name, value FROM stats'))
+        hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+        entries, length = self.connection.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM results').fetchone()
+        return {
+            'hits': hits,
+            'misses': misses,
+            'evictions': stats.get('evictions', 0),
+            'hit_rate': hits / (hits + misses) if hits + misses else 0,
+            'entries': entries,
+            'bytes': length
+        }
+
+    def close(self):
+        self.connection.close()
+
+'''
+Accepts the main dictionary and postings file names and
+Returns a digest of the name, size and modification time of every file of the index, i.e. of every segment
+    (or shard) with its deletions, and of the files listing the segments, shards and tokenizer of the index
+'''
+def get_index_fingerprint(dictionary_file_name, postings_file_name):
+    shard_directory_names = get_shard_directory_names()
+    if shard_directory_names:
+        segments = list(map(Segment, shard_directory_names))
+    else:
+        segments = get_segments(dictionary_file_name, postings_file_name)
+    file_names = [analyzer_file_name, segments_file_name, shards_file_name]
+    for segment in segments:
+        file_names.extend(segment.get_index_file_names())
+        file_names.append(segment.get_file_name(deletions_file_name))
+    digest = sha1()
+    for file_name in file_names:
+        if os.path.exists(file_name):
+            stat = os.stat(file_name)
+            digest.update('{}\0{}\0{}\n'.format(file_name, stat.st_size, stat.st_mtime_ns).encode())
+    return digest.hexdigest()
+
+'''
+Accepts the analyzed parts of a query which its results depend on, its filters and k and
+Returns the key of the query, so that queries which are analyzed to the same terms share their results
+    (e.g. 'Contracts AND the breach' and 'breach AND contract')
+'''
+def get_query_key(tokens_for_blr, tokens_for_vsm, phrases, wildcards, is_boolean, filters, k):
+    query = (sorted(set(tokens_for_blr)), sorted(Counter(tokens_for_vsm).items()), sorted(phrases), sorted(wildcards),
+        is_boolean, filters, k)
+    return sha1(repr(query).encode()).hexdigest()
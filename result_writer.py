@@ -0,0 +1,64 @@
+### Streams the ranked documents of every query to the output file in chunks ###
+
+import struct
+
+from itertools import islice
+
+from constants import output_formats, output_chunk_size
+
+'''
+Writes one line (text) or one record list (binary) per query from a generator of (doc_id, tfidf),
+    so that the ranked documents are never held in memory (or joined into one string) all at once
+    - text: doc ids separated by spaces, one query per line (as before)
+    - binary: chunks of (number of documents as int32, then doc id as int32 and tfidf as float32 for every
+        document), all little-endian, and a chunk of 0 documents ends the query
+'''
+class ResultWriter:
+    file_object = None
+    output_format = None
+    chunk_size = 0
+
+    def __init__(self, file_object, output_format=output_formats[0], chunk_size=output_chunk_size):
+        self.file_object = file_object
+        self.output_format = output_format
+        self.chunk_size = chunk_size
+
+    def write_results(self, id_tfidf_tuples):
+        id_tfidf_tuples = iter(id_tfidf_tuples)
+        is_first_chunk = True
+        while True:
+            chunk = list(islice(id_tfidf_tuples, self.chunk_size))
+            if self.output_format == 'binary':
+                self.file_object.write(struct.pack('<i', len(chunk)))
+                self.file_object.write(b''.join(map(
+                    lambda id_tfidf_tuple: struct.pack('<if', int(id_tfidf_tuple[0]), id_tfidf_tuple[1]),
+                    chunk)))
+            elif chunk:
+                if not is_first_chunk:
+                    self.file_object.write(' ')
+                self.file_object.write(' '.join(map(lambda id_tfidf_tuple: str(id_tfidf_tuple[0]), chunk)))
+            if not chunk:
+                break
+            is_first_chunk = False
+        if self.output_format != 'binary':
+            self.file_object.write('\n')
+
+# Accepts an output format and returns the mode to open the output file with
+def get_output_file_mode(output_format):
+    return 'wb' if output_format == 'binary' else 'w'
+
+# Accepts a binary output file handle and
+# Returns a generator of the [(doc_id, tfidf)] of every query in the file
+def read_results(file_object):
+    id_tfidf_tuples = []
+    while True:
+        header = file_object.read(4)
+        if not header:
+            return
+        length = struct.unpack('<i', header)[0]
+        if not length:
+            yield id_tfidf_tuples
+            id_tfidf_tuples = []
+            continue
+        values = struct.unpack('<' + 'if' * length, file_object.read(8 * length))
+        id_tfidf_tuples.extend(zip(values[0::2], values[1::2]))
@@ -3,32 +3,46 @@ import nltk
 import sys
 import getopt
 
-import pickle
+import re
 import string
 import sqlite3
 
 from collections import Counter
-from functools import reduce
-from math import log10
+from concurrent.futures import ThreadPoolExecutor
+from heapq import merge, nlargest
+from itertools import chain, islice
 from time import time
 
 nltk.download('wordnet')
 
 from nltk.corpus import wordnet as wn
-from nltk.stem.wordnet import WordNetLemmatizer
-lemmatizer = WordNetLemmatizer()
 
 from constants import (
-    lengths_file_name,
-    nltk_offsets_file_name,
-    nltk_texts_file_name,
     database_file_name,
     zones_table_name,
     and_operator_name,
+    zone_names,
+    zone_separator,
+    zone_weights,
+    get_zone_term,
+    all_results,
+    output_formats,
+    wildcard_character,
+    max_wildcard_expansions,
+    max_edit_distance,
+    result_cache_file_name,
+    query_expansion_modes,
+    rocchio_expansion_length,
     print_time
     )
-from skip_list import SkipList
-from nltk_context_index import ContextIndex
+from analyzer import Analyzer, get_query_words, load_tokenizer
+from segment import get_segments
+from segment_search import SegmentSearcher
+from shard import ShardClient, get_shard_directory_names
+from term_index import is_wildcard
+from result_cache import ResultCache, get_index_fingerprint, get_query_key
+from result_writer import ResultWriter, get_output_file_mode
+from tracing import span, add_count, begin_query, end_query, enable_tracing, write_trace
 
 # Database for zones
 '''
@@ -38,72 +52,131 @@ c = conn.cursor()
 
 start_time = time()
 
-dictionary = {}         # { lemma: postings skip list}
-postings_offsets = {}   # { lemma: postings offset }
-nltk_texts = {}         # { doc_id: nltk.Text }
-nltk_offsets = {}       # { doc_id: nltk text offset }
+searchers = []          # [SegmentSearcher] of every segment (the main index first), or [ShardClient]
 
 # Variables made global because they are read across functions
 N = 0
-lengths_by_document = {}
 
-with open('stopwords.txt') as f:
-    stopwords = set(map(lambda ln: ln.strip(), f.readlines()))
+# Queries are analyzed like the documents of the index (see analyzer.py)
+analyzer = Analyzer(load_tokenizer(), 'lemma')
+
+# A quoted phrase, optionally followed by ~slop for a proximity query, e.g. "fiduciary duty" or "breach duty"~3
+phrase_pattern = re.compile(r'"([^"]+)"(?:~(\d+))?')
+# Punctuation stripped from the ends of a wildcard or of a boolean operand (the wildcard character is kept)
+wildcard_punctuation = string.punctuation.replace(wildcard_character, '')
 
 # MAIN function for search.py
-def do_searching(dictionary_file_name, postings_file_name, queries_file_name, output_file_name):
+def do_searching(dictionary_file_name, postings_file_name, queries_file_name, output_file_name,
+    court_name=None, date_from=None, date_to=None, k=None, output_format=output_formats[0],
+    is_spelling_corrected=False, is_result_cached=False, expansion_mode=query_expansion_modes[0], scoring_threads=0):
     global N
-    global lengths_by_document
-    with open(dictionary_file_name, errors='ignore') as d, \
-        open(postings_file_name, 'rb') as p, \
-        open(queries_file_name) as q, \
-        open(output_file_name, 'w') as o, \
-        open(lengths_file_name, 'rb') as l, \
-        open(nltk_offsets_file_name) as i, \
-        open(nltk_texts_file_name, 'rb') as t:
-        # nltk_offsets_file_name and nltk_texts_file_name are for query expansion
-        # Build the offsets dictionaries for seeking later
-        for line in d:
-            lemma, postings_offset = line.rstrip().split(',')
-            postings_offsets[lemma] = int(postings_offset)
-        # Uncomment the below block if doing semi-auto/auto query expansion
-        for line in i:
-            doc_id, nltk_text_offset = line.rstrip().split(',')
-            nltk_offsets[doc_id] = int(nltk_text_offset)
-        # Load the following data from the lengths file:
-        # 1. Total number of documents in the collection
-        # 2. Length of each document (key is the doc_id)
-        N = pickle.load(l)
-        lengths_by_document = pickle.load(l)
+    global searchers
+    with open(queries_file_name) as q, open(output_file_name, get_output_file_mode(output_format)) as o:
+        # Ranked documents are streamed to the output file in chunks (see result_writer.py)
+        result_writer = ResultWriter(o, output_format)
+        # If the index is sharded (index.py -k), every shard is searched by a local worker process
+        # (see shard.py), otherwise every segment of the index is searched in this process
+        # Every segment builds its own offsets dictionaries and loads its own lengths and deletions
+        # The nltk offsets and texts of every segment are for query expansion
+        shard_directory_names = get_shard_directory_names()
+        if shard_directory_names:
+            searchers = list(map(ShardClient, shard_directory_names))
+        else:
+            searchers = list(map(
+                lambda segment: SegmentSearcher(segment.open()),
+                get_segments(dictionary_file_name, postings_file_name)))
+        # Total number of live documents in the collection (i.e. over all segments or shards) for a global idf
+        N = sum(map(lambda searcher: searcher.get_length(), searchers))
+        # Metadata filters (see metadata.py) resolve to a doc id bitmap per segment once for every query
+        for searcher in searchers:
+            searcher.set_filter(court_name, date_from, date_to)
+        # Every segment or shard can also score the lemmas of a query at the same time (see segment_search.py)
+        if scoring_threads:
+            for searcher in searchers:
+                searcher.set_scoring_threads(scoring_threads)
+        # Segments and shards are disjoint sets of documents, so each query fans out to all of them at once
+        executor = ThreadPoolExecutor(max_workers=len(searchers))
+        # Query lemmas which are in no segment are corrected to the closest term of the index (see spelling.py)
+        # Only the terms kept by the analyzer are corrected (see get_query_terms and get_phrases), and every lemma
+        # only once, so a lemma of both a phrase and the rest of the query is looked up and reported once
+        corrected_terms = {} # { lemma: corrected term }
+        correct = (lambda lemma: corrected_terms[lemma] if lemma in corrected_terms
+            else corrected_terms.setdefault(lemma, get_corrected_term(lemma, executor))) \
+            if is_spelling_corrected else None
+        # Ranked documents are cached across runs for the index as it is now (see result_cache.py)
+        result_cache = None
+        if is_result_cached:
+            result_cache = ResultCache(result_cache_file_name,
+                get_index_fingerprint(dictionary_file_name, postings_file_name))
         # Process each query one-by-one but with the same resources
         # I.e. Duplicate lemmas and nltk.Text are loaded only once
         for line in q:
-            lemmas, tokens_for_blr, tokens_for_vsm = get_parsed_query(line)
+            # Phases of the query are timed by tracing spans (see tracing.py), which do nothing unless -t is given
+            begin_query(line.rstrip())
+            with span('get_parsed_query'):
+                lemmas, tokens_for_blr, tokens_for_vsm = get_parsed_query(line, correct)
+                # A phrase is also an AND of its lemmas, so that its positions are only checked on boolean
+                # retrieved docs
+                phrases = get_phrases(line, correct)
+                for phrase_lemmas, offsets, slop in phrases:
+                    tokens_for_blr = tokens_for_blr + list(filter(
+                        lambda lemma: lemma not in tokens_for_blr, phrase_lemmas))
+
+            # A query analyzed to the same terms as a cached query skips every phase below
+            if result_cache is not None:
+                with span('result_cache_get'):
+                    query_key = get_query_key(tokens_for_blr, tokens_for_vsm, phrases, get_wildcards(line),
+                        is_boolean_query(line), (court_name, date_from, date_to, expansion_mode), k)
+                    cached_docs = result_cache.get(query_key)
+                if cached_docs is not None:
+                    add_count('result_cache_hits')
+                    print('Cached results of the query: {} documents'.format(len(cached_docs)))
+                    with span('write_results'):
+                        result_writer.write_results(cached_docs)
+                    end_query()
+                    break
+                add_count('result_cache_misses')
 
             # Uncomment the below block if doing any thesaurus-based query expansion
             # Get all synonyms for each query lemma
-            synonyms_by_lemma = { lemma: list(filter(
-                lambda synonym: synonym != lemma and '_' not in synonym,
-                set(sum(
-                    map(
-                        lambda synset: list(map(str.lower, synset.lemma_names())),
-                        wn.synsets(lemma)),
-                    [])
-                )))
-            for lemma in lemmas }
+            with span('wordnet_synsets'):
+                synonyms_by_lemma = { lemma: list(filter(
+                    lambda synonym: synonym != lemma and '_' not in synonym,
+                    set(sum(
+                        map(
+                            lambda synset: list(map(str.lower, synset.lemma_names())),
+                            wn.synsets(lemma)),
+                        [])
+                    )))
+                for lemma in lemmas }
+
+            # A wildcard (e.g. neglig*) is the OR of the terms it expands to in boolean retrieval,
+            # and every one of these terms is a query term for ranking
+            with span('expand_wildcards'):
+                wildcard_groups = expand_wildcards(get_wildcards(line), executor)
+                blr_wildcard_groups = wildcard_groups if is_boolean_query(line) else []
+                for terms in wildcard_groups:
+                    tokens_for_vsm = tokens_for_vsm + list(filter(lambda term: term not in tokens_for_vsm, terms))
+                    lemmas = lemmas.union(terms)
 
             # Do boolean retrieval first to separate high list (retrieved) from low list
-            blr_length, blr_skip_list = boolean_retrieve(tokens_for_blr, p)
+            with span('boolean_retrieve'):
+                blr_length = boolean_retrieve(tokens_for_blr, phrases, blr_wildcard_groups, executor)
             query_tfs = Counter(tokens_for_vsm) # list of tokens -> {token: frequency}
+            # The lemmas are scored in this order, and the expansion lemmas after them
+            scored_lemmas = list(lemmas)
 
             # Get ranked high and low lists via vector space model
-            most_relevant_docs, less_relevant_docs = get_relevant_docs(
-                blr_skip_list, lemmas, query_tfs,  p)
-            most_relevant_docs, less_relevant_docs = list(most_relevant_docs), list(less_relevant_docs)
+            # The relevant docs of the query expansion are taken from the whole lists, so k only cuts the final ranking
+            with span('get_relevant_docs'):
+                most_relevant_docs, less_relevant_docs = get_relevant_docs(
+                    blr_length, scored_lemmas, query_tfs, executor)
+                most_relevant_docs, less_relevant_docs = \
+                    list(get_doc_ids(most_relevant_docs)), list(get_doc_ids(less_relevant_docs))
 
             # BEGIN procedure for query expansion
             if most_relevant_docs:
-                if tokens_for_blr: # Is boolean query so include all
+                if tokens_for_blr or blr_wildcard_groups: # Is boolean query so include all
                     relevant_docs = most_relevant_docs
                 else: # Not a boolean query so exclude some by a magic percentage (i.e. 50%)
                     relevant_docs = most_relevant_docs[:(len(most_relevant_docs) // 2)]
@@ -122,21 +195,34 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
             # Pure co-occurrence values (but need to determine threshold to accept the new word into the
             # expanded query)
             # query_expansion may contain terms already in the original query, hence we call .difference
-            # query_expansion = get_query_expansion_auto(relevant_docs[:top_k], lemmas, t)
+            # query_expansion = get_query_expansion_auto(relevant_docs[:top_k], lemmas, executor)
 
             # 3. Semi-automatic thesaurus-based query expansion:
             # Synonym lookup via WordNet + co-occurrence filter on synonyms
             # query_expansion may contain terms already in the original query, hence we call .difference
-            query_expansion = get_query_expansion_semi_auto(relevant_docs[:top_k], synonyms_by_lemma, t)
-
-            tokens_for_vsm.extend(query_expansion.difference(tokens_for_vsm))
+            if expansion_mode == 'semi_auto':
+                with span('get_query_expansion_semi_auto'):
+                    query_expansion = get_query_expansion_semi_auto(
+                        relevant_docs[:top_k], synonyms_by_lemma, executor)
+
+            # 4. Rocchio pseudo relevance feedback:
+            # Top weighted terms of the centroid of the document vectors of the relevant docs (search.py -e rocchio)
+            else:
+                with span('get_query_expansion_rocchio'):
+                    query_expansion = get_query_expansion_rocchio(relevant_docs[:top_k], lemmas, executor)
+
+            # The expansion terms are analyzed like the query, and only the new lemmas are added to it
+            expansion_lemmas = get_expansion_lemmas(query_expansion, lemmas)
+            tokens_for_vsm.extend(expansion_lemmas)
             query_tfs = Counter(tokens_for_vsm)
             # END procedure
 
             # Get ranked high and low lists via vector space model, and expanded query
-            most_relevant_docs, less_relevant_docs = get_relevant_docs(
-                blr_skip_list, lemmas, query_tfs, p)
-            most_relevant_docs, less_relevant_docs = list(most_relevant_docs), list(less_relevant_docs)
+            # The lists are left as generators, so only the documents written out are merged and converted
+            # Every segment only scores the expansion lemmas on top of its scores of the first ranking
+            with span('get_relevant_docs_expanded'):
+                most_relevant_docs, less_relevant_docs = get_relevant_docs(
+                    blr_length, scored_lemmas + expansion_lemmas, query_tfs, executor, k, is_expanded=True)
 
             # Only include documents which fail the boolean retrieval phase if:
             # Is not boolean query and all documents fail boolean retrieval
@@ -144,11 +230,24 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
             if not tokens_for_blr and not most_relevant_docs:
                 most_relevant_docs.extend(less_relevant_docs[:(len(less_relevant_docs) // 2)]) # magic filter
             '''
-            # Going for high recall
-            most_relevant_docs.extend(less_relevant_docs)
-            o.write(' '.join(most_relevant_docs))
-            o.write('\n')
+            # Going for high recall (all documents, unless k is given)
+            ranked_docs = islice(chain(most_relevant_docs, less_relevant_docs), k)
+            if result_cache is not None: # the ranked documents are kept for the cache (at most k of them, unless all)
+                ranked_docs = list(ranked_docs)
+            with span('write_results'):
+                result_writer.write_results(ranked_docs)
+            if result_cache is not None:
+                with span('result_cache_put'):
+                    result_cache.put(query_key, ranked_docs)
+            end_query()
             break # because 1 query per file
+        executor.shutdown()
+        if result_cache is not None:
+            print('Result cache: {hits} hits, {misses} misses ({hit_rate:.1%} hit rate), {evictions} evictions, '
+                '{entries} entries of {bytes} bytes'.format(**result_cache.get_stats()))
+            result_cache.close()
+        for searcher in searchers:
+            searcher.close()
 
 '''
 This is a procedure after boolean retrieval
@@ -160,231 +259,237 @@ This is a procedure after boolean retrieval
 - Low-list contains documents ranked by vector space model,
     but fail to be retrieved via boolean retrieval
     (i.e. one or more query terms not existing in the document)
+Every segment (or shard) is ranked in parallel with the same (global) df and N, and
+    the ranked lists of the segments are then merged by descending normalized tfidf
+With k, every segment only ranks its top k documents of each list (with a bounded heap), and
+    the merged lists are cut at k
+If is_expanded, the lemmas are those of the last ranking followed by the expansion lemmas, and every segment
+    only scores the expansion lemmas (see get_expanded_relevant_docs of segment_search.py)
+Returns the (high, low) lists as generators of (doc_id, normalized tfidf)
 '''
-def get_relevant_docs(blr_skip_list, lemmas, query_tfs, p):
-    tfidf_by_document_upp = {}
-    tfidf_by_document_low = {}
-    if blr_skip_list.get_length():
-        for lemma_index, lemma in enumerate(lemmas):
-            query_tfidf = get_tfidf_weight(query_tfs[lemma])
-            df, postings = load_lemma(lemma, p)
-            # BEGIN procedure
-            # "merge" boolean retrieved postings with postings by term
-            # Documents which exist in both skip lists will be considered in the upper rankings
-            # while those which exist only in the term skip list are moved to the lower rankings
-            node_a = blr_skip_list.get_head() # i.e. first node of skip list
-            node_b = postings.get_head()
-            while node_a is not None and node_b is not None:
-                data_a = node_a.get_data()
-                data_b = node_b.get_data()
-                doc_id, doc_tf = data_b
-                if data_a != data_b:
-                    tfidf_by_document_low[doc_id] = get_tfidf_weight(doc_tf, df, N) * query_tfidf
-                    if data_a < data_b:
-                        skip_node_a = node_a.get_skip()
-                        if skip_node_a is not None and skip_node_a.get_data() <= data_b:
-                            node_a = skip_node_a
-                        else:
-                            node_a = node_a.get_next()
-                    elif data_b < data_a:
-                        skip_node_b = node_b.get_skip()
-                        if skip_node_b is not None and skip_node_b.get_data() <= data_a:
-                            node_b = skip_node_b
-                        else:
-                            node_b = node_b.get_next()
-                else:
-                    tfidf_by_document_upp[doc_id] = get_tfidf_weight(doc_tf, df, N) * query_tfidf
-                    node_a = node_a.get_next()
-                    node_b = node_b.get_next()
-            # END procedure
-    else:
-        # Pure vector space model because boolean retrieved postings is empty
-        # Similar procedure to slide 38 of w7 lecture
-        for lemma_index, lemma in enumerate(lemmas):
-            query_tfidf = get_tfidf_weight(query_tfs[lemma])
-            df, postings = load_lemma(lemma, p)
-            node_b = postings.get_head()
-            while node_b is not None:
-                doc_id, doc_tf = node_b.get_data()
-                tfidf_by_document_upp[doc_id] = get_tfidf_weight(doc_tf, df, N) * query_tfidf
-                node_b = node_b.get_next()
-    # Normalization
-    tfidf_by_document_upp = { doc_id: tfidf / lengths_by_document[doc_id] \
-        for doc_id, tfidf in tfidf_by_document_upp.items() }
-    tfidf_by_document_low = { doc_id: tfidf / lengths_by_document[doc_id] \
-        for doc_id, tfidf in tfidf_by_document_low.items() }
-    # Sort dictionary by descending normalized tfidf, and return lists of doc_id
-    most_relevant_docs = list(map(
-        lambda id_tfidf_tuple: str(id_tfidf_tuple[0]),
-        sorted(
-            tfidf_by_document_upp.items(),
-            key=lambda id_tfidf_tuple: id_tfidf_tuple[1],
-            reverse=True)
-        )
-    )
-    less_relevant_docs = map(
-        lambda id_tfidf_tuple: str(id_tfidf_tuple[0]),
-        sorted(
-            tfidf_by_document_low.items(),
-            key=lambda id_tfidf_tuple: id_tfidf_tuple[1],
-            reverse=True)
-        )
+def get_relevant_docs(blr_length, lemmas, query_tfs, executor, k=None, is_expanded=False):
+    lemmas = list(lemmas)
+    # Zone terms of the query lemmas are needed for the zone weights (see get_relevant_docs of segment_search.py)
+    zone_terms = [get_zone_term(zone_name, lemma)
+        for lemma in lemmas if zone_separator not in lemma for zone_name in zone_weights]
+    # df of a lemma in the whole collection is the sum of its df in every segment
+    dfs_by_searcher = executor.map(lambda searcher: searcher.get_dfs(lemmas + zone_terms), searchers)
+    dfs = dict(zip(lemmas + zone_terms, map(sum, zip(*dfs_by_searcher)))) # { lemma: df }
+    ranked_docs_by_searcher = list(executor.map(
+        lambda searcher: (searcher.get_expanded_relevant_docs if is_expanded else searcher.get_relevant_docs)(
+            bool(blr_length), lemmas, query_tfs, dfs, N, k),
+        searchers))
+    most_relevant_docs = islice(merge(
+        *map(lambda ranked_docs: ranked_docs[0], ranked_docs_by_searcher),
+        key=lambda id_tfidf_tuple: id_tfidf_tuple[1],
+        reverse=True), k)
+    less_relevant_docs = islice(merge(
+        *map(lambda ranked_docs: ranked_docs[1], ranked_docs_by_searcher),
+        key=lambda id_tfidf_tuple: id_tfidf_tuple[1],
+        reverse=True), k)
     return (most_relevant_docs, less_relevant_docs)
 
+# Accepts (doc_id, tfidf) tuples and returns a generator of their doc_id strings
+def get_doc_ids(id_tfidf_tuples):
+    return map(lambda id_tfidf_tuple: str(id_tfidf_tuple[0]), id_tfidf_tuples)
+
 '''
 Auto Query expansion procedure abstracted (Pure co-occurrence value comparison)
 Accepts a list of relevant docs i.e. [doc_id] and { lemmas } and
 Returns a set of terms to expand the original query with
-t is the file handler for the binary file containing all nltk.Text
+Every segment (or shard) expands with the relevant docs it holds
 '''
-def get_query_expansion_auto(relevant_docs, lemmas, t):
-    query_expansion = set()
-    for lemma in lemmas:
-        for doc_id in relevant_docs:
-            nltk_text = load_nltk_text(doc_id, t)
-            sim_words = set(get_similar(nltk_text, lemma)) # co-occurrence
-            query_expansion.update(sim_words)
-    return query_expansion
+def get_query_expansion_auto(relevant_docs, lemmas, executor):
+    return set().union(*executor.map(
+        lambda searcher: searcher.get_query_expansion_auto(relevant_docs, lemmas),
+        searchers))
 
 '''
 Semi-auto Query expansion procedure abstracted (WordNet + co-occurrence filter)
 Accepts a list of relevant docs i.e. [doc_id] and { lemma: [synonyms] } and
 Returns a set of terms to expand the original query with
-t is the file handler for the binary file containing all nltk.Text
+Every segment (or shard) expands with the relevant docs it holds
 '''
-def get_query_expansion_semi_auto(relevant_docs, synonyms_by_lemma, t):
+def get_query_expansion_semi_auto(relevant_docs, synonyms_by_lemma, executor):
     print('Executing get_query_expansion_semi_auto...')
-    query_expansion = set()
-    for lemma, synonyms in synonyms_by_lemma.items():
-        # print('Expanding query lemma:', lemma)
-        for doc_id in relevant_docs:
-            nltk_text = load_nltk_text(doc_id, t)
-            sim_words = set(get_similar(nltk_text, lemma)) # co-occurrence
-            query_expansion.update(sim_words.intersection(synonyms))
+    query_expansion = set().union(*executor.map(
+        lambda searcher: searcher.get_query_expansion_semi_auto(relevant_docs, synonyms_by_lemma),
+        searchers))
+    print('Query expansion: {}'.format(str(query_expansion)))
+    return query_expansion
+
+'''
+Rocchio Query expansion procedure abstracted (centroid of the document vectors of the relevant docs)
+Accepts a list of relevant docs i.e. [doc_id] and { lemmas } and
+Returns a set of the rocchio_expansion_length terms with the highest weight in the centroid, other than the lemmas
+Every segment (or shard) sums the vectors of the relevant docs it holds, weighted from its forward index
+    (see forward_index.py), so only the term ids and tfs of every relevant doc are read, instead of its whole nltk.Text
+'''
+def get_query_expansion_rocchio(relevant_docs, lemmas, executor):
+    print('Executing get_query_expansion_rocchio...')
+    centroid = Counter() # the sum of the vectors, which ranks the terms like their mean
+    for weights_by_term in executor.map(
+        lambda searcher: searcher.get_query_expansion_rocchio(relevant_docs), searchers):
+        centroid.update(weights_by_term)
+    query_expansion = set(nlargest(rocchio_expansion_length,
+        filter(lambda term: term not in lemmas, centroid), key=lambda term: (centroid[term], term)))
     print('Query expansion: {}'.format(str(query_expansion)))
     return query_expansion
 
+# Accepts the terms of a query expansion and the lemmas of the query and
+# Returns the lemmas of the expansion terms (see get_query_terms) which are not in the query, once each, in sorted order
+def get_expansion_lemmas(query_expansion, lemmas):
+    return list(filter(lambda lemma: lemma not in lemmas, dict.fromkeys(get_query_terms(sorted(query_expansion)))))
+
 '''
 Boolean retrieval routine (AND only)
-Accepts a list of tokens and returns:
-    tuple(postings length, postings skip list)
-where data of skip list node (i.e. node.get_data()) is:
+Accepts a list of tokens, a list of phrases (see get_phrases) and a list of wildcard groups (see expand_wildcards) and
+Returns the total number of boolean retrieved postings
+Segments (and shards) are disjoint sets of documents, so every segment is retrieved on its own (in parallel)
+and keeps its own postings skip list, where data of skip list node (i.e. node.get_data()) is:
     tuple(doc id, term frequency)
 '''
-def boolean_retrieve(tokens, p):
-    if not tokens:
-        return (0, SkipList())
-    sorted_skip_lists = map(
-        lambda df_postings_tuple: df_postings_tuple[1],
-        sorted(
-            list(map(
-                lambda token: load_lemma(token, p),
-                tokens
-            )))
-        )
-    merged_skip_list = reduce(
-        lambda skip_list_a, skip_list_b: skip_list_a.merge(skip_list_b),
-        sorted_skip_lists)
-    return (merged_skip_list.get_length(), merged_skip_list)
+def boolean_retrieve(tokens, phrases, wildcard_groups, executor):
+    return sum(executor.map(lambda searcher: searcher.boolean_retrieve(tokens, phrases, wildcard_groups), searchers))
+
+'''
+Accepts wildcard patterns (see get_wildcards) and
+Returns the terms every pattern expands to, i.e. the first max_wildcard_expansions matching terms (in sorted order)
+    of all segments (or shards), so that every segment ranks with the same terms
+'''
+def expand_wildcards(patterns, executor):
+    return [sorted(set().union(*executor.map(
+        lambda searcher: searcher.get_wildcard_terms(pattern, max_wildcard_expansions),
+        searchers)))[:max_wildcard_expansions]
+        for pattern in patterns]
 
 '''
 Accepts a line and returns:
     (set of lemmas, lemmas for boolean retrieval, lemmas for vector space model)
 Lemmas for boolean retrieval remains as []
     if there are no 'AND' case-sensitive substrings in the line
+A token of the form zone:word (e.g. title:contract, court:appeal, date_posted:2016) becomes a zone term,
+    whose postings restrict boolean retrieval to (and score) the documents with the word in that zone
+The quotes (and slop) of phrases are dropped here, so the words of a phrase are parsed like any other words
+Wildcards are left to get_wildcards
+If correct is given (see get_corrected_term), it is the spelling correction stage of every lemma other than zone terms
 '''
-def get_parsed_query(line):
+def get_parsed_query(line, correct=None):
+    line = phrase_pattern.sub(lambda match: match.group(1), line)
     operands = line.rstrip().split(and_operator_name.upper()) # assumes boolean operator is only 'AND'
     tokens_for_blr = []
     tokens_for_vsm = []
-    if operands:
-        if len(operands) > 1:
-            operands = map(
-                lambda operand: map(
-                    lambda token: lemmatizer.lemmatize(token),
-                    filter(
-                        lambda token: is_significant_token(token),
-                        operand.strip(string.punctuation).lower().split(' ')
-                        )
-                    ),
-                operands)
-            for tokens in operands:
-                tokens_for_blr.extend(tokens)
-            tokens_for_vsm = tokens_for_blr
-        else: # no boolean operators found (i.e. do pure vector space model retrieval)
-            tokens_for_vsm = operands[0].split(' ')
+    if len(operands) > 1:
+        tokens_for_blr = get_query_terms(chain.from_iterable(
+            get_query_words(operand.lower()) for operand in operands), correct)
+        tokens_for_vsm = tokens_for_blr
+    else: # no boolean operators found (i.e. do pure vector space model retrieval)
+        tokens_for_vsm = get_query_terms(get_query_words(operands[0].lower()), correct)
     return (set(tokens_for_vsm), tokens_for_blr, tokens_for_vsm)
 
-def is_significant_token(token):
-    return token not in string.punctuation and token.isalpha() and token not in stopwords
-
-# Accepts a lemma, a postings file handle, and
-# Returns the loaded postings skip list while storing it in memory
-def load_lemma(lemma, postings_file_object):
-    global dictionary
-    if lemma in dictionary:
-        return dictionary[lemma]
-    postings = SkipList()
-    if lemma in postings_offsets:
-        postings_file_object.seek(postings_offsets[lemma])
-        postings.build_from(pickle.load(postings_file_object))
-    dictionary[lemma] = (postings.get_length(), postings)
-    return dictionary[lemma]
-
-# Accepts a doc_id, a nltk text file handle, and
-# Returns the loaded nltk.Text while storing it in memory
-def load_nltk_text(doc_id, nltk_texts_file_object):
-    global nltk_texts
-    if doc_id in nltk_texts:
-        return nltk_texts[doc_id]
-    text = ''
-    if doc_id in nltk_offsets:
-        nltk_texts_file_object.seek(nltk_offsets[doc_id])
-        text = pickle.load(nltk_texts_file_object)
-    nltk_texts[doc_id] = text
-    return nltk_texts[doc_id]
-
-def get_tfidf_weight(tf, df=0, N=0):
-    tf_weight = 0
-    idf_weight = 1
-    if tf:
-        tf_weight = 1 + log10(tf)
-    if df:
-        idf_weight = log10(N / df)
-    return tf_weight * idf_weight
-
-### WARNING: I ONLY CHANGED THE RETURN TYPE, OTHERWISE WHOLESALE COPYING ###
-# Adapted from: http://www.nltk.org/_modules/nltk/text.html
-def get_similar(nltk_text, word, num=20):
-    """
-    Distributional similarity: find other words which appear in the
-    same contexts as the specified word; list most similar words first.
-
-    :param word: The word used to seed the similarity search
-    :type word: str
-    :param num: The number of words to generate (default=20)
-    :type num: int
-    :seealso: ContextIndex.similar_words()
-    """
-    if '_word_context_index' not in nltk_text.__dict__:
-        nltk_text._word_context_index = ContextIndex(
-            nltk_text.tokens,
-            filter=lambda x: x.isalpha(),
-            key=lambda s: s.lower())
-    word = word.lower()
-    wci = nltk_text._word_context_index._word_to_contexts
-    if word in wci.conditions():
-        contexts = set(wci[word])
-        fd = Counter(w for w in wci.conditions() for c in wci[w] if c in contexts and not w == word)
-        return [w for w, _ in fd.most_common(num)]
-    return []
+def is_boolean_query(line):
+    return len(line.split(and_operator_name.upper())) > 1
+
+# Accepts a line and returns its wildcard patterns, case-folded and without surrounding punctuation (but *)
+# E.g. 'neglig* AND title:contr*' -> ['neglig*', 'title:contr*']
+def get_wildcards(line):
+    return [word.strip(wildcard_punctuation).lower()
+        for word in get_query_words(phrase_pattern.sub(lambda match: match.group(1), line)) if is_wildcard(word)]
+
+'''
+Accepts a line and returns the phrases in it as a list of:
+    (lemmas, offsets of the lemmas in the phrase tokens, slop)
+E.g. "breach of duty"~2 -> (['breach', 'duty'], [0, 2], 2), as stopwords still take up a position
+Phrases of less than 2 lemmas are left to the other lemmas of the query
+'''
+def get_phrases(line, correct=None):
+    phrases = []
+    for match in phrase_pattern.finditer(line):
+        if is_wildcard(match.group(1)): # the words of the phrase are left to boolean retrieval and ranking
+            continue
+        lemmas = []
+        offsets = []
+        for offset, word in enumerate(map(str.lower, analyzer.get_tokens(match.group(1)))):
+            if analyzer.is_significant(word):
+                lemma = analyzer.normalize(word)
+                lemmas.append(correct(lemma) if correct is not None else lemma)
+                offsets.append(offset)
+        if len(lemmas) > 1:
+            phrases.append((lemmas, offsets, int(match.group(2) or 0)))
+    return phrases
+
+'''
+Spelling correction stage of get_parsed_query (search.py -s)
+Accepts a query lemma and returns it if it is in the index (or is not a word), else the term of the index within
+    max_edit_distance of it with the least edit distance and then the highest df (over all segments or shards),
+    or the lemma itself if there is no such term
+'''
+def get_corrected_term(lemma, executor):
+    if not lemma.isalpha() or sum(map(lambda dfs: dfs[0], executor.map(
+        lambda searcher: searcher.get_dfs([lemma]), searchers))):
+        return lemma
+    distances = {} # { candidate term: edit distance }, which is the same in every segment
+    for candidates in executor.map(
+        lambda searcher: searcher.get_spelling_candidates(lemma, max_edit_distance), searchers):
+        distances.update(candidates)
+    candidate_terms = sorted(distances)
+    dfs = map(sum, zip(*executor.map(lambda searcher: searcher.get_dfs(candidate_terms), searchers)))
+    ranked_candidates = sorted(filter(lambda term_df_tuple: term_df_tuple[1], zip(candidate_terms, dfs)),
+        key=lambda term_df_tuple: (distances[term_df_tuple[0]], -term_df_tuple[1]))
+    if not ranked_candidates:
+        return lemma
+    print('Corrected {} to {}'.format(lemma, ranked_candidates[0][0]))
+    return ranked_candidates[0][0]
+
+# Accepts the case-folded words of a query and
+# Returns the terms of its significant words (see get_query_term) in order, spelling corrected if correct is given
+# Free text and boolean operands are analyzed alike, and like the documents of the index (see analyzer.py)
+def get_query_terms(words, correct=None):
+    terms = []
+    for word in words:
+        if is_wildcard(word): # left to get_wildcards
+            continue
+        term = get_query_term(word.strip(wildcard_punctuation))
+        if term and correct is not None and not is_zone_token(term):
+            term = correct(term)
+        if term:
+            terms.append(term)
+    return terms
+
+# Accepts a case-folded token and
+# Returns its lemma, its zone term (e.g. 'title:contract' for 'title:contracts'), or None if it is insignificant
+def get_query_term(token):
+    if is_zone_token(token):
+        zone_name, word = token.split(zone_separator, 1)
+        if word.isdigit() or analyzer.is_significant(word):
+            return get_zone_term(zone_name, analyzer.normalize(word))
+        return None
+    if analyzer.is_significant(token):
+        return analyzer.normalize(token)
+    return None
+
+def is_zone_token(token):
+    return token.split(zone_separator, 1)[0].lower() in zone_names and zone_separator in token
 
 def usage():
-    print('Usage: ' + sys.argv[0] + ' -d dictionary-file -p postings-file -q query-file -o output-file-of-results')
+    print('Usage: ' + sys.argv[0] + ' -d dictionary-file -p postings-file -q query-file -o output-file-of-results '
+        + '[-c court] [-a date-from] [-b date-to] (dates as YYYY-MM-DD) [-k number-of-results|all] '
+        + '[-f output-format (' + '|'.join(output_formats) + ')] '
+        + '[-t trace-file (JSON lines, or a Chrome trace if it ends with .json)] [-s (correct spelling)] '
+        + '[-r (cache results)] [-e query-expansion (' + '|'.join(query_expansion_modes) + ')] '
+        + '[-j number-of-scoring-threads]')
 
 input_file_d = input_file_p = input_file_q = output_file_o = None
+court_name = date_from = date_to = None
+k = None
+output_format = output_formats[0]
+trace_file_t = None
+is_spelling_corrected_s = False
+is_result_cached_r = False
+expansion_mode_e = query_expansion_modes[0]
+scoring_threads_j = 0
 try:
-    opts, args = getopt.getopt(sys.argv[1:], 'd:p:q:o:')
+    opts, args = getopt.getopt(sys.argv[1:], 'd:p:q:o:c:a:b:k:f:t:sre:j:')
 except (getopt.GetoptError, err) as e:
     usage()
     sys.exit(2)
@@ -397,13 +502,39 @@ for o, a in opts:
         input_file_q = a
     elif o == '-o':
         output_file_o = a
+    elif o == '-c':
+        court_name = a
+    elif o == '-a':
+        date_from = a
+    elif o == '-b':
+        date_to = a
+    elif o == '-k':
+        k = None if a == all_results else int(a)
+    elif o == '-f':
+        output_format = a
+    elif o == '-t':
+        trace_file_t = a
+    elif o == '-s':
+        is_spelling_corrected_s = True
+    elif o == '-r':
+        is_result_cached_r = True
+    elif o == '-e':
+        expansion_mode_e = a
+    elif o == '-j':
+        scoring_threads_j = int(a)
     else:
         assert False, 'Unhandled option'
-if input_file_d == None or input_file_p == None or input_file_q == None or output_file_o == None:
+if input_file_d == None or input_file_p == None or input_file_q == None or output_file_o == None \
+    or output_format not in output_formats or expansion_mode_e not in query_expansion_modes or scoring_threads_j < 0:
     usage()
     sys.exit(2)
 
-do_searching(input_file_d, input_file_p, input_file_q, output_file_o)
+if trace_file_t is not None:
+    enable_tracing()
+do_searching(input_file_d, input_file_p, input_file_q, output_file_o, court_name, date_from, date_to, k, output_format,
+    is_spelling_corrected_s, is_result_cached_r, expansion_mode_e, scoring_threads_j)
 stop_time = time()
 print_time(start_time, stop_time)
+if trace_file_t is not None:
+    write_trace(trace_file_t)
 # conn.close()
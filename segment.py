@@ -0,0 +1,277 @@
+### A segment is an independent index with its own dictionary, postings, lengths, nltk texts and deletions ###
+
+import os
+import pickle
+import threading
+
+from constants import (
+    lengths_file_name,
+    nltk_offsets_file_name,
+    nltk_texts_file_name,
+    metadata_file_name,
+    positions_offsets_file_name,
+    positions_file_name,
+    term_index_file_name,
+    kgram_index_file_name,
+    forward_index_file_name,
+    doc_map_file_name,
+    deletions_file_name,
+    delta_directory_name,
+    segments_file_name,
+    segment_dictionary_file_name,
+    segment_postings_file_name
+    )
+from bitmap import Bitmap
+from doc_map import DocMap
+from lengths import DocumentLengths
+from metadata import MetadataStore
+from term_index import TermIndex
+from spelling import KGramIndex
+from forward_index import ForwardIndex
+from skip_list import SkipList
+from tracing import span, add_count
+
+'''
+Every file of a segment lives in directory_name
+    - The main index is the segment in the working directory whose dictionary and postings file names
+        are given on the command line
+    - Every other segment (see segments.txt and the delta segment) uses the fixed names in constants.py
+Postings, positions, lengths and deletions are by doc ordinal (see doc_map.py), and only the doc ids of the ranked
+documents are looked up in the doc map
+'''
+class Segment:
+    directory_name = None
+    dictionary_file_name = None
+    postings_file_name = None
+    N = 0
+    document_lengths = None # length of every doc ordinal (see lengths.py)
+    doc_map = None
+    deletions = None        # Bitmap of deleted doc ordinals
+    metadata_store = None
+    term_index = None
+    kgram_index = None
+    forward_index = None
+    dictionary = None       # { lemma: (df, postings skip list of (doc ordinal, tf)) }
+    postings_offsets = None # { lemma: postings offset }
+    nltk_texts = None       # { doc_id: nltk.Text }
+    nltk_offsets = None     # { doc_id: nltk text offset }
+    positions = None        # { lemma: { doc ordinal: gap encoded positions } }
+    positions_offsets = None # { lemma: positions offset }
+    postings_file = None
+    nltk_texts_file = None
+    positions_file = None
+    postings_lock = None    # held while the postings file is read, as lemmas can be loaded by several threads
+
+    def __init__(self, directory_name, dictionary_file_name=segment_dictionary_file_name,
+        postings_file_name=segment_postings_file_name):
+        self.directory_name = directory_name
+        self.dictionary_file_name = dictionary_file_name
+        self.postings_file_name = postings_file_name
+        self.document_lengths = DocumentLengths()
+        self.doc_map = DocMap()
+        self.deletions = Bitmap()
+        self.dictionary = {}
+        self.postings_offsets = {}
+        self.nltk_texts = {}
+        self.nltk_offsets = {}
+        self.positions = {}
+        self.positions_offsets = {}
+        self.postings_lock = threading.Lock()
+
+    def get_directory_name(self): return self.directory_name
+    def get_file_name(self, file_name): return os.path.join(self.directory_name, file_name)
+
+    # Returns the file names in the order taken by IndexWriter.write and IndexWriter.load
+    def get_index_file_names(self):
+        return tuple(map(self.get_file_name, (self.dictionary_file_name, self.postings_file_name,
+            lengths_file_name, nltk_offsets_file_name, nltk_texts_file_name, metadata_file_name,
+            positions_offsets_file_name, positions_file_name, term_index_file_name, kgram_index_file_name,
+            forward_index_file_name, doc_map_file_name)))
+
+    # Number of live (i.e. not deleted) documents in the segment
+    def get_length(self): return self.N - self.deletions.get_count()
+
+    def get_lengths(self): return self.document_lengths.get_lengths()
+    def get_doc_map(self): return self.doc_map
+    def get_deletions(self): return self.deletions
+
+    # Accepts a doc id and returns its doc ordinal in the segment (None if the segment has no such document)
+    def get_ordinal(self, doc_id): return self.doc_map.get_ordinal(doc_id)
+    def get_doc_id(self, ordinal): return self.doc_map.get_doc_id(ordinal)
+
+    def has_document(self, doc_id):
+        ordinal = self.get_ordinal(doc_id)
+        return ordinal is not None and ordinal not in self.deletions
+
+    def has_nltk_text(self, doc_id): return doc_id in self.nltk_offsets
+
+    # Returns the metadata store of the segment (loaded only when a query needs it, see metadata.py)
+    def get_metadata_store(self):
+        if self.metadata_store is None:
+            self.metadata_store = MetadataStore()
+            if os.path.exists(self.get_file_name(metadata_file_name)):
+                with open(self.get_file_name(metadata_file_name), 'rb') as m:
+                    self.metadata_store = MetadataStore.load(m)
+        return self.metadata_store
+
+    # Returns the term index of the segment (loaded only when a query has a wildcard, see term_index.py)
+    # A segment written before term indexes builds its term index from its dictionary
+    def get_term_index(self):
+        if self.term_index is None:
+            if os.path.exists(self.get_file_name(term_index_file_name)):
+                with open(self.get_file_name(term_index_file_name), 'rb') as t:
+                    self.term_index = TermIndex.load(t)
+            else:
+                self.term_index = TermIndex.build_from(self.postings_offsets)
+        return self.term_index
+
+    # Returns the k-gram index of the segment (loaded only when a query term is corrected, see spelling.py)
+    def get_kgram_index(self):
+        if self.kgram_index is None:
+            sorted_terms = self.get_term_index().get_sorted_terms()
+            if os.path.exists(self.get_file_name(kgram_index_file_name)):
+                with open(self.get_file_name(kgram_index_file_name), 'rb') as k:
+                    self.kgram_index = KGramIndex.load(k, sorted_terms)
+            else:
+                self.kgram_index = KGramIndex.build_from(sorted_terms)
+        return self.kgram_index
+
+    # Returns the forward index of the segment (mapped only when a query is expanded with Rocchio, see
+    # forward_index.py), which is empty for a segment written before forward indexes
+    def get_forward_index(self):
+        if self.forward_index is None:
+            self.forward_index = ForwardIndex()
+            if os.path.exists(self.get_file_name(forward_index_file_name)):
+                self.forward_index = ForwardIndex.load(open(self.get_file_name(forward_index_file_name), 'rb'))
+        return self.forward_index
+
+    # Builds the offsets dictionaries for seeking later and keeps the postings and nltk texts files open
+    def open(self):
+        with open(self.get_file_name(self.dictionary_file_name), errors='ignore') as d:
+            for line in d:
+                lemma, postings_offset = line.rstrip().split(',')
+                self.postings_offsets[lemma] = int(postings_offset)
+        with open(self.get_file_name(nltk_offsets_file_name)) as i:
+            for line in i:
+                doc_id, nltk_text_offset = line.rstrip().split(',')
+                self.nltk_offsets[doc_id] = int(nltk_text_offset)
+        if os.path.exists(self.get_file_name(positions_offsets_file_name)):
+            with open(self.get_file_name(positions_offsets_file_name), errors='ignore') as i:
+                for line in i:
+                    lemma, positions_offset = line.rstrip().split(',')
+                    self.positions_offsets[lemma] = int(positions_offset)
+            self.positions_file = open(self.get_file_name(positions_file_name), 'rb')
+        self.load_lengths()
+        self.postings_file = open(self.get_file_name(self.postings_file_name), 'rb')
+        self.nltk_texts_file = open(self.get_file_name(nltk_texts_file_name), 'rb')
+        return self
+
+    # Load the following data from the lengths file, the doc map file and the deletions file (if any):
+    # 1. Total number of documents in the segment
+    # 2. Length of each document (indexed by doc ordinal, mapped rather than read, see lengths.py)
+    # 3. Doc id of each doc ordinal
+    # 4. Deleted doc ordinals
+    def load_lengths(self):
+        self.document_lengths = DocumentLengths.load(open(self.get_file_name(lengths_file_name), 'rb'))
+        self.N = self.document_lengths.get_length()
+        with open(self.get_file_name(doc_map_file_name), 'rb') as o:
+            self.doc_map = DocMap.load(o)
+        if os.path.exists(self.get_file_name(deletions_file_name)):
+            with open(self.get_file_name(deletions_file_name), 'rb') as b:
+                self.deletions = Bitmap.load(b)
+        return self
+
+    def save_deletions(self):
+        if self.deletions.is_empty():
+            if os.path.exists(self.get_file_name(deletions_file_name)):
+                os.remove(self.get_file_name(deletions_file_name))
+            return
+        with open(self.get_file_name(deletions_file_name), 'wb') as b:
+            self.deletions.dump(b)
+
+    def close(self):
+        if self.postings_file is not None:
+            self.postings_file.close()
+            self.nltk_texts_file.close()
+        if self.positions_file is not None:
+            self.positions_file.close()
+        if self.forward_index is not None:
+            self.forward_index.close()
+        self.document_lengths.close()
+
+    # Accepts a lemma and
+    # Returns the loaded (df, postings skip list) while storing it in memory
+    # Tombstoned postings are dropped here, so every boolean and scoring path only sees live documents
+    def load_lemma(self, lemma):
+        if lemma in self.dictionary:
+            add_count('lemma_cache_hits')
+            return self.dictionary[lemma]
+        add_count('lemma_cache_misses')
+        postings = SkipList()
+        if lemma in self.postings_offsets:
+            with span('load_lemma', lemma=lemma):
+                with self.postings_lock:
+                    self.postings_file.seek(self.postings_offsets[lemma])
+                    postings_list = pickle.load(self.postings_file)
+                    add_count('bytes_read', self.postings_file.tell() - self.postings_offsets[lemma])
+                add_count('postings_decoded', len(postings_list))
+                if not self.deletions.is_empty():
+                    postings_list = [posting for posting in postings_list if posting[0] not in self.deletions]
+                postings.build_from(postings_list)
+        self.dictionary[lemma] = (postings.get_length(), postings)
+        return self.dictionary[lemma]
+
+    # Accepts a lemma and
+    # Returns the loaded { doc ordinal: gap encoded positions } while storing it in memory
+    # Positions stay encoded until a phrase query needs the positions of a candidate document
+    def load_positions(self, lemma):
+        if lemma in self.positions:
+            return self.positions[lemma]
+        positions_by_document = {}
+        if lemma in self.positions_offsets:
+            self.positions_file.seek(self.positions_offsets[lemma])
+            positions_by_document = pickle.load(self.positions_file)
+            add_count('bytes_read', self.positions_file.tell() - self.positions_offsets[lemma])
+        self.positions[lemma] = positions_by_document
+        return self.positions[lemma]
+
+    # Accepts a doc_id and
+    # Returns the loaded nltk.Text while storing it in memory
+    def load_nltk_text(self, doc_id):
+        if doc_id in self.nltk_texts:
+            add_count('nltk_text_cache_hits')
+            return self.nltk_texts[doc_id]
+        add_count('nltk_text_cache_misses')
+        text = ''
+        if doc_id in self.nltk_offsets:
+            with span('load_nltk_text', doc_id=doc_id):
+                self.nltk_texts_file.seek(self.nltk_offsets[doc_id])
+                text = pickle.load(self.nltk_texts_file)
+                add_count('bytes_read', self.nltk_texts_file.tell() - self.nltk_offsets[doc_id])
+        self.nltk_texts[doc_id] = text
+        return self.nltk_texts[doc_id]
+
+# Accepts the main dictionary and postings file names and
+# Returns every segment of the index: the main index, the segments listed in segments.txt, then the delta segment
+def get_segments(dictionary_file_name, postings_file_name):
+    segments = [Segment(os.curdir, dictionary_file_name, postings_file_name)]
+    segments.extend(map(Segment, get_segment_directory_names()))
+    if os.path.isdir(delta_directory_name):
+        segments.append(Segment(delta_directory_name))
+    return segments
+
+# Returns the directory names listed in segments.txt (one per line), excluding the main index and delta segment
+def get_segment_directory_names():
+    if not os.path.exists(segments_file_name):
+        return []
+    with open(segments_file_name) as s:
+        return list(filter(None, map(str.strip, s)))
+
+def set_segment_directory_names(segment_directory_names):
+    if not segment_directory_names:
+        if os.path.exists(segments_file_name):
+            os.remove(segments_file_name)
+        return
+    with open(segments_file_name, 'w') as s:
+        for segment_directory_name in segment_directory_names:
+            s.write('{}\n'.format(segment_directory_name))
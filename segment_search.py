@@ -0,0 +1,400 @@
+### Retrieval and ranking within a single segment, shared by search.py and shard_worker.py ###
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from heapq import merge, nlargest
+from math import log10
+
+from constants import zone_separator, zone_weights, get_zone_term
+from nltk_context_index import ContextIndex
+from positions import decode_positions, has_phrase
+from tracing import add_count
+from skip_list import SkipList
+
+'''
+Answers the part of every query that concerns one segment (see segment.py)
+    - search.py calls these methods on every segment (or on every shard through shard.py)
+    - The boolean retrieved postings of the current query are kept between calls
+    - df and N are passed in, so that every segment ranks with the same (global) idf
+    - Documents are retrieved and scored by doc ordinal (see doc_map.py), and only the ranked documents are
+        returned by doc id
+    - doc_filter is the Bitmap of doc ordinals allowed by the metadata filters (None if there is no filter),
+        checked before any document is scored (df and N are not filtered), and filter_skip_list holds the same
+        ordinals as postings, so that boolean retrieval intersects them like any other postings list
+    - The scores of the last ranking are kept (before zone weights and normalization) with its arguments, so that
+        ranking again with more lemmas (i.e. after query expansion) only walks the postings of the added lemmas
+    - With scoring threads (search.py -j), the lemmas of a query are loaded and scored at the same time
+'''
+class SegmentSearcher:
+    segment = None
+    blr_skip_list = None
+    doc_filter = None
+    filter_skip_list = None
+    scoring_executor = None      # thread pool which scores the lemmas of a query (None to score them in turn)
+    scoring_arguments = None     # see get_scoring_arguments, None until the next ranking
+    tfidf_by_document_upp = None # { doc ordinal: tfidf } of the high list of the last ranking, before zone weights
+    tfidf_by_document_low = None # { doc ordinal: tfidf } of the low list of the last ranking, before zone weights
+    zone_tfidfs = None           # [{ doc ordinal: weighted zone tfidf }] of every scored lemma of the last ranking
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.blr_skip_list = SkipList()
+
+    def get_segment(self): return self.segment
+
+    # Number of live documents in the segment
+    def get_length(self): return self.segment.get_length()
+
+    # Accepts a wildcard pattern (e.g. neglig*) and the maximum number of matches and
+    # Returns the sorted terms of this segment which match the pattern (see term_index.py)
+    def get_wildcard_terms(self, pattern, max_length):
+        return sorted(self.segment.get_term_index().get_matches(pattern, max_length))
+
+    # Accepts a case-folded word and the maximum edit distance and
+    # Returns [(term, edit distance)] of the terms of this segment within that distance (see spelling.py)
+    def get_spelling_candidates(self, word, max_distance):
+        return self.segment.get_kgram_index().get_candidates(word, max_distance)
+
+    # Accepts a list of lemmas and returns their df in this segment (in the same order)
+    def get_dfs(self, lemmas):
+        return [self.segment.load_lemma(lemma)[0] for lemma in lemmas]
+
+    # Accepts the number of threads which score the lemmas of a query at the same time (0 to score them in turn)
+    def set_scoring_threads(self, number_of_threads):
+        if self.scoring_executor is not None:
+            self.scoring_executor.shutdown()
+        self.scoring_executor = ThreadPoolExecutor(max_workers=number_of_threads) if number_of_threads else None
+
+    def close(self):
+        self.set_scoring_threads(0)
+        self.segment.close()
+
+    # Accepts an optional court name and an optional inclusive date range ('YYYY-MM-DD') which
+    # restrict every later query to the matching documents (see metadata.py)
+    def set_filter(self, court_name=None, date_from=None, date_to=None):
+        self.doc_filter = None
+        self.filter_skip_list = None
+        self.scoring_arguments = None
+        if court_name is not None or date_from is not None or date_to is not None:
+            self.doc_filter = self.segment.get_metadata_store().get_filter(court_name, date_from, date_to)
+            self.filter_skip_list = SkipList()
+            self.filter_skip_list.build_from([(ordinal, 0) for ordinal in self.doc_filter.to_list()])
+
+    def is_allowed(self, ordinal):
+        return self.doc_filter is None or ordinal in self.doc_filter
+
+    # Boolean retrieval routine (AND only) within the segment
+    # Accepts a list of tokens, a list of phrases (see get_phrases of search.py) whose lemmas are in tokens and
+    # a list of wildcard groups (the terms a wildcard expands to, which are ORed) and
+    # Returns the number of boolean retrieved postings
+    # The metadata filter is intersected with the postings lists (smallest first), so the documents outside of it
+    # are dropped before the other lists are merged and before any phrase is checked
+    def boolean_retrieve(self, tokens, phrases=(), wildcard_groups=()):
+        self.blr_skip_list = SkipList()
+        self.scoring_arguments = None
+        if tokens or wildcard_groups:
+            self.blr_skip_list = boolean_retrieve_segment(tokens, self.segment, wildcard_groups, self.filter_skip_list)
+        if phrases and self.blr_skip_list.get_length():
+            self.blr_skip_list = get_phrase_postings(self.blr_skip_list, phrases, self.segment)
+        return self.blr_skip_list.get_length()
+
+    # Accepts whether any segment has boolean retrieved postings, the query lemmas, the query tfs,
+    # the global { lemma: df } and N, and the number of documents to rank (None for all) and
+    # Returns the (high, low) lists of the segment as [(doc_id, normalized tfidf)] sorted by descending tfidf
+    # Every lemma is scored on its own (see get_lemma_scores), in the scoring threads if any, and the scores of
+    # the lemmas are then reduced in query order, so that the ranking is the same with or without threads
+    def get_relevant_docs(self, is_boolean_retrieved, lemmas, query_tfs, dfs, N, k=None):
+        lemmas = list(lemmas)
+        # The score of a document is set (not summed) by every lemma, so the last lemma of the query which
+        # scores a document wins, as if the lemmas were scored one after the other
+        tfidf_by_document_upp = {}
+        tfidf_by_document_low = {}
+        zone_tfidfs = []
+        for lemma_tfidf_by_document_upp, lemma_tfidf_by_document_low, lemma_zone_tfidfs in \
+            self.get_lemmas_scores(is_boolean_retrieved, lemmas, query_tfs, dfs, N):
+            tfidf_by_document_upp.update(lemma_tfidf_by_document_upp)
+            tfidf_by_document_low.update(lemma_tfidf_by_document_low)
+            zone_tfidfs.extend(lemma_zone_tfidfs)
+        # Kept for get_expanded_relevant_docs
+        self.scoring_arguments = get_scoring_arguments(is_boolean_retrieved, lemmas, query_tfs, dfs, N)
+        self.tfidf_by_document_upp = tfidf_by_document_upp
+        self.tfidf_by_document_low = tfidf_by_document_low
+        self.zone_tfidfs = zone_tfidfs
+        return self.get_ranked_docs(tfidf_by_document_upp, tfidf_by_document_low, zone_tfidfs, k)
+
+    # Ranking after query expansion, with the same arguments and return value as get_relevant_docs
+    # If the lemmas start with the scored lemmas of the last ranking, with the same query tfs, dfs and N (the
+    # expansion only appends lemmas), only the appended lemmas are scored: their scores are set on top of the kept
+    # scores, and the zone weights of every lemma are then added, exactly as get_relevant_docs would with all of them
+    # Otherwise every lemma is scored again
+    def get_expanded_relevant_docs(self, is_boolean_retrieved, lemmas, query_tfs, dfs, N, k=None):
+        lemmas = list(lemmas)
+        if self.scoring_arguments is None:
+            return self.get_relevant_docs(is_boolean_retrieved, lemmas, query_tfs, dfs, N, k)
+        scored_lemmas = self.scoring_arguments[1]
+        if self.scoring_arguments != get_scoring_arguments(
+            is_boolean_retrieved, lemmas[:len(scored_lemmas)], query_tfs, dfs, N):
+            return self.get_relevant_docs(is_boolean_retrieved, lemmas, query_tfs, dfs, N, k)
+        added_lemmas = lemmas[len(scored_lemmas):]
+        add_count('lemmas_rescoring_skipped', len(scored_lemmas))
+        tfidf_by_document_upp = dict(self.tfidf_by_document_upp)
+        tfidf_by_document_low = dict(self.tfidf_by_document_low)
+        zone_tfidfs = list(self.zone_tfidfs)
+        for lemma_tfidf_by_document_upp, lemma_tfidf_by_document_low, lemma_zone_tfidfs in \
+            self.get_lemmas_scores(is_boolean_retrieved, added_lemmas, query_tfs, dfs, N):
+            tfidf_by_document_upp.update(lemma_tfidf_by_document_upp)
+            tfidf_by_document_low.update(lemma_tfidf_by_document_low)
+            zone_tfidfs.extend(lemma_zone_tfidfs)
+        return self.get_ranked_docs(tfidf_by_document_upp, tfidf_by_document_low, zone_tfidfs, k)
+
+    # Accepts the same arguments as get_relevant_docs (without k) and
+    # Returns the scores of every lemma (see get_lemma_scores), in the order of the lemmas
+    # Every lemma is scored on its own, in the scoring threads if any, so that the scores are then reduced in
+    # query order and the ranking is the same with or without threads
+    def get_lemmas_scores(self, is_boolean_retrieved, lemmas, query_tfs, dfs, N):
+        if self.scoring_executor is not None and len(lemmas) > 1:
+            return list(self.scoring_executor.map(
+                lambda lemma: self.get_lemma_scores(is_boolean_retrieved, lemma, query_tfs[lemma], dfs, N), lemmas))
+        return [self.get_lemma_scores(is_boolean_retrieved, lemma, query_tfs[lemma], dfs, N) for lemma in lemmas]
+
+    # Accepts the { doc ordinal: tfidf } of the high and low lists, the zone tfidfs of the scored lemmas (in
+    # query order) and the number of documents to rank (None for all) and
+    # Returns the (high, low) lists as [(doc_id, normalized tfidf)] sorted by descending tfidf
+    # The kept scores are not changed
+    def get_ranked_docs(self, tfidf_by_document_upp, tfidf_by_document_low, zone_tfidfs, k=None):
+        lengths = self.segment.get_lengths()
+        tfidf_by_document_upp = dict(tfidf_by_document_upp)
+        tfidf_by_document_low = dict(tfidf_by_document_low)
+        # Zone weights: documents which have a query lemma in a weighted zone (e.g. title) score higher
+        # The zone postings are walked like any other postings, so no per-document zone lookup is needed
+        for zone_tfidf_by_document in zone_tfidfs:
+            for ordinal, zone_tfidf in zone_tfidf_by_document.items():
+                for tfidf_by_document in (tfidf_by_document_upp, tfidf_by_document_low):
+                    if ordinal in tfidf_by_document:
+                        tfidf_by_document[ordinal] += zone_tfidf
+        # Normalization
+        # A document scored only by its zones can have no significant content word (length 0), and is not normalized
+        tfidf_by_document_upp = { ordinal: tfidf / max(1, lengths[ordinal]) \
+            for ordinal, tfidf in tfidf_by_document_upp.items() }
+        tfidf_by_document_low = { ordinal: tfidf / max(1, lengths[ordinal]) \
+            for ordinal, tfidf in tfidf_by_document_low.items() }
+        # Sort dictionary by descending normalized tfidf (only the top k with a bounded heap, see get_top_k)
+        most_relevant_docs = self.get_doc_id_tuples(get_top_k(tfidf_by_document_upp.items(), k))
+        less_relevant_docs = self.get_doc_id_tuples(get_top_k(tfidf_by_document_low.items(), k))
+        return (most_relevant_docs, less_relevant_docs)
+
+    # Accepts whether any segment has boolean retrieved postings, a query lemma, its query tf,
+    # the global { lemma: df } and N, and
+    # Returns the ({ doc ordinal: tfidf } of the high list, { doc ordinal: tfidf } of the low list,
+    # [{ doc ordinal: weighted zone tfidf }] of every weighted zone of the lemma) of the lemma in the segment
+    # Only the postings of the lemma and its zone terms are read, so lemmas can be scored at the same time
+    def get_lemma_scores(self, is_boolean_retrieved, lemma, query_tf, dfs, N):
+        segment = self.segment
+        blr_skip_list = self.blr_skip_list
+        tfidf_by_document_upp = {}
+        tfidf_by_document_low = {}
+        query_tfidf = get_tfidf_weight(query_tf)
+        df = dfs[lemma]
+        postings = segment.load_lemma(lemma)[1]
+        if is_boolean_retrieved:
+            # BEGIN procedure
+            # "merge" boolean retrieved postings with postings by term
+            # Documents which exist in both skip lists will be considered in the upper rankings
+            # while those which exist only in the term skip list are moved to the lower rankings
+            node_a = blr_skip_list.get_head() # i.e. first node of skip list
+            node_b = postings.get_head()
+            while node_a is not None and node_b is not None:
+                data_a = node_a.get_data()[0] # doc ordinal of boolean retrieved posting
+                data_b = node_b.get_data()[0]
+                ordinal, doc_tf = node_b.get_data()
+                if data_a != data_b:
+                    if self.is_allowed(ordinal):
+                        tfidf_by_document_low[ordinal] = get_tfidf_weight(doc_tf, df, N) * query_tfidf
+                    if data_a < data_b:
+                        skip_node_a = node_a.get_skip()
+                        if skip_node_a is not None and skip_node_a.get_data()[0] <= data_b:
+                            node_a = skip_node_a
+                        else:
+                            node_a = node_a.get_next()
+                    elif data_b < data_a:
+                        skip_node_b = node_b.get_skip()
+                        if skip_node_b is not None and skip_node_b.get_data()[0] <= data_a:
+                            node_b = skip_node_b
+                        else:
+                            node_b = node_b.get_next()
+                else:
+                    tfidf_by_document_upp[ordinal] = get_tfidf_weight(doc_tf, df, N) * query_tfidf
+                    node_a = node_a.get_next()
+                    node_b = node_b.get_next()
+            # END procedure
+        else:
+            # Pure vector space model because boolean retrieved postings is empty
+            # Similar procedure to slide 38 of w7 lecture
+            node_b = postings.get_head()
+            while node_b is not None:
+                ordinal, doc_tf = node_b.get_data()
+                if self.is_allowed(ordinal):
+                    tfidf_by_document_upp[ordinal] = get_tfidf_weight(doc_tf, df, N) * query_tfidf
+                node_b = node_b.get_next()
+        zone_tfidfs = []
+        if zone_separator not in lemma: # is not already a zone term
+            for zone_name, zone_weight in zone_weights.items():
+                zone_term = get_zone_term(zone_name, lemma)
+                df = dfs[zone_term]
+                zone_tfidf_by_document = {}
+                node = segment.load_lemma(zone_term)[1].get_head()
+                while node is not None:
+                    ordinal, zone_tf = node.get_data()
+                    zone_tfidf_by_document[ordinal] = zone_weight * get_tfidf_weight(zone_tf, df, N) * query_tfidf
+                    node = node.get_next()
+                zone_tfidfs.append(zone_tfidf_by_document)
+        return (tfidf_by_document_upp, tfidf_by_document_low, zone_tfidfs)
+
+    # Accepts ranked (doc ordinal, tfidf) tuples and returns them as (doc id, tfidf) tuples
+    def get_doc_id_tuples(self, ordinal_tfidf_tuples):
+        doc_ids = self.segment.get_doc_map().get_doc_ids()
+        return [(doc_ids[ordinal], tfidf) for ordinal, tfidf in ordinal_tfidf_tuples]
+
+    # Query expansion procedures of search.py, restricted to the relevant docs held by this segment
+    def get_query_expansion_auto(self, relevant_docs, lemmas):
+        query_expansion = set()
+        relevant_docs = list(filter(self.has_document, relevant_docs))
+        for lemma in lemmas:
+            for doc_id in relevant_docs:
+                nltk_text = self.segment.load_nltk_text(doc_id)
+                sim_words = set(get_similar(nltk_text, lemma)) # co-occurrence
+                query_expansion.update(sim_words)
+        return query_expansion
+
+    def get_query_expansion_semi_auto(self, relevant_docs, synonyms_by_lemma):
+        query_expansion = set()
+        relevant_docs = list(filter(self.has_document, relevant_docs))
+        for lemma, synonyms in synonyms_by_lemma.items():
+            for doc_id in relevant_docs:
+                nltk_text = self.segment.load_nltk_text(doc_id)
+                sim_words = set(get_similar(nltk_text, lemma)) # co-occurrence
+                query_expansion.update(sim_words.intersection(synonyms))
+        return query_expansion
+
+    # Accepts a list of relevant docs i.e. [doc_id] and
+    # Returns { term: sum of its weights in the vectors of the relevant docs held by this segment } (see get_vector
+    # of forward_index.py), whose sum over every segment is the Rocchio centroid times the number of docs
+    def get_query_expansion_rocchio(self, relevant_docs):
+        forward_index = self.segment.get_forward_index()
+        sorted_terms = self.segment.get_term_index().get_sorted_terms()
+        weights_by_term = Counter()
+        for doc_id in map(int, relevant_docs):
+            if self.segment.has_document(doc_id):
+                weights_by_term.update(dict(
+                    forward_index.get_vector(self.segment.get_ordinal(doc_id), sorted_terms)))
+        return weights_by_term
+
+    # Accepts a doc_id string (as in the output) and
+    # Returns True only if the segment holds the live document and its nltk.Text
+    def has_document(self, doc_id):
+        return self.segment.has_nltk_text(doc_id) and self.segment.has_document(int(doc_id))
+
+# Accepts tokens, a segment, wildcard groups and the skip list of the metadata filter (None if there is no filter)
+# and returns the skip list of the AND of all of them, merged from the shortest list up
+# The postings of the filter have a tf of 0, and only the doc ordinals of the result are used
+def boolean_retrieve_segment(tokens, segment, wildcard_groups=(), filter_skip_list=None):
+    filter_skip_lists = [(filter_skip_list.get_length(), filter_skip_list)] if filter_skip_list is not None else []
+    sorted_skip_lists = map(
+        lambda df_postings_tuple: df_postings_tuple[1],
+        sorted(
+            list(map(
+                lambda token: segment.load_lemma(token),
+                tokens
+            )) + list(map(
+                lambda terms: get_union(terms, segment),
+                wildcard_groups
+            )) + filter_skip_lists,
+            key=lambda df_postings_tuple: df_postings_tuple[0])
+        )
+    return reduce(
+        lambda skip_list_a, skip_list_b: skip_list_a.merge(skip_list_b),
+        sorted_skip_lists)
+
+# Accepts terms and a segment and
+# Returns (length, postings skip list) of the OR of the postings of the terms (doc ordinals only matter here)
+def get_union(terms, segment):
+    postings = []
+    for posting in merge(*map(lambda term: segment.load_lemma(term)[1].to_list(), terms)):
+        if not postings or postings[-1][0] != posting[0]:
+            postings.append(posting)
+    skip_list = SkipList()
+    skip_list.build_from(postings)
+    return (skip_list.get_length(), skip_list)
+
+'''
+Phrase (and proximity) filter on boolean retrieved postings
+    - The doc ordinals are already intersected (with skips) by boolean retrieval, as every lemma of a phrase is a token
+    - So positions are only decoded for the surviving documents, and only until one phrase fails
+'''
+def get_phrase_postings(skip_list, phrases, segment):
+    phrase_postings = []
+    for posting in skip_list.to_list():
+        ordinal = posting[0]
+        for lemmas, offsets, slop in phrases:
+            positions_by_lemma = [decode_positions(segment.load_positions(lemma).get(ordinal, b''))
+                for lemma in lemmas]
+            add_count('positions_decoded', sum(map(len, positions_by_lemma)))
+            if not has_phrase(positions_by_lemma, offsets, slop):
+                break
+        else:
+            phrase_postings.append(posting)
+    phrase_skip_list = SkipList()
+    phrase_skip_list.build_from(phrase_postings)
+    return phrase_skip_list
+
+# Accepts the arguments of get_relevant_docs and returns what its scores depend on (k only cuts the ranked lists),
+# i.e. the lemmas with their query tfs and the dfs of the lemmas and of their zone terms
+def get_scoring_arguments(is_boolean_retrieved, lemmas, query_tfs, dfs, N):
+    scored_terms = list(lemmas) + [get_zone_term(zone_name, lemma)
+        for lemma in lemmas if zone_separator not in lemma for zone_name in zone_weights]
+    return (bool(is_boolean_retrieved), list(lemmas), [query_tfs[lemma] for lemma in lemmas],
+        [dfs[term] for term in scored_terms], N)
+
+# Accepts (doc ordinal, tfidf) tuples and the number of documents to keep (None for all) and
+# Returns the k tuples with the highest tfidf, sorted by descending tfidf (ties keep their order, as in sorted)
+# heapq.nlargest keeps a heap of k tuples, so the other tuples are never sorted
+def get_top_k(id_tfidf_tuples, k=None):
+    if k is None:
+        return sorted(id_tfidf_tuples, key=lambda id_tfidf_tuple: id_tfidf_tuple[1], reverse=True)
+    return nlargest(k, id_tfidf_tuples, key=lambda id_tfidf_tuple: id_tfidf_tuple[1])
+
+def get_tfidf_weight(tf, df=0, N=0):
+    tf_weight = 0
+    idf_weight = 1
+    if tf:
+        tf_weight = 1 + log10(tf)
+    if df:
+        idf_weight = log10(N / df)
+    return tf_weight * idf_weight
+
+### WARNING: I ONLY CHANGED THE RETURN TYPE, OTHERWISE WHOLESALE COPYING ###
+# Adapted from: http://www.nltk.org/_modules/nltk/text.html
+def get_similar(nltk_text, word, num=20):
+    """
+    Distributional similarity: find other words which appear in the
+    same contexts as the specified word; list most similar words first.
+
+    :param word: The word used to seed the similarity search
+    :type word: str
+    :param num: The number of words to generate (default=20)
+    :type num: int
+    :seealso: ContextIndex.similar_words()
+    """
+    if '_word_context_index' not in nltk_text.__dict__:
+        nltk_text._word_context_index = ContextIndex(
+            nltk_text.tokens,
+            filter=lambda x: x.isalpha(),
+            key=lambda s: s.lower())
+    word = word.lower()
+    wci = nltk_text._word_context_index._word_to_contexts
+    if word in wci.conditions():
+        contexts = set(wci[word])
+        fd = Counter(w for w in wci.conditions() for c in wci[w] if c in contexts and not w == word)
+        return [w for w, _ in fd.most_common(num)]
+    return []
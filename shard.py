@@ -0,0 +1,100 @@
+### Document-partitioned shards: every shard is a segment served by its own local worker process ###
+
+import os
+import sys
+import subprocess
+import zlib
+
+from multiprocessing.connection import Client
+
+from constants import shards_file_name, shard_worker_file_name
+
+# Accepts a doc id and the number of shards and
+# Returns the shard of the document (CRC32 spreads consecutive doc ids evenly over the shards)
+def get_shard_index(doc_id, number_of_shards):
+    return zlib.crc32(str(doc_id).encode()) % number_of_shards
+
+# Returns the shard directory names listed in shards.txt (one per line)
+def get_shard_directory_names():
+    if not os.path.exists(shards_file_name):
+        return []
+    with open(shards_file_name) as s:
+        return list(filter(None, map(str.strip, s)))
+
+def set_shard_directory_names(shard_directory_names):
+    if not shard_directory_names:
+        if os.path.exists(shards_file_name):
+            os.remove(shards_file_name)
+        return
+    with open(shards_file_name, 'w') as s:
+        for shard_directory_name in shard_directory_names:
+            s.write('{}\n'.format(shard_directory_name))
+
+'''
+The coordinator side of a shard, standing in for a node of a cluster
+    - Starts shard_worker.py for the shard directory and connects to it over a local socket
+    - Has the same methods as SegmentSearcher (see segment_search.py), and every method call is
+        sent to the worker as a (method name, arguments) message and answered with the return value
+    - The worker gets a random authentication key on its stdin and answers with its port on its stdout
+'''
+class ShardClient:
+    directory_name = None
+    process = None
+    connection = None
+
+    def __init__(self, directory_name):
+        self.directory_name = directory_name
+        authkey = os.urandom(16)
+        # The worker script is next to this module, while the shard directory is relative to the working directory
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), shard_worker_file_name),
+                '-s', directory_name],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.process.stdin.write(authkey.hex().encode() + b'\n')
+        self.process.stdin.close()
+        port = int(self.process.stdout.readline())
+        self.connection = Client(('localhost', port), authkey=authkey)
+
+    def get_directory_name(self): return self.directory_name
+
+    def request(self, method_name, *args):
+        self.connection.send((method_name, args))
+        return self.connection.recv()
+
+    def get_length(self): return self.request('get_length')
+    def get_dfs(self, lemmas): return self.request('get_dfs', lemmas)
+    def boolean_retrieve(self, tokens, phrases=(), wildcard_groups=()):
+        return self.request('boolean_retrieve', tokens, phrases, wildcard_groups)
+
+    def get_wildcard_terms(self, pattern, max_length):
+        return self.request('get_wildcard_terms', pattern, max_length)
+
+    def get_spelling_candidates(self, word, max_distance):
+        return self.request('get_spelling_candidates', word, max_distance)
+
+    def set_filter(self, court_name=None, date_from=None, date_to=None):
+        return self.request('set_filter', court_name, date_from, date_to)
+
+    def set_scoring_threads(self, number_of_threads):
+        return self.request('set_scoring_threads', number_of_threads)
+
+    def get_relevant_docs(self, is_boolean_retrieved, lemmas, query_tfs, dfs, N, k=None):
+        return self.request('get_relevant_docs', is_boolean_retrieved, lemmas, query_tfs, dfs, N, k)
+
+    def get_expanded_relevant_docs(self, is_boolean_retrieved, lemmas, query_tfs, dfs, N, k=None):
+        return self.request('get_expanded_relevant_docs', is_boolean_retrieved, lemmas, query_tfs, dfs, N, k)
+
+    def get_query_expansion_auto(self, relevant_docs, lemmas):
+        return self.request('get_query_expansion_auto', relevant_docs, lemmas)
+
+    def get_query_expansion_semi_auto(self, relevant_docs, synonyms_by_lemma):
+        return self.request('get_query_expansion_semi_auto', relevant_docs, synonyms_by_lemma)
+
+    def get_query_expansion_rocchio(self, relevant_docs):
+        return self.request('get_query_expansion_rocchio', relevant_docs)
+
+    def close(self):
+        self.request('close')
+        self.connection.close()
+        self.process.stdout.close()
+        self.process.wait()
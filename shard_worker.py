@@ -0,0 +1,45 @@
+#!/usr/bin/python
+import sys
+import getopt
+
+from multiprocessing.connection import Listener
+
+from segment import Segment
+from segment_search import SegmentSearcher
+
+'''
+Serves one shard (a segment directory written by index.py -k) to the coordinator in search.py
+    - Reads the authentication key from stdin, listens on a free local port and prints that port
+    - Then answers (method name, arguments) messages with SegmentSearcher until 'close' is received
+'''
+def do_serving(shard_directory_name):
+    authkey = bytes.fromhex(sys.stdin.readline().strip())
+    searcher = SegmentSearcher(Segment(shard_directory_name).open())
+    with Listener(('localhost', 0), authkey=authkey) as listener:
+        print(listener.address[1], flush=True)
+        with listener.accept() as connection:
+            while True:
+                method_name, args = connection.recv()
+                connection.send(getattr(searcher, method_name)(*args))
+                if method_name == 'close':
+                    break
+
+def usage():
+    print('Usage: ' + sys.argv[0] + ' -s shard-directory')
+
+input_directory_s = None
+try:
+    opts, args = getopt.getopt(sys.argv[1:], 's:')
+except getopt.GetoptError:
+    usage()
+    sys.exit(2)
+for o, a in opts:
+    if o == '-s':
+        input_directory_s = a
+    else:
+        assert False, 'Unhandled option'
+if input_directory_s == None:
+    usage()
+    sys.exit(2)
+
+do_serving(input_directory_s)
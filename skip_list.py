@@ -73,6 +73,7 @@ class SkipList:
     # Implementation of (skip list A).AND(skip list B) (Moved over from search.py)
     # Accepts one skip list and returns a new skip list containing postings which both skip lists have
     # Does skipping when the skip pointer node of one skip list has a value less than the other skip list node
+    # Postings are (doc id, tf) so they are compared by doc id, and the merged postings keep the tf of this skip list
     def merge(self, skip_list_b):
         merged_skip_list_data = []
         node_a = self.get_head()
@@ -80,19 +81,21 @@ class SkipList:
         while node_a is not None and node_b is not None:
             data_a = node_a.get_data()
             data_b = node_b.get_data()
-            if data_a < data_b:
+            doc_id_a = data_a[0]
+            doc_id_b = data_b[0]
+            if doc_id_a < doc_id_b:
                 skip_node_a = node_a.get_skip()
-                if skip_node_a is not None and skip_node_a.get_data() <= data_b:
+                if skip_node_a is not None and skip_node_a.get_data()[0] <= doc_id_b:
                     node_a = skip_node_a
                 else:
                     node_a = node_a.get_next()
-            elif data_b < data_a:
+            elif doc_id_b < doc_id_a:
                 skip_node_b = node_b.get_skip()
-                if skip_node_b is not None and skip_node_b.get_data() <= data_a:
+                if skip_node_b is not None and skip_node_b.get_data()[0] <= doc_id_a:
                     node_b = skip_node_b
                 else:
                     node_b = node_b.get_next()
-            else: # data_a == data_b:
+            else: # doc_id_a == doc_id_b:
                 merged_skip_list_data.append(data_a)
                 node_a = node_a.get_next()
                 node_b = node_b.get_next()
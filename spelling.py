@@ -0,0 +1,98 @@
+### Spelling correction candidates of query terms from a k-gram index of the terms of a segment ###
+
+import pickle
+
+from array import array
+from collections import Counter
+
+from constants import kgram_length, short_word_length, zone_separator
+
+# Marks the start and the end of a term, so that its first and last letters are k-grams too
+kgram_boundary = '$'
+
+'''
+Maps every k-gram of every term (e.g. $c, co, on, nt, ..., t$ of contract for k = 2) to the indexes of the terms
+which have it in the sorted terms of the segment (see term_index.py)
+    - An edit changes at most k + 1 of the k-grams of a word (k for an insertion, deletion or substitution, and k + 1
+        for a transposition), so a term within edit distance d of the word shares at least
+        (number of k-grams of the word) - (k + 1) * d k-grams with it, and only these candidates are checked
+    - The edit distance of a candidate counts insertions, deletions, substitutions and transpositions of adjacent
+        letters (e.g. cocao -> cocoa) and is only computed up to the maximum distance
+    - Words of at most short_word_length letters are only corrected within distance 1, as nearly every short term
+        is within distance 2 of them
+Zone terms and non-alphabetical terms (e.g. years) are never candidates
+A term which shares no k-gram with the word (e.g. ok for ko) is never a candidate either
+'''
+class KGramIndex:
+    sorted_terms = None
+    term_indexes_by_kgram = None # { k-gram: array of indexes into sorted_terms }
+
+    def __init__(self, sorted_terms=None, term_indexes_by_kgram=None):
+        self.sorted_terms = sorted_terms or []
+        self.term_indexes_by_kgram = term_indexes_by_kgram or {}
+
+    # Accepts a case-folded word and the maximum edit distance and
+    # Returns [(term, edit distance)] of the terms within the maximum edit distance of the word
+    def get_candidates(self, word, max_distance):
+        if len(word) <= short_word_length:
+            max_distance = min(max_distance, 1)
+        kgrams = get_kgrams(word)
+        overlaps = Counter()
+        for kgram in kgrams:
+            overlaps.update(self.term_indexes_by_kgram.get(kgram, ()))
+        min_overlap = len(kgrams) - (kgram_length + 1) * max_distance
+        candidates = []
+        for term_index, overlap in overlaps.items():
+            term = self.sorted_terms[term_index]
+            if overlap < min_overlap or abs(len(term) - len(word)) > max_distance:
+                continue
+            distance = get_edit_distance(word, term, max_distance)
+            if distance <= max_distance:
+                candidates.append((term, distance))
+        return candidates
+
+    # Accepts the sorted terms of a segment
+    @staticmethod
+    def build_from(sorted_terms):
+        term_indexes_by_kgram = {}
+        for term_index, term in enumerate(sorted_terms):
+            if zone_separator in term or not term.isalpha():
+                continue
+            for kgram in get_kgrams(term):
+                term_indexes_by_kgram.setdefault(kgram, array('i')).append(term_index)
+        return KGramIndex(sorted_terms, term_indexes_by_kgram)
+
+    # Only the k-grams are written, as the sorted terms are those of the term index
+    def dump(self, kgram_index_file_object):
+        pickle.dump(self.term_indexes_by_kgram, kgram_index_file_object)
+
+    @staticmethod
+    def load(kgram_index_file_object, sorted_terms):
+        return KGramIndex(sorted_terms, pickle.load(kgram_index_file_object))
+
+# Returns the distinct k-grams of a word with its boundaries
+def get_kgrams(word):
+    bounded_word = kgram_boundary + word + kgram_boundary
+    return set(bounded_word[i:i + kgram_length] for i in range(len(bounded_word) - kgram_length + 1))
+
+# Accepts two words and the maximum distance and
+# Returns their edit distance (optimal string alignment, i.e. Levenshtein with transpositions of adjacent letters),
+# or (max_distance + 1) as soon as it must be greater than max_distance
+def get_edit_distance(word_a, word_b, max_distance):
+    second_previous_row = None
+    previous_row = list(range(len(word_b) + 1))
+    for i, character_a in enumerate(word_a, 1):
+        row = [i]
+        for j, character_b in enumerate(word_b, 1):
+            distance = min(
+                previous_row[j] + 1,
+                row[j - 1] + 1,
+                previous_row[j - 1] + (character_a != character_b))
+            if i > 1 and j > 1 and character_a == word_b[j - 2] and word_a[i - 2] == character_b:
+                distance = min(distance, second_previous_row[j - 2] + 1)
+            row.append(distance)
+        # A later row is at least the minimum of this row, or of the previous row plus 1 (by a transposition)
+        if min(row) > max_distance and min(previous_row) >= max_distance:
+            return max_distance + 1
+        second_previous_row, previous_row = previous_row, row
+    return previous_row[-1]
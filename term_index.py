@@ -0,0 +1,67 @@
+### Sorted term arrays of a segment for prefix, suffix and wildcard lookups ###
+
+import pickle
+
+from bisect import bisect_left
+from fnmatch import fnmatchcase
+from itertools import islice
+
+from constants import wildcard_character, zone_separator
+
+'''
+Holds every term of a segment twice, as a sorted array of the terms and as a sorted array of the reversed terms
+    - A pattern with a prefix (e.g. neglig*, neg*nce) only scans the range of the terms which start with the prefix,
+        found by binary search
+    - A pattern with a suffix but no prefix (e.g. *ence) only scans the range of the reversed terms which start with
+        the reversed suffix
+    - Any other pattern (e.g. *lig*) scans every term
+Every scanned term is then matched against the whole pattern, and the scan stops after max_length matches
+Zone terms (e.g. title:contract) are only matched by patterns of a zone (e.g. title:contr*)
+'''
+class TermIndex:
+    sorted_terms = None
+    sorted_reversed_terms = None
+
+    def __init__(self, sorted_terms=None, sorted_reversed_terms=None):
+        self.sorted_terms = sorted_terms or []
+        self.sorted_reversed_terms = sorted_reversed_terms or []
+
+    def get_length(self): return len(self.sorted_terms)
+    def get_sorted_terms(self): return self.sorted_terms
+
+    # Accepts a wildcard pattern and the maximum number of matches and
+    # Returns the matching terms (sorted, unless the pattern has no prefix)
+    def get_matches(self, pattern, max_length):
+        prefix = pattern.split(wildcard_character, 1)[0]
+        suffix = pattern.rsplit(wildcard_character, 1)[-1]
+        if prefix or not suffix:
+            candidates = get_range(self.sorted_terms, prefix)
+        else:
+            candidates = map(lambda reversed_term: reversed_term[::-1],
+                get_range(self.sorted_reversed_terms, suffix[::-1]))
+        is_zone_pattern = zone_separator in pattern
+        return list(islice(filter(
+            lambda term: (zone_separator in term) == is_zone_pattern and fnmatchcase(term, pattern),
+            candidates), max_length))
+
+    @staticmethod
+    def build_from(terms):
+        terms = list(terms)
+        return TermIndex(sorted(terms), sorted(map(lambda term: term[::-1], terms)))
+
+    def dump(self, term_index_file_object):
+        pickle.dump((self.sorted_terms, self.sorted_reversed_terms), term_index_file_object)
+
+    @staticmethod
+    def load(term_index_file_object):
+        return TermIndex(*pickle.load(term_index_file_object))
+
+# Accepts a sorted array and a prefix and
+# Returns a generator of the strings of the array which start with the prefix
+def get_range(sorted_strings, prefix):
+    i = bisect_left(sorted_strings, prefix)
+    while i < len(sorted_strings) and sorted_strings[i].startswith(prefix):
+        yield sorted_strings[i]
+        i += 1
+
+def is_wildcard(word): return wildcard_character in word
@@ -0,0 +1,99 @@
+### Shared helpers of the tests: importing the modules of every project and running its scripts on a corpus ###
+
+import csv
+import importlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+root_directory_name = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_directory_name)
+
+# Seeded synthetic corpus of every index built by the tests (see generate_corpus.py)
+corpus_file_name = 'corpus.csv'
+corpus_length = 200
+corpus_seed = 1
+
+'''
+Accepts a project directory name (e.g. boolean_retrieval) and the name of one of its modules and
+Returns the module imported with the constants.py of that project
+Every project has its own constants.py, so the constants of the main project are put back once the module is imported
+'''
+def import_project_module(project_directory_name, module_name):
+    saved_modules = { name: sys.modules.pop(name) for name in ('constants', module_name) if name in sys.modules }
+    sys.path.insert(0, os.path.join(root_directory_name, project_directory_name))
+    try:
+        return importlib.import_module(module_name)
+    finally:
+        sys.path.pop(0)
+        sys.modules.pop('constants', None)
+        sys.modules.update({ name: module for name, module in saved_modules.items() if name == 'constants' })
+
+# Accepts a script of the main project, its arguments and the working directory and
+# Returns the standard output of the script, which must succeed
+# The lemmas of a query are a set, whose order (and so the score of a document with several of them, see
+# get_relevant_docs of segment_search.py) depends on the hash seed, so every script runs with the same seed
+def run_script(script_name, *args, directory_name):
+    return subprocess.run([sys.executable, os.path.join(root_directory_name, script_name)] + list(map(str, args)),
+        cwd=directory_name, check=True, stdout=subprocess.PIPE, universal_newlines=True,
+        env=dict(os.environ, PYTHONHASHSEED='0')).stdout
+
+# Accepts an index directory, a query and the arguments of search.py and
+# Returns the ranked doc ids written by search.py
+def search(directory_name, query, *args):
+    return search_with_output(directory_name, query, *args)[0]
+
+# Same as search, but also returns the standard output of search.py
+def search_with_output(directory_name, query, *args):
+    with open(os.path.join(directory_name, 'query.txt'), 'w') as q:
+        q.write(query + '\n')
+    output = run_script('search.py', '-d', 'dictionary.txt', '-p', 'postings.txt', '-q', 'query.txt',
+        '-o', 'output.txt', *args, directory_name=directory_name)
+    with open(os.path.join(directory_name, 'output.txt')) as o:
+        return (o.read().split(), output)
+
+# Accepts an index directory and a boolean query and returns the number of boolean retrieved documents
+def get_boolean_retrieved_length(directory_name, query):
+    output = search_with_output(directory_name, query)[1]
+    return int(re.search(r'Total number of documents fetched: (\d+)', output).group(1))
+
+# A directory with the stopwords of the main project and the generated corpus, copied by every index of the tests
+@pytest.fixture(scope='session')
+def corpus_directory(tmp_path_factory):
+    directory_name = str(tmp_path_factory.mktemp('corpus'))
+    shutil.copy(os.path.join(root_directory_name, 'stopwords.txt'), directory_name)
+    run_script('generate_corpus.py', '-o', corpus_file_name, '-n', corpus_length, '-s', corpus_seed,
+        directory_name=directory_name)
+    return directory_name
+
+# Accepts the arguments of index.py and returns a new directory with an index of the corpus built with them
+@pytest.fixture(scope='session')
+def make_index(corpus_directory, tmp_path_factory):
+    def make_index(*args):
+        directory_name = str(tmp_path_factory.mktemp('index'))
+        for file_name in ('stopwords.txt', corpus_file_name):
+            shutil.copy(os.path.join(corpus_directory, file_name), directory_name)
+        run_script('index.py', '-i', corpus_file_name, '-d', 'dictionary.txt', '-p', 'postings.txt', *args,
+            directory_name=directory_name)
+        return directory_name
+    return make_index
+
+# Accepts a CSV file name and returns its rows as { doc id: [title, content, date_posted, court] }
+def read_corpus(file_name):
+    with open(file_name, newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        return { row[0]: row[1:] for row in reader }
+
+# Accepts a directory with stopwords.txt and the corpus, and a doc id and
+# Returns the case-folded words of the content of the document which are not stopwords
+def get_significant_words(directory_name, doc_id):
+    with open(os.path.join(directory_name, 'stopwords.txt')) as s:
+        stopwords = set(filter(None, map(str.strip, s)))
+    content = read_corpus(os.path.join(directory_name, corpus_file_name))[doc_id][1]
+    words = map(lambda word: word.strip('.,').lower(), content.split())
+    return list(filter(lambda word: word.isalpha() and len(word) > 1 and word not in stopwords, words))
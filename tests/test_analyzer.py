@@ -0,0 +1,19 @@
+import os
+
+import pytest
+
+from conftest import get_significant_words, search
+
+# Query words go through the analyzer of the index, so case and stopwords never change the ranking
+@pytest.mark.parametrize('tokenizer', ['nltk', 'regex'])
+def test_queries_are_analyzed_like_the_documents(make_index, tokenizer):
+    directory_name = make_index('-t', tokenizer)
+    with open(os.path.join(directory_name, 'analyzer.txt')) as a:
+        assert a.read().strip() == tokenizer
+    a, b = get_significant_words(directory_name, '100080')[:2]
+    doc_ids = search(directory_name, '{} {}'.format(a, b))
+    assert '100080' in doc_ids
+    assert search(directory_name, 'The {}, {} and the'.format(a.upper(), b.title())) == doc_ids
+    doc_ids = search(directory_name, '{} AND {}'.format(a, b))
+    assert doc_ids[0] == '100080'
+    assert search(directory_name, '{} AND {}'.format(a.upper(), b.title())) == doc_ids
@@ -0,0 +1,46 @@
+import io
+import pickle
+import random
+
+from conftest import import_project_module
+
+block_postings = import_project_module('boolean_retrieval', 'block_postings')
+
+block_size = 64
+
+# Accepts lists of sorted postings and
+# Returns a postings file with every list after a pickled list written before blocks, and the offsets of the lists
+def get_postings_file(postings_lists):
+    postings_file = io.BytesIO()
+    pickle.dump([1, 2, 3], postings_file)
+    offsets = []
+    for postings in postings_lists:
+        offsets.append(postings_file.tell())
+        block_postings.dump_block_postings(postings, postings_file, block_size)
+    return postings_file, offsets
+
+def load(postings_file, offset):
+    postings_file.seek(offset)
+    return block_postings.load_block_postings(postings_file)
+
+def test_round_trip():
+    randomizer = random.Random(0)
+    postings_lists = [[5], list(range(block_size)), sorted(randomizer.sample(range(1 << 24), 1000))]
+    postings_file, offsets = get_postings_file(postings_lists)
+    for postings, offset in zip(postings_lists, offsets):
+        loaded_postings = load(postings_file, offset)
+        assert loaded_postings.get_length() == len(postings)
+        assert loaded_postings.get_number_of_blocks() == -(-len(postings) // block_size)
+        assert loaded_postings.to_list() == postings
+    # A list written before blocks is still a pickled list
+    assert load(postings_file, 0) == [1, 2, 3]
+
+def test_intersection_only_reads_the_blocks_it_needs():
+    postings = list(range(0, 100000, 7))
+    postings_file, offsets = get_postings_file([postings])
+    loaded_postings = load(postings_file, offsets[0])
+    assert loaded_postings.intersection([-1, 700, 701, postings[-1] + 1]) == [700]
+    assert list(loaded_postings.blocks) == [postings.index(700) // block_size, (len(postings) - 1) // block_size]
+    randomizer = random.Random(1)
+    other_postings = sorted(randomizer.sample(range(100000), 500))
+    assert loaded_postings.intersection(other_postings) == sorted(set(postings) & set(other_postings))
@@ -0,0 +1,79 @@
+import os
+import re
+import shutil
+
+import pytest
+
+from conftest import corpus_file_name, get_significant_words, read_corpus, root_directory_name, run_script
+
+project_directory_name = 'boolean_retrieval'
+
+# A directory with an index of the content of every document of the corpus, one file per document
+@pytest.fixture(scope='module')
+def index_directory(corpus_directory, tmp_path_factory):
+    directory_name = str(tmp_path_factory.mktemp(project_directory_name))
+    shutil.copy(os.path.join(root_directory_name, project_directory_name, 'stopwords.txt'), directory_name)
+    documents_directory_name = os.path.join(directory_name, 'documents')
+    os.mkdir(documents_directory_name)
+    for doc_id, row in read_corpus(os.path.join(corpus_directory, corpus_file_name)).items():
+        with open(os.path.join(documents_directory_name, doc_id), 'w') as f:
+            f.write(row[1])
+    run_script(os.path.join(project_directory_name, 'index.py'), '-i', 'documents', '-d', 'dictionary.txt',
+        '-p', 'postings.txt', directory_name=directory_name)
+    return directory_name
+
+# Accepts an index directory, queries and the engine and returns the set of doc ids of every query
+def search(directory_name, queries, engine):
+    return search_with_output(directory_name, queries, engine)[0]
+
+# Same as search, but also returns the standard output of search.py
+def search_with_output(directory_name, queries, engine):
+    with open(os.path.join(directory_name, 'queries.txt'), 'w') as q:
+        q.write(''.join(map(lambda query: query + '\n', queries)))
+    output = run_script(os.path.join(project_directory_name, 'search.py'), '-d', 'dictionary.txt',
+        '-p', 'postings.txt', '-q', 'queries.txt', '-o', 'output.txt', '-e', engine, directory_name=directory_name)
+    with open(os.path.join(directory_name, 'output.txt')) as o:
+        return (list(map(lambda line: set(line.split()), o)), output)
+
+# Accepts the standard output of search.py and returns the (hits, misses) of the subexpression cache
+def get_cache_counts(output):
+    return tuple(map(int, re.search(r'Subexpression cache: (\d+) hits, (\d+) misses', output).groups()))
+
+# The engines (skip lists, roaring bitmaps, or either by density) and the subexpression cache must not change
+# the result of any query, which must also follow the set identities of AND, OR and NOT
+def test_engines_agree_on_set_identities(corpus_directory, index_directory):
+    a, b, c = get_significant_words(corpus_directory, '100050')[:3]
+    queries = [
+        '{}'.format(a), '{}'.format(b), '{} AND {}'.format(a, b), '{} OR {}'.format(a, b), 'NOT {}'.format(a),
+        '{} AND NOT {}'.format(a, b), 'NOT ({} OR {})'.format(a, b), 'NOT {} AND NOT {}'.format(a, b),
+        '({} OR {}) AND {}'.format(a, b, c), '({} AND {}) OR ({} AND {})'.format(a, c, b, c),
+        '{} AND {}'.format(a, b)]
+    results_by_engine = { engine: search(index_directory, queries, engine) for engine in ('list', 'bitmap', 'auto') }
+    results = results_by_engine['list']
+    assert results_by_engine['bitmap'] == results
+    assert results_by_engine['auto'] == results
+    all_doc_ids = set(read_corpus(os.path.join(corpus_directory, corpus_file_name)))
+    a_doc_ids, b_doc_ids = results[0], results[1]
+    assert a_doc_ids and b_doc_ids
+    assert results[2] == a_doc_ids & b_doc_ids
+    assert results[3] == a_doc_ids | b_doc_ids
+    assert results[4] == all_doc_ids - a_doc_ids
+    assert results[5] == a_doc_ids - b_doc_ids
+    assert results[6] == results[7] == all_doc_ids - (a_doc_ids | b_doc_ids)
+    assert results[8] == results[9]
+    # A repeated query (answered from the subexpression cache, see below) gives the same result
+    assert results[10] == results[2]
+
+# The operands of AND and OR are sorted in the key of a subexpression, so a query is answered from the cache
+# after the same query with its operands swapped, with the same result
+@pytest.mark.parametrize('engine', ['list', 'bitmap'])
+def test_repeated_subexpressions_are_cached(corpus_directory, index_directory, engine):
+    a, b, c = get_significant_words(corpus_directory, '100050')[:3]
+    results, output = search_with_output(index_directory, ['{} AND {}'.format(a, b), '{} AND {}'.format(b, a)], engine)
+    assert get_cache_counts(output) == (1, 1)
+    assert results[1] == results[0]
+    # A cached subexpression is replaced as a whole, so its own subtrees are not looked up
+    results, output = search_with_output(index_directory,
+        ['({} OR {}) AND {}'.format(a, b, c), '{} AND ({} OR {})'.format(c, b, a)], engine)
+    assert get_cache_counts(output) == (1, 2)
+    assert results[1] == results[0]
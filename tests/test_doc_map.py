@@ -0,0 +1,45 @@
+import io
+
+from conftest import get_boolean_retrieved_length, get_significant_words, search
+from doc_map import DocMap, get_doc_order
+
+metadata_by_document = {
+    100003: ('2001-01-01 00:00:00', 'SG High Court'),
+    100001: ('1999-01-01 00:00:00', 'SG High Court'),
+    100002: ('2005-01-01 00:00:00', 'HK High Court'),
+    100004: ('2001-01-01 00:00:00', 'SG High Court')
+    }
+
+def test_doc_orders():
+    assert get_doc_order(metadata_by_document, metadata_by_document) == [100001, 100002, 100003, 100004]
+    assert get_doc_order(metadata_by_document, metadata_by_document, 'court_date') == [100002, 100001, 100003, 100004]
+
+def test_round_trip():
+    doc_map = DocMap.build_from(get_doc_order(metadata_by_document, metadata_by_document, 'court_date'), 'court_date')
+    doc_map_file = io.BytesIO()
+    doc_map.dump(doc_map_file)
+    doc_map_file.seek(0)
+    doc_map = DocMap.load(doc_map_file)
+    assert doc_map.get_doc_order() == 'court_date'
+    assert list(doc_map.get_doc_ids()) == [100002, 100001, 100003, 100004]
+    assert list(map(doc_map.get_ordinal, [100001, 100002, 100003, 100004])) == [1, 0, 2, 3]
+    assert doc_map.get_ordinal(100000) is None and doc_map.get_ordinal(100005) is None
+    assert doc_map.get_ordinals_by_doc_id() == { 100002: 0, 100001: 1, 100003: 2, 100004: 3 }
+    assert doc_map.get_doc_id(1) == 100001
+
+# Doc ordinals only renumber the documents of a segment, so the doc order never changes the documents retrieved
+# (only the low list of a boolean query, which the merge with the boolean retrieved postings stops filling at the
+# last of them, depends on the order of the postings)
+def test_doc_order_does_not_change_the_results(make_index):
+    directory_name = make_index()
+    court_date_directory_name = make_index('-r', 'court_date')
+    words = get_significant_words(directory_name, '100140')
+    query = ' '.join(words[:3])
+    doc_ids = search(directory_name, query)
+    assert doc_ids
+    assert sorted(search(court_date_directory_name, query)) == sorted(doc_ids)
+    query = ' AND '.join(words[:2])
+    length = get_boolean_retrieved_length(directory_name, query)
+    assert length
+    assert get_boolean_retrieved_length(court_date_directory_name, query) == length
+    assert sorted(search(court_date_directory_name, query)[:length]) == sorted(search(directory_name, query)[:length])
@@ -0,0 +1,35 @@
+from math import sqrt
+
+from constants import zone_separator
+from forward_index import decode_entries, encode_entries
+from segment import Segment
+
+def test_entries_round_trip():
+    entries = [(3, 1), (5, 2), (130, 1), (100000, 300)]
+    assert encode_entries(entries[:3]) == b'\x03\x01\x02\x02\x7d\x01'
+    assert decode_entries(encode_entries(entries)) == entries
+    assert decode_entries(encode_entries([])) == []
+
+# The forward index is the inverted index turned around, with the df of every term
+def test_forward_index_matches_the_inverted_index(make_index):
+    segment = Segment(make_index(), 'dictionary.txt', 'postings.txt').open()
+    sorted_terms = segment.get_term_index().get_sorted_terms()
+    forward_index = segment.get_forward_index()
+    assert forward_index.get_length() == segment.get_length()
+    entries_by_document = {}
+    for term_id, term in enumerate(sorted_terms):
+        df, postings = segment.load_lemma(term)
+        assert forward_index.dfs[term_id] == df
+        for ordinal, tf in postings.to_list():
+            entries_by_document.setdefault(ordinal, []).append((term_id, tf))
+    for ordinal in range(forward_index.get_length()):
+        assert forward_index.get_entries(ordinal) == entries_by_document.get(ordinal, [])
+    assert forward_index.get_entries(forward_index.get_length()) == []
+    # A document vector is its top content terms by tfidf, normalized to unit length
+    vector = forward_index.get_vector(0, sorted_terms)
+    assert vector
+    assert not any(map(lambda weighted_term: zone_separator in weighted_term[0], vector))
+    assert list(map(lambda weighted_term: weighted_term[1], vector)) == \
+        sorted(map(lambda weighted_term: weighted_term[1], vector), reverse=True)
+    assert abs(sqrt(sum(map(lambda weighted_term: weighted_term[1] ** 2, vector))) - 1) < 1e-9
+    segment.close()
@@ -0,0 +1,46 @@
+import filecmp
+import os
+import re
+import shutil
+
+from conftest import corpus_file_name, corpus_length, corpus_seed, get_significant_words, run_script, search
+
+number_of_queries = 20
+
+# Accepts a directory with stopwords.txt and writes the corpus of the tests with its query logs there
+def generate(directory_name, corpus_file_name):
+    run_script('generate_corpus.py', '-o', corpus_file_name, '-n', corpus_length, '-s', corpus_seed,
+        '-q', number_of_queries, '-f', 'free_text.txt', '-b', 'boolean.txt', directory_name=directory_name)
+    with open(os.path.join(directory_name, 'free_text.txt')) as f, \
+        open(os.path.join(directory_name, 'boolean.txt')) as b:
+        return f.read().splitlines(), b.read().splitlines()
+
+# The queries have their own randomizer, so the corpus of a seed is the same with or without them
+def test_queries_do_not_change_the_corpus(corpus_directory, tmp_path):
+    directory_name = str(tmp_path)
+    shutil.copy(os.path.join(corpus_directory, 'stopwords.txt'), directory_name)
+    generate(directory_name, corpus_file_name)
+    assert filecmp.cmp(os.path.join(directory_name, corpus_file_name), os.path.join(corpus_directory, corpus_file_name),
+        shallow=False)
+
+# Every boolean query is an AND of distinct significant words (or phrases) of one document, so the top document
+# (of the boolean retrieved documents) has all of them
+def test_boolean_queries_are_ands_of_distinct_significant_words(make_index):
+    directory_name = make_index()
+    free_text_queries, boolean_queries = generate(directory_name, 'queries_corpus.csv')
+    assert len(free_text_queries) == len(boolean_queries) == number_of_queries
+    with open(os.path.join(directory_name, 'stopwords.txt')) as s:
+        stopwords = set(filter(None, map(str.strip, s)))
+    for query in free_text_queries:
+        words = query.split()
+        assert 2 <= len(words) <= 5 and len(set(words)) == len(words)
+        assert not stopwords.intersection(words)
+    for query in boolean_queries:
+        operands = query.split(' AND ')
+        assert 2 <= len(operands) <= 3
+        words = sum(map(lambda operand: re.findall(r'\w+', operand), operands), [])
+        assert len(set(words)) == len(words)
+        assert not stopwords.intersection(words)
+    for query in boolean_queries[:5]:
+        doc_id = search(directory_name, query, '-k', 1)[0]
+        assert set(re.findall(r'\w+', query)) - { 'AND' } <= set(get_significant_words(directory_name, doc_id))
@@ -0,0 +1,24 @@
+import json
+import os
+
+from conftest import run_script
+
+def get_stats(directory_name):
+    run_script('index_stats.py', '-d', 'dictionary.txt', '-p', 'postings.txt', '-n', 20, '-o', 'stats.json',
+        directory_name=directory_name)
+    with open(os.path.join(directory_name, 'stats.json')) as s:
+        return json.load(s)
+
+# The lists of a term in every segment are merged, so a term is counted and ranked once however the index is split
+def test_terms_are_counted_once_across_segments(make_index):
+    stats = get_stats(make_index())
+    split_stats = get_stats(make_index('-n', 3))
+    assert split_stats['segments'] == 3
+    assert stats['terms'] == stats['distinct_terms'] == split_stats['terms'] == split_stats['distinct_terms']
+    for name in ('documents', 'postings', 'terms_by_zone', 'vocabulary_growth'):
+        assert split_stats[name] == stats[name]
+    assert sum(map(lambda bucket_stats: bucket_stats['terms'], split_stats['df_histogram'])) == split_stats['terms']
+    top_terms = list(map(lambda top_term: top_term['term'], split_stats['top_terms']))
+    assert len(top_terms) == 20 and len(set(top_terms)) == len(top_terms)
+    assert list(map(lambda top_term: (top_term['term'], top_term['df']), split_stats['top_terms'][:5])) == \
+        list(map(lambda top_term: (top_term['term'], top_term['df']), stats['top_terms'][:5]))
@@ -0,0 +1,34 @@
+import struct
+
+from lengths import DocumentLengths, header_format
+from segment import Segment
+
+lengths = [12, 0, 7, 2 ** 31 - 1]
+
+# The lengths are read through a map of the file, so they are only valid until the lengths are closed
+def test_round_trip(tmp_path):
+    lengths_file_name = str(tmp_path / 'lengths.txt')
+    with open(lengths_file_name, 'wb') as l:
+        DocumentLengths.build_from(lengths).dump(l)
+    with open(lengths_file_name, 'rb') as l:
+        assert l.read(struct.calcsize(header_format)) == struct.pack(header_format, len(lengths))
+    document_lengths = DocumentLengths.load(open(lengths_file_name, 'rb'))
+    assert document_lengths.get_length() == len(lengths)
+    assert list(document_lengths.get_lengths()) == lengths
+    document_lengths.close()
+    assert document_lengths.file_object.closed
+
+def test_empty_lengths(tmp_path):
+    lengths_file_name = str(tmp_path / 'lengths.txt')
+    with open(lengths_file_name, 'wb') as l:
+        DocumentLengths.build_from([]).dump(l)
+    document_lengths = DocumentLengths.load(open(lengths_file_name, 'rb'))
+    assert document_lengths.get_length() == 0
+    document_lengths.close()
+
+# Every document of a segment has a length, addressed by its doc ordinal
+def test_segment_lengths(make_index):
+    segment = Segment(make_index(), 'dictionary.txt', 'postings.txt').open()
+    assert len(segment.get_lengths()) == segment.get_length() > 0
+    assert all(map(lambda length: length > 0, segment.get_lengths()))
+    segment.close()
@@ -0,0 +1,55 @@
+import csv
+import os
+import shutil
+
+from conftest import corpus_file_name, get_significant_words, read_corpus, root_directory_name, run_script, search
+from metadata import MetadataStore
+
+court_name = 'SG High Court'
+date_from = '2000-01-01'
+date_to = '2009-12-31'
+
+# The filters only drop documents (df and N are not filtered), so a filtered ranking is the unfiltered ranking
+# without the documents of other courts and dates
+def test_filters_keep_the_ranking_of_the_allowed_documents(make_index):
+    directory_name = make_index()
+    rows_by_document = read_corpus(os.path.join(directory_name, corpus_file_name))
+    words = get_significant_words(directory_name, '100030')
+    # The filters are checked before scoring, and intersected with the postings in boolean retrieval
+    for query in (' '.join(words[:3]), ' OR '.join(words[:6])):
+        doc_ids = search(directory_name, query)
+        court_doc_ids = list(filter(lambda doc_id: rows_by_document[doc_id][3] == court_name, doc_ids))
+        assert court_doc_ids and court_doc_ids != doc_ids
+        assert search(directory_name, query, '-c', court_name) == court_doc_ids
+        date_doc_ids = list(filter(lambda doc_id: date_from <= rows_by_document[doc_id][2][:10] <= date_to, doc_ids))
+        assert date_doc_ids and date_doc_ids != doc_ids
+        assert search(directory_name, query, '-a', date_from, '-b', date_to) == date_doc_ids
+        assert search(directory_name, query, '-c', court_name, '-a', date_from, '-b', date_to) == \
+            list(filter(lambda doc_id: doc_id in date_doc_ids, court_doc_ids))
+
+# A document without a date_posted is only dropped by a date filter
+def test_missing_dates_are_only_dropped_by_date_filters():
+    metadata_store = MetadataStore.build_from({
+        100001: ('2001-01-01 00:00:00', court_name),
+        100002: ('', court_name),
+        100003: ('2001-01-01 00:00:00', 'HK High Court')
+        })
+    assert metadata_store.get_filter(court_name).to_list() == [0, 1]
+    assert metadata_store.get_filter().to_list() == [0, 1, 2]
+    assert metadata_store.get_filter(court_name, date_from).to_list() == [0]
+    assert metadata_store.get_filter(date_to=date_to).to_list() == [0, 2]
+
+# search.py -c keeps the documents of the court without a date_posted, unless -a or -b is also given
+def test_court_filter_keeps_documents_without_a_date(tmp_path):
+    directory_name = str(tmp_path)
+    shutil.copy(os.path.join(root_directory_name, 'stopwords.txt'), directory_name)
+    with open(os.path.join(directory_name, corpus_file_name), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['document_id', 'title', 'content', 'date_posted', 'court'])
+        writer.writerow(['1', 'Contract', 'Breach of contract.', '2001-01-01 00:00:00', court_name])
+        writer.writerow(['2', 'Contract', 'Breach of contract.', '', court_name])
+        writer.writerow(['3', 'Contract', 'Breach of contract.', '2001-01-01 00:00:00', 'HK High Court'])
+    run_script('index.py', '-i', corpus_file_name, '-d', 'dictionary.txt', '-p', 'postings.txt',
+        directory_name=directory_name)
+    assert sorted(search(directory_name, 'breach', '-c', court_name)) == ['1', '2']
+    assert search(directory_name, 'breach', '-c', court_name, '-a', date_from) == ['1']
@@ -0,0 +1,27 @@
+from positions import decode_positions, encode_positions, has_phrase
+
+def test_positions_are_gap_encoded():
+    assert encode_positions([3, 5, 130]) == b'\x03\x02\x7d'
+    assert encode_positions([]) == b''
+
+def test_positions_round_trip():
+    positions = [0, 1, 127, 128, 255, 16384, 16385, 2 ** 31]
+    assert decode_positions(encode_positions(positions)) == positions
+    # A gap of 128 or more takes a byte for every 7 bits, the low bits first
+    assert encode_positions([300]) == b'\xac\x02'
+
+def test_has_phrase():
+    # e.g. "breach of duty", with "of" a stopword which still takes a position
+    positions_by_lemma = [[2, 10, 20], [12, 30]]
+    assert has_phrase(positions_by_lemma, [0, 2])
+    assert not has_phrase(positions_by_lemma, [0, 1])
+    assert has_phrase([[4, 7], [8], [9]], [0, 1, 2])
+    assert not has_phrase([[4, 7], [8], [10]], [0, 1, 2])
+    assert not has_phrase([[], [1]], [0, 1])
+
+def test_has_phrase_within_slop():
+    positions_by_lemma = [[10], [14]]
+    assert not has_phrase(positions_by_lemma, [0, 1], 2)
+    assert has_phrase(positions_by_lemma, [0, 1], 3)
+    # The other lemmas may also come before the first lemma
+    assert has_phrase([[10], [8]], [0, 1], 3)
@@ -0,0 +1,67 @@
+import ast
+import re
+
+from collections import Counter
+
+import pytest
+
+from conftest import get_significant_words, search, search_with_output
+from constants import zone_weights, get_zone_term
+from segment import Segment
+from segment_search import SegmentSearcher
+
+# Accepts a segment searcher and lemmas and returns { term: df } of the lemmas and of their zone terms
+def get_dfs(searcher, lemmas):
+    terms = lemmas + [get_zone_term(zone_name, lemma) for lemma in lemmas for zone_name in zone_weights]
+    return dict(zip(terms, searcher.get_dfs(terms)))
+
+# An index which the tests only read
+@pytest.fixture(scope='module')
+def index_directory(make_index): return make_index()
+
+# Ranking after query expansion only scores the expansion lemmas on top of the kept scores of the last ranking,
+# which must rank exactly as scoring every lemma again
+@pytest.mark.parametrize('scoring_threads', [0, 2])
+@pytest.mark.parametrize('is_boolean_retrieved', [False, True])
+@pytest.mark.parametrize('k', [None, 5])
+def test_incremental_ranking_matches_a_full_ranking(index_directory, scoring_threads, is_boolean_retrieved, k):
+    searcher = SegmentSearcher(Segment(index_directory, 'dictionary.txt', 'postings.txt').open())
+    searcher.set_scoring_threads(scoring_threads)
+    words = list(dict.fromkeys(get_significant_words(index_directory, '100120')))
+    lemmas, expansion_lemmas = words[:2], words[2:6]
+    query_tfs = Counter(lemmas + expansion_lemmas)
+    dfs = get_dfs(searcher, words[:7])
+    N = searcher.get_length()
+    if is_boolean_retrieved:
+        assert searcher.boolean_retrieve(lemmas[:1])
+    ranked_docs = searcher.get_relevant_docs(is_boolean_retrieved, lemmas, query_tfs, dfs, N, k)
+    scored_lemmas = []
+    get_lemma_scores = searcher.get_lemma_scores
+    searcher.get_lemma_scores = lambda is_boolean_retrieved, lemma, *args: \
+        scored_lemmas.append(lemma) or get_lemma_scores(is_boolean_retrieved, lemma, *args)
+    expanded_ranked_docs = searcher.get_expanded_relevant_docs(
+        is_boolean_retrieved, lemmas + expansion_lemmas, query_tfs, dfs, N, k)
+    assert sorted(scored_lemmas) == sorted(expansion_lemmas)
+    assert expanded_ranked_docs != ranked_docs
+    assert expanded_ranked_docs == searcher.get_relevant_docs(
+        is_boolean_retrieved, lemmas + expansion_lemmas, query_tfs, dfs, N, k)
+    # Any other change to the scoring arguments (e.g. the dfs after an update) scores every lemma again
+    scored_lemmas.clear()
+    dfs[lemmas[0]] += 1
+    expanded_ranked_docs = searcher.get_expanded_relevant_docs(
+        is_boolean_retrieved, lemmas + expansion_lemmas + words[6:7], query_tfs + Counter(words[6:7]), dfs, N, k)
+    assert sorted(scored_lemmas) == sorted(lemmas + expansion_lemmas + words[6:7])
+    searcher.close()
+
+# Accepts the standard output of search.py and returns the printed query expansion terms
+def get_query_expansion(output):
+    return ast.literal_eval(re.search(r'Query expansion: (.*)', output).group(1).replace('set()', '{}')) or set()
+
+# The Rocchio expansion terms are scored in the second ranking, so they retrieve documents without any query term
+def test_rocchio_expansion_moves_documents(index_directory):
+    query = ' '.join(get_significant_words(index_directory, '100130')[:2])
+    semi_auto_doc_ids = search(index_directory, query, '-e', 'semi_auto')
+    rocchio_doc_ids, output = search_with_output(index_directory, query, '-e', 'rocchio')
+    assert get_query_expansion(output)
+    assert rocchio_doc_ids != semi_auto_doc_ids
+    assert set(rocchio_doc_ids) > set(semi_auto_doc_ids)
@@ -0,0 +1,59 @@
+import os
+import pickle
+
+from conftest import get_significant_words, run_script, search_with_output
+from result_cache import ResultCache, get_query_key
+
+id_tfidf_tuples = [(100001, 0.5), (100002, 0.25)]
+
+def test_results_are_kept_for_the_same_fingerprint(tmp_path):
+    cache_file_name = str(tmp_path / 'cache.db')
+    result_cache = ResultCache(cache_file_name, 'a')
+    assert result_cache.get('key') is None
+    result_cache.put('key', id_tfidf_tuples)
+    result_cache.close()
+    result_cache = ResultCache(cache_file_name, 'a')
+    assert result_cache.get('key') == id_tfidf_tuples
+    assert result_cache.get_stats()['hits'] == result_cache.get_stats()['misses'] == 1
+    result_cache.close()
+    # Any change to the index changes its fingerprint, which drops every entry
+    result_cache = ResultCache(cache_file_name, 'b')
+    assert result_cache.get('key') is None
+    assert result_cache.get_stats()['entries'] == 0
+    result_cache.close()
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    result_cache = ResultCache(str(tmp_path / 'cache.db'), 'a', 2 * len(pickle.dumps(id_tfidf_tuples)))
+    for key in ('a', 'b'):
+        result_cache.put(key, id_tfidf_tuples)
+    result_cache.get('a')
+    result_cache.put('c', id_tfidf_tuples)
+    assert result_cache.get_stats()['evictions'] == 1
+    assert result_cache.get('b') is None
+    assert result_cache.get('a') == result_cache.get('c') == id_tfidf_tuples
+    result_cache.close()
+
+def test_query_keys():
+    key = get_query_key(['contract', 'breach'], ['contract', 'breach'], [], [], True, (None, None, None, 'x'), None)
+    assert get_query_key(['breach', 'contract'], ['breach', 'contract'], [], [], True, (None, None, None, 'x'), None) \
+        == key
+    assert get_query_key(['breach', 'contract'], ['breach', 'contract'], [], [], True, (None, None, None, 'x'), 10) \
+        != key
+    assert get_query_key([], ['breach', 'contract'], [], [], False, (None, None, None, 'x'), None) != key
+
+# A repeated query (or one analyzed to the same terms) is answered from the cache, until the index is updated
+def test_search_results_are_cached_until_the_index_changes(make_index):
+    directory_name = make_index()
+    a, b = get_significant_words(directory_name, '100110')[:2]
+    doc_ids, output = search_with_output(directory_name, '{} {}'.format(a, b), '-r')
+    assert 'Cached results' not in output
+    cached_doc_ids, output = search_with_output(directory_name, '{} the {}'.format(b.upper(), a), '-r')
+    assert 'Cached results' in output
+    assert cached_doc_ids == doc_ids
+    with open(os.path.join(directory_name, 'deleted.txt'), 'w') as d:
+        d.write(doc_ids[0] + '\n')
+    run_script('update.py', '-d', 'dictionary.txt', '-p', 'postings.txt', '-r', 'deleted.txt',
+        directory_name=directory_name)
+    updated_doc_ids, output = search_with_output(directory_name, '{} {}'.format(a, b), '-r')
+    assert 'Cached results' not in output
+    assert doc_ids[0] not in updated_doc_ids
@@ -0,0 +1,34 @@
+import io
+import os
+
+from conftest import get_significant_words, run_script, search
+from result_writer import ResultWriter, read_results
+
+id_tfidf_tuples = [(100001, 0.5), (100002, 0.25), (100003, 0.125), (100004, 0.0625), (100005, 0.03125)]
+
+def test_text_results_are_written_in_chunks():
+    file_object = io.StringIO()
+    result_writer = ResultWriter(file_object, 'text', 2)
+    result_writer.write_results(iter(id_tfidf_tuples))
+    result_writer.write_results(iter([]))
+    assert file_object.getvalue() == '100001 100002 100003 100004 100005\n\n'
+
+def test_binary_results_round_trip():
+    file_object = io.BytesIO()
+    result_writer = ResultWriter(file_object, 'binary', 2)
+    result_writer.write_results(iter(id_tfidf_tuples))
+    result_writer.write_results(iter([]))
+    result_writer.write_results(iter(id_tfidf_tuples[:2]))
+    file_object.seek(0)
+    assert list(read_results(file_object)) == [id_tfidf_tuples, [], id_tfidf_tuples[:2]]
+
+def test_binary_output_of_search(make_index):
+    directory_name = make_index()
+    query = ' '.join(get_significant_words(directory_name, '100070')[:3])
+    doc_ids = search(directory_name, query)
+    run_script('search.py', '-d', 'dictionary.txt', '-p', 'postings.txt', '-q', 'query.txt', '-o', 'output.bin',
+        '-f', 'binary', directory_name=directory_name)
+    with open(os.path.join(directory_name, 'output.bin'), 'rb') as o:
+        results = list(read_results(o))
+    assert len(results) == 1
+    assert list(map(lambda id_tfidf_tuple: str(id_tfidf_tuple[0]), results[0])) == doc_ids
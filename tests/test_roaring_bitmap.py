@@ -0,0 +1,46 @@
+import random
+
+from conftest import import_project_module
+
+roaring_bitmap = import_project_module('boolean_retrieval', 'roaring_bitmap')
+RoaringBitmap = roaring_bitmap.RoaringBitmap
+
+# Sparse, dense and consecutive postings, so that every kind of container is built
+def get_postings(randomizer):
+    postings = set(randomizer.sample(range(1 << 20), 3000))
+    postings.update(randomizer.sample(range(3 << 16, 4 << 16), 20000))
+    postings.update(range(5 << 16, (5 << 16) + 3000))
+    return sorted(postings)
+
+def get_bitmap(postings): return RoaringBitmap().build_from(postings)
+
+def test_containers():
+    bitmap = get_bitmap(get_postings(random.Random(0)))
+    assert isinstance(bitmap.containers[0], roaring_bitmap.ArrayContainer)
+    assert isinstance(bitmap.containers[3], roaring_bitmap.BitsetContainer)
+    assert isinstance(bitmap.containers[5], roaring_bitmap.RunContainer)
+
+def test_round_trip():
+    postings = get_postings(random.Random(1))
+    bitmap = get_bitmap(postings)
+    assert bitmap.to_list() == postings
+    assert bitmap.get_length() == len(postings)
+    assert get_bitmap([]).to_list() == []
+
+def test_operations_match_set_operations():
+    randomizer = random.Random(2)
+    for i in range(5):
+        postings_a, postings_b = get_postings(randomizer), get_postings(randomizer)
+        bitmap_a, bitmap_b = get_bitmap(postings_a), get_bitmap(postings_b)
+        for bitmap, expected_postings in (
+            (bitmap_a.intersection(bitmap_b), set(postings_a) & set(postings_b)),
+            (bitmap_a.union(bitmap_b), set(postings_a) | set(postings_b)),
+            (bitmap_a.difference(bitmap_b), set(postings_a) - set(postings_b))):
+            assert bitmap.to_list() == sorted(expected_postings)
+            assert bitmap.get_length() == len(expected_postings)
+
+def test_operations_drop_empty_containers():
+    bitmap_a = get_bitmap([1, 2, 3, 70000])
+    bitmap_b = get_bitmap([4, 70000])
+    assert list(bitmap_a.intersection(bitmap_b).containers) == [1]
+    assert list(bitmap_a.difference(bitmap_a).containers) == []
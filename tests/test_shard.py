@@ -0,0 +1,26 @@
+import pytest
+
+from conftest import get_significant_words, search
+
+# Accepts the directory of an index and returns a free text query and boolean queries of words of the corpus
+def get_queries(directory_name):
+    words = get_significant_words(directory_name, '100010') + get_significant_words(directory_name, '100020')
+    return [' '.join(words[:3]), '{} AND {}'.format(*words[:2]), '{} OR {}'.format(words[0], words[-1])]
+
+# Every segment (or shard) scores with the global df and N, so splitting the collection never changes the ranking
+@pytest.mark.parametrize('index_args', [('-n', 3), ('-k', 2)], ids=['segments', 'shards'])
+def test_split_index_ranks_as_a_single_index(make_index, index_args):
+    single_directory_name = make_index()
+    split_directory_name = make_index(*index_args)
+    for query in get_queries(single_directory_name):
+        doc_ids = search(single_directory_name, query)
+        assert doc_ids
+        assert search(split_directory_name, query) == doc_ids
+
+# Scoring threads score the lemmas of a query in parallel, but their scores are then set in query order (the last
+# lemma scoring a document wins, and only zone scores are added) exactly as by one thread
+@pytest.mark.parametrize('index_args', [(), ('-n', 3), ('-k', 2)], ids=['single', 'segments', 'shards'])
+def test_scoring_threads_rank_as_one_thread(make_index, index_args):
+    directory_name = make_index(*index_args)
+    for query in get_queries(directory_name):
+        assert search(directory_name, query, '-j', 4) == search(directory_name, query)
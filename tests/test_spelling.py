@@ -0,0 +1,55 @@
+import io
+import re
+
+from conftest import get_significant_words, search_with_output
+from spelling import KGramIndex, get_edit_distance, get_kgrams
+
+terms = sorted(['cocoa', 'coconut', 'contract', 'contact', 'contracts', 'tort', 'torts', 'title:contract', '1998'])
+
+def test_kgrams():
+    assert get_kgrams('tort') == { '$t', 'to', 'or', 'rt', 't$' }
+
+def test_edit_distance():
+    assert get_edit_distance('contract', 'contract', 2) == 0
+    assert get_edit_distance('kitten', 'sitting', 3) == 3
+    # A transposition of adjacent letters is one edit
+    assert get_edit_distance('cocao', 'cocoa', 2) == 1
+    # Optimal string alignment never edits a substring twice, so 'ca' -> 'abc' is 3 edits (not 2 as with
+    # unrestricted transpositions)
+    assert get_edit_distance('ca', 'abc', 3) == 3
+    # The distance is only computed up to the maximum distance
+    assert get_edit_distance('contract', 'tort', 2) == 3
+
+def test_candidates():
+    kgram_index = KGramIndex.build_from(terms)
+    assert sorted(kgram_index.get_candidates('contrat', 2)) == [('contact', 2), ('contract', 1), ('contracts', 2)]
+    assert kgram_index.get_candidates('cocao', 2) == [('cocoa', 1)]
+    # A word of at most short_word_length letters is only corrected within distance 1
+    assert kgram_index.get_candidates('tarp', 2) == []
+    assert kgram_index.get_candidates('trot', 2) == [('tort', 1)]
+    # Zone terms and non-alphabetical terms are never candidates
+    assert kgram_index.get_candidates('title:contract', 2) == []
+    assert kgram_index.get_candidates('1988', 2) == []
+
+def test_round_trip():
+    kgram_index_file = io.BytesIO()
+    KGramIndex.build_from(terms).dump(kgram_index_file)
+    kgram_index_file.seek(0)
+    kgram_index = KGramIndex.load(kgram_index_file, terms)
+    assert kgram_index.get_candidates('cocao', 2) == [('cocoa', 1)]
+
+# Accepts the standard output of search.py and returns [(misspelled lemma, corrected term)] as reported
+def get_corrections(output):
+    return re.findall(r'Corrected (\S+) to (\S+)', output)
+
+# Only the significant words of a query are corrected (never stopwords, operators or zones), and each once
+def test_query_terms_are_corrected(make_index):
+    directory_name = make_index()
+    a, b = get_significant_words(directory_name, '100100')[:2]
+    misspelled_a = a[0] + a[2] + a[1] + a[3:]
+    doc_ids, output = search_with_output(directory_name, '{} AND {}'.format(a, b))
+    corrected_doc_ids, output = search_with_output(directory_name,
+        'The {} AND {} and "{} {}"'.format(misspelled_a.upper(), b, misspelled_a, b), '-s')
+    assert get_corrections(output) == [(misspelled_a, a)]
+    assert corrected_doc_ids[0] == doc_ids[0] == '100100'
+    assert get_corrections(search_with_output(directory_name, 'onto the {}'.format(b), '-s')[1]) == []
@@ -0,0 +1,37 @@
+import io
+
+from conftest import get_boolean_retrieved_length, get_significant_words, search
+from term_index import TermIndex
+
+terms = ['negligence', 'negligent', 'neglect', 'diligence', 'licence', 'contract', 'title:negligence', 'court:high']
+
+def test_matches():
+    term_index = TermIndex.build_from(terms)
+    assert term_index.get_matches('neglig*', 10) == ['negligence', 'negligent']
+    assert term_index.get_matches('neg*nce', 10) == ['negligence']
+    assert sorted(term_index.get_matches('*ence', 10)) == ['diligence', 'licence', 'negligence']
+    assert sorted(term_index.get_matches('*lig*', 10)) == ['diligence', 'negligence', 'negligent']
+    assert term_index.get_matches('neglig*', 1) == ['negligence']
+    assert term_index.get_matches('tort*', 10) == []
+    # Zone terms are only matched by patterns of a zone
+    assert term_index.get_matches('title:neg*', 10) == ['title:negligence']
+
+def test_round_trip():
+    term_index_file = io.BytesIO()
+    TermIndex.build_from(terms).dump(term_index_file)
+    term_index_file.seek(0)
+    term_index = TermIndex.load(term_index_file)
+    assert term_index.get_sorted_terms() == sorted(terms)
+    assert sorted(term_index.get_matches('*ence', 10)) == ['diligence', 'licence', 'negligence']
+
+# A wildcard operand is the OR of its terms wherever it is in a boolean query
+def test_wildcard_operands_in_any_position(make_index):
+    directory_name = make_index()
+    a, b = get_significant_words(directory_name, '100090')[:2]
+    pattern = a[:4] + '*'
+    assert search(directory_name, '{} AND {}'.format(pattern, b), '-k', 1) == ['100090']
+    length = get_boolean_retrieved_length(directory_name, '{} AND {}'.format(pattern, b))
+    assert length >= 1
+    assert get_boolean_retrieved_length(directory_name, '{} AND {}'.format(b, pattern)) == length
+    assert get_boolean_retrieved_length(directory_name, '{} AND "{}"'.format(pattern.upper(), b)) == length
+    assert get_boolean_retrieved_length(directory_name, '{} OR {}'.format(pattern, b)) > length
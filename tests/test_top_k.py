@@ -0,0 +1,16 @@
+import pytest
+
+from conftest import get_significant_words, search
+
+# Every segment only ranks its top k documents, so the merged top k must be the first k of the full ranking
+# The query expansion must not depend on k either, whatever its mode
+@pytest.mark.parametrize('index_args', [(), ('-n', 3)], ids=['single', 'segments'])
+@pytest.mark.parametrize('expansion_args', [(), ('-e', 'rocchio')], ids=['semi_auto', 'rocchio'])
+def test_top_k_is_a_prefix_of_the_full_ranking(make_index, index_args, expansion_args):
+    directory_name = make_index(*index_args)
+    words = get_significant_words(directory_name, '100060')
+    for query in (' '.join(words[:4]), ' OR '.join(words[:4])):
+        doc_ids = search(directory_name, query, '-k', 'all', *expansion_args)
+        assert len(doc_ids) > 5
+        for k in (1, 5, len(doc_ids) + 1):
+            assert search(directory_name, query, '-k', k, *expansion_args) == doc_ids[:k]
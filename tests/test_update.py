@@ -0,0 +1,97 @@
+import csv
+import os
+import shutil
+
+from conftest import corpus_file_name, get_significant_words, read_corpus, run_script, search
+
+deleted_doc_id = '100000'
+updated_doc_id = '100001'
+updated_content = 'Zyzzyva quokka zyzzyva.'
+
+def write_doc_ids(directory_name, doc_ids):
+    with open(os.path.join(directory_name, 'deleted.txt'), 'w') as d:
+        d.write(''.join(map(lambda doc_id: doc_id + '\n', doc_ids)))
+
+# Accepts a directory, a CSV file name and { doc id: [title, content, date_posted, court] } and writes them as a corpus
+def write_corpus(directory_name, file_name, rows_by_document):
+    with open(os.path.join(directory_name, file_name), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['document_id', 'title', 'content', 'date_posted', 'court'])
+        for doc_id, row in rows_by_document.items():
+            writer.writerow([doc_id] + row)
+
+def update(directory_name, *args):
+    run_script('update.py', '-d', 'dictionary.txt', '-p', 'postings.txt', *args, directory_name=directory_name)
+
+# Writes the updated document of updated_doc_id as updated.csv and returns the rows of the updated corpus
+def write_updated_document(directory_name):
+    rows_by_document = read_corpus(os.path.join(directory_name, corpus_file_name))
+    rows_by_document[updated_doc_id][1] = updated_content
+    write_corpus(directory_name, 'updated.csv', { updated_doc_id: rows_by_document[updated_doc_id] })
+    return rows_by_document
+
+def test_deleted_document_is_not_retrieved(make_index):
+    directory_name = make_index()
+    word = get_significant_words(directory_name, deleted_doc_id)[0]
+    doc_ids = search(directory_name, word)
+    assert deleted_doc_id in doc_ids
+    write_doc_ids(directory_name, [deleted_doc_id])
+    update(directory_name, '-r', 'deleted.txt')
+    assert os.path.exists(os.path.join(directory_name, 'deletions.txt'))
+    assert set(search(directory_name, word)) == set(doc_ids) - { deleted_doc_id }
+
+def test_updated_document_is_retrieved_by_its_new_content_only(make_index):
+    directory_name = make_index()
+    old_words = get_significant_words(directory_name, updated_doc_id)
+    write_updated_document(directory_name)
+    update(directory_name, '-u', 'updated.csv')
+    assert search(directory_name, 'quokka') == [updated_doc_id]
+    assert updated_doc_id not in search(directory_name, ' '.join(old_words[:3]))
+
+# Compaction drops the tombstoned postings and folds the delta segment into the main index, so the index ranks
+# exactly as a new index of the updated corpus
+def test_compaction_ranks_as_a_new_index(make_index, tmp_path):
+    directory_name = make_index()
+    queries = [' '.join(get_significant_words(directory_name, doc_id)[:2]) for doc_id in ('100002', '100003')]
+    queries += [get_significant_words(directory_name, deleted_doc_id)[0], 'quokka']
+    write_doc_ids(directory_name, [deleted_doc_id])
+    rows_by_document = write_updated_document(directory_name)
+    update(directory_name, '-r', 'deleted.txt', '-u', 'updated.csv')
+    update(directory_name, '-c')
+    assert not os.path.exists(os.path.join(directory_name, 'deletions.txt'))
+    assert not os.path.exists(os.path.join(directory_name, 'delta'))
+    del rows_by_document[deleted_doc_id]
+    new_directory_name = str(tmp_path)
+    shutil.copy(os.path.join(directory_name, 'stopwords.txt'), new_directory_name)
+    write_corpus(new_directory_name, corpus_file_name, rows_by_document)
+    run_script('index.py', '-i', corpus_file_name, '-d', 'dictionary.txt', '-p', 'postings.txt',
+        directory_name=new_directory_name)
+    for query in queries:
+        assert search(directory_name, query) == search(new_directory_name, query)
+        # Compaction also rebuilds the forward index, which Rocchio expansion reads
+        assert search(directory_name, query, '-e', 'rocchio') == search(new_directory_name, query, '-e', 'rocchio')
+
+# A sharded index has no main index, and every document is deleted or updated in the shard of its doc id, so that
+# the updated index ranks exactly as a new sharded index of the updated corpus
+def test_sharded_index_is_updated(make_index, tmp_path):
+    # An index sharded again has no main index left to be updated instead of the shards
+    directory_name = make_index()
+    run_script('index.py', '-i', corpus_file_name, '-d', 'dictionary.txt', '-p', 'postings.txt', '-k', 2,
+        directory_name=directory_name)
+    assert not os.path.exists(os.path.join(directory_name, 'dictionary.txt'))
+    assert not os.path.exists(os.path.join(directory_name, 'lengths.txt'))
+    word = get_significant_words(directory_name, deleted_doc_id)[0]
+    assert deleted_doc_id in search(directory_name, word)
+    write_doc_ids(directory_name, [deleted_doc_id])
+    rows_by_document = write_updated_document(directory_name)
+    update(directory_name, '-r', 'deleted.txt', '-u', 'updated.csv')
+    assert deleted_doc_id not in search(directory_name, word)
+    assert search(directory_name, 'quokka') == [updated_doc_id]
+    del rows_by_document[deleted_doc_id]
+    new_directory_name = str(tmp_path)
+    shutil.copy(os.path.join(directory_name, 'stopwords.txt'), new_directory_name)
+    write_corpus(new_directory_name, corpus_file_name, rows_by_document)
+    run_script('index.py', '-i', corpus_file_name, '-d', 'dictionary.txt', '-p', 'postings.txt', '-k', 2,
+        directory_name=new_directory_name)
+    for query in (word, ' '.join(get_significant_words(directory_name, '100002')[:2]), 'quokka'):
+        assert search(directory_name, query) == search(new_directory_name, query)
@@ -0,0 +1,66 @@
+import os
+import pickle
+import shutil
+import struct
+
+from array import array
+
+import pytest
+
+from conftest import (corpus_file_name, get_significant_words, import_project_module, read_corpus,
+    root_directory_name, run_script)
+
+project_directory_name = 'vector_space_model'
+
+# A directory with an index of the content of every document of the corpus, one file per document (named by doc id)
+@pytest.fixture(scope='module')
+def index_directory(corpus_directory, tmp_path_factory):
+    directory_name = str(tmp_path_factory.mktemp(project_directory_name))
+    shutil.copy(os.path.join(root_directory_name, project_directory_name, 'stopwords.txt'), directory_name)
+    documents_directory_name = os.path.join(directory_name, 'documents')
+    os.mkdir(documents_directory_name)
+    for doc_id, row in read_corpus(os.path.join(corpus_directory, corpus_file_name)).items():
+        with open(os.path.join(documents_directory_name, doc_id), 'w') as f:
+            f.write(row[1])
+    run_script(os.path.join(project_directory_name, 'index.py'), '-i', 'documents', '-d', 'dictionary.txt',
+        '-p', 'postings.txt', directory_name=directory_name)
+    return directory_name
+
+# Accepts an index directory and the file names of the queries and of the output and
+# Returns the ranked doc ids of every query
+def search(directory_name, queries_file_name, output_file_name):
+    run_script(os.path.join(project_directory_name, 'search.py'), '-d', 'dictionary.txt', '-p', 'postings.txt',
+        '-q', queries_file_name, '-o', output_file_name, directory_name=directory_name)
+    with open(os.path.join(directory_name, output_file_name)) as o:
+        return list(map(str.split, o))
+
+# The index shipped with the project has pickled lengths (written before they were an int32 array), which are
+# still loaded, so searching it gives the shipped output
+def test_shipped_index(tmp_path):
+    directory_name = os.path.join(root_directory_name, project_directory_name)
+    output_file_name = str(tmp_path / 'output.txt')
+    with open(os.path.join(directory_name, 'output.txt')) as o:
+        assert search(directory_name, 'queries.txt', output_file_name) == list(map(str.split, o))
+
+# The int32 lengths of an index rank as the pickled lengths of the same index
+def test_lengths_formats_rank_the_same(corpus_directory, index_directory, tmp_path):
+    with open(os.path.join(index_directory, 'queries.txt'), 'w') as q:
+        for doc_id in ('100050', '100060'):
+            q.write(' '.join(get_significant_words(corpus_directory, doc_id)[:3]) + '\n')
+    results = search(index_directory, 'queries.txt', 'output.txt')
+    assert all(results)
+    constants = import_project_module(project_directory_name, 'constants')
+    header_length = struct.calcsize(constants.lengths_header_format)
+    with open(os.path.join(index_directory, constants.lengths_file_name), 'rb') as l:
+        N, length = struct.unpack(constants.lengths_header_format, l.read(header_length))
+        lengths = array('i', l.read())
+    assert N == len(read_corpus(os.path.join(corpus_directory, corpus_file_name))) == len(list(filter(None, lengths)))
+    assert len(lengths) == length
+    # The pickled lengths are N and { doc_id: length }
+    directory_name = str(tmp_path)
+    for file_name in ('stopwords.txt', 'dictionary.txt', 'postings.txt', 'queries.txt'):
+        shutil.copy(os.path.join(index_directory, file_name), directory_name)
+    with open(os.path.join(directory_name, constants.lengths_file_name), 'wb') as l:
+        pickle.dump(N, l)
+        pickle.dump({ doc_id: length for doc_id, length in enumerate(lengths) if length }, l)
+    assert search(directory_name, 'queries.txt', 'output.txt') == results
@@ -0,0 +1,48 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+from conftest import corpus_file_name, get_boolean_retrieved_length, root_directory_name, run_script, search
+
+# document_id, title, content, date_posted, court
+rows = [
+    ('1', 'Contract dispute', 'Breach of warranty and damage.', '2001-01-01 00:00:00', 'SG High Court'),
+    ('2', 'Tort claim', 'Breach of contract and damage.', '2001-01-01 00:00:00', 'SG High Court'),
+    ('3', 'Contract appeal', 'The breach of contract in tort.', '2002-01-01 00:00:00', 'SG Court of Appeal'),
+    ('4', 'Tort appeal', 'The breach of contract in tort.', '2002-01-01 00:00:00', 'SG Court of Appeal'),
+    # Only stopwords in its content, so only its zones can match
+    ('5', 'Contract', 'It is what it was.', '2003-01-01 00:00:00', 'SG High Court')]
+
+# An index of the rows, which the tests only read
+@pytest.fixture(scope='module')
+def index_directory(tmp_path_factory):
+    directory_name = str(tmp_path_factory.mktemp('zones'))
+    shutil.copy(os.path.join(root_directory_name, 'stopwords.txt'), directory_name)
+    with open(os.path.join(directory_name, corpus_file_name), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['document_id', 'title', 'content', 'date_posted', 'court'])
+        writer.writerows(rows)
+    run_script('index.py', '-i', corpus_file_name, '-d', 'dictionary.txt', '-p', 'postings.txt',
+        directory_name=directory_name)
+    return directory_name
+
+# A zone term of a boolean query restricts the result to the documents with the word in that zone
+def test_zone_terms_restrict_boolean_queries(index_directory):
+    for query, doc_ids in (('title:contract AND breach', ['1', '3']), ('title:tort AND contract', ['2', '4']),
+        ('court:appeal AND title:contract', ['3'])):
+        length = get_boolean_retrieved_length(index_directory, query)
+        assert length == len(doc_ids)
+        assert sorted(search(index_directory, query)[:length]) == doc_ids
+
+# A query lemma in a weighted zone (see zone_weights) raises a document above one with the same content
+def test_zone_weights_boost_documents(index_directory):
+    doc_ids = search(index_directory, 'contract')
+    assert doc_ids.index('3') < doc_ids.index('4')
+    doc_ids = search(index_directory, 'tort')
+    assert doc_ids.index('4') < doc_ids.index('3')
+
+# A document matched only in a zone has no significant content word, which must not fail the normalization
+def test_documents_without_content_words_are_ranked(index_directory):
+    assert sorted(search(index_directory, 'title:contract')) == ['1', '3', '5']
@@ -0,0 +1,135 @@
+### Spans and counters of the query pipeline, which cost one check when tracing is off ###
+
+import json
+import os
+import threading
+
+from time import perf_counter
+
+'''
+Tracing is off until enable_tracing is called (by search.py -t), so that every span and count is a single
+check of the module-level tracer when it is off
+    - span(name) times a phase of the current query, e.g. with span('boolean_retrieve'): ...
+    - add_count(name, value) adds to a counter of the current query, e.g. bytes read or postings decoded
+    - Every query is a record of its duration, the total duration of every phase and its counters
+    - The trace file is either JSON lines (one record per query) or a Chrome trace (chrome://tracing) of every
+        span, if its name ends with .json
+Spans and counters of shards are recorded by their worker processes, so they are not in the trace
+'''
+class Tracer:
+    origin = 0
+    lock = None
+    events = None   # [(name, start time, stop time, thread id, args)] of every span
+    records = None  # [record] of every finished query
+    query_index = 0
+    query = None
+    query_start_time = 0
+    query_event_index = 0
+    counters = None # { counter name: value } of the current query
+
+    def __init__(self):
+        self.origin = perf_counter()
+        self.lock = threading.Lock()
+        self.events = []
+        self.records = []
+        self.counters = {}
+
+    def add_event(self, name, start_time, stop_time, args):
+        self.events.append((name, start_time, stop_time, threading.get_ident(), args))
+
+    def add_count(self, name, value):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def begin_query(self, query):
+        self.query_index += 1
+        self.query = query
+        self.query_start_time = perf_counter()
+        self.query_event_index = len(self.events)
+        self.counters = {}
+
+    def end_query(self):
+        stop_time = perf_counter()
+        phases = {}
+        for name, start_time, event_stop_time, thread_id, args in self.events[self.query_event_index:]:
+            phases[name] = phases.get(name, 0) + (event_stop_time - start_time) * 1000
+        self.records.append({
+            'query_index': self.query_index,
+            'query': self.query,
+            'duration_ms': (stop_time - self.query_start_time) * 1000,
+            'phases_ms': phases,
+            'counters': self.counters
+            })
+        self.add_event('query', self.query_start_time, stop_time, { 'query': self.query })
+
+    def write(self, trace_file_name):
+        with open(trace_file_name, 'w') as t:
+            if not trace_file_name.endswith('.json'):
+                for record in self.records:
+                    t.write(json.dumps(record, sort_keys=True))
+                    t.write('\n')
+                return
+            trace_events = [{
+                'name': name,
+                'ph': 'X',
+                'ts': (start_time - self.origin) * 1000000,
+                'dur': (stop_time - start_time) * 1000000,
+                'pid': os.getpid(),
+                'tid': thread_id,
+                'args': args
+                } for name, start_time, stop_time, thread_id, args in self.events]
+            json.dump({ 'traceEvents': trace_events, 'displayTimeUnit': 'ms' }, t)
+
+class Span:
+    name = None
+    args = None
+    start_time = 0
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start_time = perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if tracer is not None:
+            tracer.add_event(self.name, self.start_time, perf_counter(), self.args)
+        return False
+
+# Stands for every span while tracing is off
+class NullSpan:
+    def __enter__(self): return self
+    def __exit__(self, exception_type, exception, traceback): return False
+
+tracer = None
+null_span = NullSpan()
+
+def enable_tracing():
+    global tracer
+    tracer = Tracer()
+
+def is_enabled(): return tracer is not None
+
+# Accepts a phase name and optional arguments (shown in the Chrome trace) and returns a context manager
+def span(name, **args):
+    if tracer is None:
+        return null_span
+    return Span(name, args)
+
+def add_count(name, value=1):
+    if tracer is not None:
+        tracer.add_count(name, value)
+
+def begin_query(query):
+    if tracer is not None:
+        tracer.begin_query(query)
+
+def end_query():
+    if tracer is not None:
+        tracer.end_query()
+
+def write_trace(trace_file_name):
+    if tracer is not None:
+        tracer.write(trace_file_name)
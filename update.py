@@ -0,0 +1,240 @@
+#!/usr/bin/python
+import sys
+import getopt
+
+import os
+import shutil
+import pickle
+
+import csv
+
+from time import time
+
+from constants import delta_directory_name, print_time
+from doc_map import DocMap, get_doc_order
+from forward_index import ForwardIndexBuilder
+from lengths import DocumentLengths
+from index_writer import IndexWriter, get_ordinal_postings, write_lexicon
+from metadata import MetadataStore
+from segment import Segment, get_segments
+from shard import get_shard_directory_names, get_shard_index
+
+# Adapted from: https://stackoverflow.com/a/15063941
+max_int = sys.maxsize
+should_decrement = True
+while should_decrement:
+    try:
+        csv.field_size_limit(max_int)
+        should_decrement = False
+    except OverflowError:
+        max_int = int(max_int / 2)
+
+start_time = time()
+
+'''
+Deletes and updates documents without re-indexing the whole collection
+    - Segments are never rewritten except by compaction (see segment.py for the segments of an index)
+    - A deleted document is tombstoned in the deletions bitmap (deletions.txt) of its segment
+    - An updated document is a deletion followed by an append into the delta segment (delta/)
+    - Compaction folds the delta segment into the main index and physically drops tombstoned postings
+A sharded index (index.py -k) has no main index and no delta segment, since every shard is searched on its own
+    - A document is deleted or updated in the shard of its doc id (see get_shard_index of shard.py)
+    - The updated documents of a shard are appended by compacting the shard with them at once
+'''
+def do_updating(dictionary_file_name, postings_file_name, deleted_doc_ids, csv_file_path, should_compact):
+    shard_directory_names = get_shard_directory_names()
+    if shard_directory_names:
+        segments = list(map(lambda shard_directory_name: Segment(shard_directory_name).load_lengths(),
+            shard_directory_names))
+        deltas = [IndexWriter() for segment in segments]
+    else:
+        segments = list(map(
+            lambda segment: segment.load_lengths(),
+            filter(
+                lambda segment: segment.get_directory_name() != delta_directory_name,
+                get_segments(dictionary_file_name, postings_file_name))))
+        delta_segment = Segment(delta_directory_name)
+        deltas = [IndexWriter.load(*delta_segment.get_index_file_names())]
+    # Accepts a doc id and returns the delta of its shard (the delta segment if the index is not sharded)
+    get_delta = lambda doc_id: deltas[get_shard_index(doc_id, len(deltas))]
+    for doc_id in deleted_doc_ids:
+        delete_document(doc_id, segments, get_delta(doc_id))
+    if csv_file_path is not None:
+        with open(csv_file_path, 'r', errors='ignore') as f:
+            reader = csv.reader(f)
+            columns = list(filter(None, next(reader)))
+            for csv_row in reader:
+                document_id, title, content, date_posted, court = csv_row
+                posting = int(document_id)
+                delete_document(posting, segments, get_delta(posting))
+                get_delta(posting).add_document(posting, content,
+                    { 'title': title, 'court': court, 'date_posted': date_posted })
+    if shard_directory_names:
+        for shard, delta in zip(segments, deltas):
+            if should_compact or delta.get_length():
+                compact(shard, delta)
+            else:
+                shard.save_deletions()
+        return
+    delta = deltas[0]
+    if should_compact:
+        for segment in segments:
+            # Only the main index (i.e. the first segment) absorbs the delta segment
+            compact(segment, delta if segment is segments[0] else IndexWriter())
+        if os.path.isdir(delta_directory_name):
+            shutil.rmtree(delta_directory_name)
+        return
+    for segment in segments:
+        segment.save_deletions()
+    os.makedirs(delta_directory_name, exist_ok=True)
+    delta.write(*delta_segment.get_index_file_names())
+
+# Tombstones a document in the segment holding it, and drops it if it is in the delta segment
+def delete_document(doc_id, segments, delta):
+    for segment in segments:
+        if segment.has_document(doc_id):
+            segment.get_deletions().add(segment.get_ordinal(doc_id))
+    delta.remove_document(doc_id)
+
+'''
+Rewrite a segment as (segment - tombstoned documents) + delta
+    - Files are written under temporary names first and then swapped in
+    - Postings of a lemma are merged by doc id (a doc id is never live in both the segment and the delta)
+    - The live documents are numbered again by doc ordinal, in the doc order of the segment (see doc_map.py)
+'''
+def compact(segment, delta):
+    deletions = segment.get_deletions()
+    if deletions.is_empty() and not delta.get_length():
+        return
+    file_names = segment.get_index_file_names()
+    dictionary_file_name, postings_file_name, lengths_file_name, \
+        nltk_offsets_file_name, nltk_texts_file_name, metadata_file_name, \
+        positions_offsets_file_name, positions_file_name, term_index_file_name, kgram_index_file_name, \
+        forward_index_file_name, doc_map_file_name = file_names
+    compacted_file_names = tuple(map(lambda file_name: file_name + '.compact', file_names))
+    compacted_dictionary_file_name, compacted_postings_file_name, compacted_lengths_file_name, \
+        compacted_nltk_offsets_file_name, compacted_nltk_texts_file_name, compacted_metadata_file_name, \
+        compacted_positions_offsets_file_name, compacted_positions_file_name, \
+        compacted_term_index_file_name, compacted_kgram_index_file_name, \
+        compacted_forward_index_file_name, compacted_doc_map_file_name = compacted_file_names
+    doc_map = segment.get_doc_map()
+    doc_ids = doc_map.get_doc_ids()
+    lengths = segment.get_lengths()
+    lengths_by_document = { doc_ids[ordinal]: lengths[ordinal]
+        for ordinal in range(doc_map.get_length()) if ordinal not in deletions }
+    lengths_by_document.update(delta.lengths_by_document)
+    metadata_by_document = { doc_id: metadata
+        for doc_id, metadata in segment.get_metadata_store().to_dict().items() if segment.has_document(doc_id) }
+    metadata_by_document.update(delta.metadata_by_document)
+    compacted_doc_map = DocMap.build_from(
+        get_doc_order(lengths_by_document, metadata_by_document, doc_map.get_doc_order()), doc_map.get_doc_order())
+    ordinals_by_doc_id = compacted_doc_map.get_ordinals_by_doc_id()
+    # The forward index is rebuilt from the compacted postings, with the dfs of the compacted segment
+    forward_index_builder = ForwardIndexBuilder()
+    seen_lemmas = set()
+    compacted_lemmas = []
+    with open(dictionary_file_name, errors='ignore') as d, open(postings_file_name, 'rb') as p, \
+        open(compacted_dictionary_file_name, 'w') as cd, open(compacted_postings_file_name, 'wb') as cp:
+        for line in d:
+            lemma, postings_offset = line.rstrip().split(',')
+            p.seek(int(postings_offset))
+            postings = get_ordinal_postings(
+                [(doc_ids[ordinal], tf) for ordinal, tf in pickle.load(p) if ordinal not in deletions]
+                + delta.dictionary.get(lemma, []), ordinals_by_doc_id)
+            seen_lemmas.add(lemma)
+            if postings:
+                cd.write('{lemma},{offset}\n'.format(lemma=lemma, offset=cp.tell()))
+                pickle.dump(postings, cp)
+                compacted_lemmas.append(lemma)
+                forward_index_builder.add_postings(lemma, postings)
+        for lemma, postings in delta.dictionary.items():
+            if lemma not in seen_lemmas:
+                postings = get_ordinal_postings(postings, ordinals_by_doc_id)
+                cd.write('{lemma},{offset}\n'.format(lemma=lemma, offset=cp.tell()))
+                pickle.dump(postings, cp)
+                compacted_lemmas.append(lemma)
+                forward_index_builder.add_postings(lemma, postings)
+    sorted_terms = write_lexicon(compacted_lemmas, compacted_term_index_file_name, compacted_kgram_index_file_name)
+    with open(compacted_forward_index_file_name, 'wb') as f:
+        forward_index_builder.dump(sorted_terms, compacted_doc_map.get_length(), f)
+    with open(compacted_doc_map_file_name, 'wb') as o:
+        compacted_doc_map.dump(o)
+    with open(compacted_lengths_file_name, 'wb') as l:
+        DocumentLengths.build_from(map(lengths_by_document.__getitem__, compacted_doc_map.get_doc_ids())).dump(l)
+    with open(nltk_offsets_file_name) as i, open(nltk_texts_file_name, 'rb') as t, \
+        open(compacted_nltk_offsets_file_name, 'w') as ci, open(compacted_nltk_texts_file_name, 'wb') as ct:
+        for line in i:
+            doc_id, nltk_text_offset = line.rstrip().split(',')
+            if not segment.has_document(int(doc_id)):
+                continue
+            t.seek(int(nltk_text_offset))
+            ci.write('{doc_id},{offset}\n'.format(doc_id=doc_id, offset=ct.tell()))
+            pickle.dump(pickle.load(t), ct)
+        for doc_id, nltk_text in delta.nltk_texts_by_document.items():
+            ci.write('{doc_id},{offset}\n'.format(doc_id=doc_id, offset=ct.tell()))
+            pickle.dump(nltk_text, ct)
+    with open(compacted_metadata_file_name, 'wb') as m:
+        MetadataStore.build_from(metadata_by_document, compacted_doc_map.get_doc_ids()).dump(m)
+    seen_lemmas = set()
+    with open(positions_offsets_file_name, errors='ignore') as i, open(positions_file_name, 'rb') as t, \
+        open(compacted_positions_offsets_file_name, 'w') as ci, open(compacted_positions_file_name, 'wb') as ct:
+        for line in i:
+            lemma, positions_offset = line.rstrip().split(',')
+            t.seek(int(positions_offset))
+            positions_by_document = { ordinals_by_doc_id[doc_ids[ordinal]]: positions
+                for ordinal, positions in pickle.load(t).items() if ordinal not in deletions }
+            positions_by_document.update({ ordinals_by_doc_id[doc_id]: positions
+                for doc_id, positions in delta.positions_by_lemma.get(lemma, {}).items() })
+            seen_lemmas.add(lemma)
+            if positions_by_document:
+                ci.write('{lemma},{offset}\n'.format(lemma=lemma, offset=ct.tell()))
+                pickle.dump(positions_by_document, ct)
+        for lemma, positions_by_document in delta.positions_by_lemma.items():
+            if lemma not in seen_lemmas:
+                ci.write('{lemma},{offset}\n'.format(lemma=lemma, offset=ct.tell()))
+                pickle.dump({ ordinals_by_doc_id[doc_id]: positions
+                    for doc_id, positions in positions_by_document.items() }, ct)
+    # The lengths of the segment are mapped (see lengths.py) until the segment is closed
+    segment.close()
+    for file_name, compacted_file_name in zip(file_names, compacted_file_names):
+        os.replace(compacted_file_name, file_name)
+    deletions.reset()
+    segment.save_deletions()
+
+def usage():
+    print('Usage: ' + sys.argv[0] + ' -d dictionary-file -p postings-file '
+        + '[-r file-of-doc-ids-to-delete] [-u dataset-file-of-updated-docs] [-c]')
+
+input_file_d = input_file_p = input_file_r = input_file_u = None
+should_compact = False
+try:
+    opts, args = getopt.getopt(sys.argv[1:], 'd:p:r:u:c')
+except getopt.GetoptError:
+    usage()
+    sys.exit(2)
+for o, a in opts:
+    if o == '-d':
+        input_file_d = a
+    elif o == '-p':
+        input_file_p = a
+    elif o == '-r':
+        input_file_r = a
+    elif o == '-u':
+        input_file_u = a
+    elif o == '-c':
+        should_compact = True
+    else:
+        assert False, 'Unhandled option'
+if input_file_d == None or input_file_p == None \
+    or (input_file_r == None and input_file_u == None and not should_compact):
+    usage()
+    sys.exit(2)
+
+deleted_doc_ids = []
+if input_file_r is not None:
+    with open(input_file_r) as r:
+        deleted_doc_ids = list(map(int, filter(None, map(str.strip, r))))
+
+do_updating(input_file_d, input_file_p, deleted_doc_ids, input_file_u, should_compact)
+stop_time = time()
+print_time(start_time, stop_time)
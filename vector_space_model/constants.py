@@ -1,5 +1,15 @@
 lengths_file_name = 'lengths.txt'
+# The lengths file is N and the number of lengths (as int64), then the int32 length of every doc id (0 if there is no
+# such document), so search.py maps it rather than loading it
+lengths_header_format = '<qq'
 top_n = 10
+# Tokenizers of the analyzer (see analyzer.py), the first being the default, and the file naming the one of the index
+tokenizers = ['nltk', 'regex']
+analyzer_file_name = 'analyzer.txt'
+# Stopwords of the analyzer, read from the working directory (every project has its own)
+stopwords_file_name = 'stopwords.txt'
+# Number of documents read and analyzed at once by index.py
+analyzer_batch_size = 256
 
 def print_time(start_time, stop_time):
     print('Time taken: {0:.5f} seconds'.format(stop_time - start_time))
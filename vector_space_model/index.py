@@ -4,38 +4,38 @@ import sys
 import getopt
 
 import os
-import string
 import bisect
 import pickle
+import struct
 
+from array import array
 from collections import Counter
 from time import time
 
-from nltk.stem import PorterStemmer
-from nltk.tokenize import sent_tokenize, word_tokenize
-stemmer = PorterStemmer()
+# analyzer.py is shared with the main project (the parent directory), which is searched after this directory,
+# so that the modules of this project (e.g. constants.py) are the ones imported, also by the analyzer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from constants import lengths_file_name, print_time
+from constants import lengths_file_name, lengths_header_format, tokenizers, analyzer_batch_size, print_time
+from analyzer import Analyzer, save_tokenizer
 from skip_list import SkipList
 
 start_time = time()
 
-with open('stopwords.txt') as f:
-    stopwords = set(map(lambda ln: ln.strip(), f.readlines()))
-
 '''
 Create a dictionary[stem] -> sorted([(doc id, tf)]) and write to the dictionary and postings file
     - dictionary is a dictionary whose keys are stems and whose values are sorted posting lists
     - postings will then be converted into a skip list with sqrt(len(postings)) skip pointers 
+    - documents are read and analyzed analyzer_batch_size at a time
 '''
 def do_indexing(documents_directory_name, dictionary_file_name, postings_file_name):
     dictionary = {}
     lengths_by_document = {}
     seen_postings_by_stem = {}
     for root, directories, files in os.walk(documents_directory_name):
-        for posting in files:
-            with open(os.path.join(root, posting)) as f:
-                text = get_preprocessed(f.read()) # Counter type of {stem: frequency}
+        for i in range(0, len(files), analyzer_batch_size):
+            batch = files[i:i + analyzer_batch_size]
+            for posting, text in zip(batch, get_preprocessed_batch(root, batch)): # Counter type of {stem: frequency}
                 posting = int(posting.split('.')[0])
                 lengths_by_document[posting] = sum(text.values())
                 for stem, frequency in text.items():
@@ -54,35 +54,34 @@ def do_indexing(documents_directory_name, dictionary_file_name, postings_file_na
             d.write('{stem},{offset}\n'.format(stem=stem, offset=p.tell()))
             postings = dictionary[stem]
             pickle.dump(postings, p)
+    # Doc ids are the (small) file names of the collection, so the lengths are indexed by doc id
+    lengths = array('i', [0]) * (max(lengths_by_document, default=-1) + 1)
+    for doc_id, length in lengths_by_document.items():
+        lengths[doc_id] = length
     with open(lengths_file_name, 'wb') as l:
-        pickle.dump(N, l)
-        pickle.dump(lengths_by_document, l)
+        l.write(struct.pack(lengths_header_format, N, len(lengths)))
+        l.write(lengths.tobytes())
 
 '''
-Preprocess a text string in the following order:
-    1. (L77) Do sentence tokenization
-    2. (L75) For each sentence, do case-folding, word tokenization
-    3. (L73) Filter out punctuations, non-alphabetical words, and stopwords
-    4. (L72) Stem the remaining words
-    5. (L78) Return a Counter of stemmed words (i.e. {stem: frequency})
+Preprocess the documents of a batch with the analyzer (see analyzer.py), i.e. sentence and word tokenization,
+    case-folding, removal of punctuations, non-alphabetical words and stopwords, and stemming, and
+Return a Counter of stemmed words (i.e. {stem: frequency}) of every document
 '''
-def get_preprocessed(text):
-    sentences = map(
-        lambda sentence: list(map(
-            lambda word: stemmer.stem(word),
-            filter(
-                lambda token: token not in string.punctuation and token.isalpha() and token not in stopwords,
-                word_tokenize(sentence.lower())
-                ))),
-        sent_tokenize(text))
-    return Counter((stem for stems in sentences for stem in stems))
+def get_preprocessed_batch(directory_name, file_names):
+    texts = []
+    for file_name in file_names:
+        with open(os.path.join(directory_name, file_name)) as f:
+            texts.append(f.read())
+    return list(map(Counter, analyzer.get_terms_batch(texts)))
 
 def usage():
-    print('Usage: ' + sys.argv[0] + ' -i directory-of-documents -d dictionary-file -p postings-file')
+    print('Usage: ' + sys.argv[0] + ' -i directory-of-documents -d dictionary-file -p postings-file '
+        + '[-t tokenizer (' + '|'.join(tokenizers) + ')]')
 
 input_directory_d = output_file_d = output_file_p = None
+tokenizer_t = tokenizers[0]
 try:
-    opts, args = getopt.getopt(sys.argv[1:], 'i:d:p:')
+    opts, args = getopt.getopt(sys.argv[1:], 'i:d:p:t:')
 except (getopt.GetoptError, err) as e:
     usage()
     sys.exit(2)
@@ -93,12 +92,16 @@ for o, a in opts:
         output_file_d = a
     elif o == '-p':
         output_file_p = a
+    elif o == '-t':
+        tokenizer_t = a
     else:
         assert False, 'Unhandled option'
-if input_directory_d == None or output_file_d == None or output_file_p == None:
+if input_directory_d == None or output_file_d == None or output_file_p == None or tokenizer_t not in tokenizers:
     usage()
     sys.exit(2)
 
+analyzer = Analyzer(tokenizer_t, 'stem', split_sentences=True)
+save_tokenizer(tokenizer_t)
 do_indexing(input_directory_d, output_file_d, output_file_p)
 
 stop_time = time()
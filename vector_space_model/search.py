@@ -3,18 +3,22 @@ import nltk
 import sys
 import getopt
 
+import os
+import mmap
 import pickle
-import string
+import struct
 
 from collections import Counter
 from heapq import heapify, heappop
 from math import log10
 from time import time
 
-from nltk.stem import PorterStemmer
-stemmer = PorterStemmer()
+# analyzer.py is shared with the main project (the parent directory), which is searched after this directory,
+# so that the modules of this project (e.g. constants.py) are the ones imported, also by the analyzer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from constants import lengths_file_name, top_n, print_time
+from constants import lengths_file_name, lengths_header_format, top_n, print_time
+from analyzer import Analyzer, load_tokenizer
 from skip_list import SkipList
 
 start_time = time()
@@ -22,8 +26,8 @@ start_time = time()
 dictionary = {}
 offsets = {}
 
-with open('stopwords.txt') as f:
-    stopwords = set(map(lambda ln: ln.strip(), f.readlines()))
+# Queries are analyzed like the documents of the index (see analyzer.py), but without sentence splitting
+analyzer = Analyzer(load_tokenizer(), 'stem')
 
 # MAIN function for search.py
 def do_searching(dictionary_file_name, postings_file_name, queries_file_name, output_file_name):
@@ -34,11 +38,7 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
         for line in d:
             stem, offset = line.rstrip().split(',')
             offsets[stem] = int(offset)
-        # Load the following data from the lengths file:
-        # 1. Total number of documents in the collection
-        # 2. Length of each document (key is the doc_id)
-        N = pickle.load(l)
-        lengths_by_document = pickle.load(l)
+        N, lengths = load_lengths(l)
         # Process each query one-by-one but with the same resources
         # I.e. Duplicate stems are loaded only once
         for line in q:
@@ -61,7 +61,7 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
             # re-arrange the tuple so that the value to be compared (the tfidf) is the first value
             # Tuple comparison is by first value, then second value if first values are equal, and etc
             # We also do normalization by document length here
-            relevant_docs = [(-doc_tfidfs / lengths_by_document[doc_id], doc_id) \
+            relevant_docs = [(-doc_tfidfs / lengths[doc_id], doc_id) \
                 for doc_id, doc_tfidfs in tfidf_by_document.items()]
             heapify(relevant_docs) # in-place
             for i in range(docs_to_pop):
@@ -69,6 +69,20 @@ def do_searching(dictionary_file_name, postings_file_name, queries_file_name, ou
             o.write(' '.join(most_relevant_docs))
             o.write('\n')
 
+# Accepts the lengths file and returns (total number of documents in the collection, length of each document
+# indexed by doc_id)
+# The lengths are mapped (only the pages of the scored documents are read), unless the file is of an index written
+# before the lengths were an int32 array (the pickled N, then { doc_id: length }), which is loaded as before
+def load_lengths(lengths_file):
+    lengths_map = mmap.mmap(lengths_file.fileno(), 0, access=mmap.ACCESS_READ)
+    lengths_offset = struct.calcsize(lengths_header_format)
+    if len(lengths_map) >= lengths_offset:
+        N, length = struct.unpack_from(lengths_header_format, lengths_map)
+        if len(lengths_map) == lengths_offset + length * 4:
+            return (N, memoryview(lengths_map)[lengths_offset:].cast('i'))
+    lengths_map.close()
+    return (pickle.load(lengths_file), pickle.load(lengths_file))
+
 def get_tfidf_weight(tf, df=0, N=0):
     tf_weight = 0
     idf_weight = 1
@@ -80,18 +94,10 @@ def get_tfidf_weight(tf, df=0, N=0):
 
 # Accepts a line and returns (set of stems, preprocessed line):
 # 1. Tokenize
-# 2. Strip punctuation from tokens
-# 3. Filter out non-alphabetical or stopword tokens
-# 4. Stem the remaining tokens
+# 2. Filter out punctuation, non-alphabetical or stopword tokens
+# 3. Stem the remaining tokens
 def get_preprocessed_query(line):
-    query_tokens = map(
-        lambda token: token.strip(string.punctuation),
-        line.rstrip().lower().split(' '))
-    stemmed_query = list(map(
-        lambda token: stemmer.stem(token),
-        filter(
-            lambda token: token.isalpha() and token not in stopwords,
-            query_tokens)))
+    stemmed_query = analyzer.get_terms(line.rstrip())
     return (set(stemmed_query), stemmed_query)
 
 # Accepts a stem, a postings file handle, and